@@ -25,6 +25,13 @@ PIPEDREAM_CLIENT_SECRET = os.environ.get("PIPEDREAM_CLIENT_SECRET")
 PIPEDREAM_PROJECT_ID = os.environ.get("PIPEDREAM_PROJECT_ID")
 PIPEDREAM_OAUTH_APP_ID = os.environ.get("PIPEDREAM_OAUTH_APP_ID")
 
+# Proxied requests are paced per connected account, Notion allows about 3 requests per second
+PROXY_RATE_LIMIT_PER_SECOND = float(os.environ.get("PROXY_RATE_LIMIT_PER_SECOND", 3))
+PROXY_RATE_LIMIT_BURST = float(os.environ.get("PROXY_RATE_LIMIT_BURST", 3))
+PROXY_MAX_ATTEMPTS = 5
+PROXY_RETRY_BASE_DELAY = 0.5
+PROXY_RETRY_MAX_DELAY = 30
+
 # Chat Service
 OLLAMA_BASE_URL = os.environ.get("OLLAMA_BASE_URL", "http://localhost:11434")
 OLLAMA_MODEL = os.environ.get("OLLAMA_MODEL", "qwen2.5:7b")
@@ -43,11 +50,86 @@ else:
     SUPABASE_KEY = os.environ.get("SUPABASE_SECRET_KEY")
 
 # Embedding models
-EMBEDDING_MODEL = "sentence-transformers/all-mpnet-base-v2"
-EMBEDDING_DIMS = 768
-
+# The model name is also the tag stored with every chunk embedding
+EMBEDDING_MODEL = os.environ.get("EMBEDDING_MODEL", "sentence-transformers/all-mpnet-base-v2")
+# "torch" (sentence-transformers), "onnx" or "onnx-int8", the latter two need the onnx extra
+EMBEDDING_BACKEND = os.environ.get("EMBEDDING_BACKEND", "torch")
+EMBEDDING_ONNX_DIR = os.environ.get("EMBEDDING_ONNX_DIR", ".cache/onnx")
+EMBEDDING_DIMS = int(os.environ.get("EMBEDDING_DIMS", 768))
+# Longer inputs are truncated by the model, special tokens included
+EMBEDDING_MAX_TOKENS = int(os.environ.get("EMBEDDING_MAX_TOKENS", 384))
+
+# Setting a target model re-embeds every chunk with it in the background, search switches over
+# once all of them are covered
+EMBEDDING_TARGET_MODEL = os.environ.get("EMBEDDING_TARGET_MODEL", "")
+EMBEDDING_TARGET_DIMS = int(os.environ.get("EMBEDDING_TARGET_DIMS", 768))
+EMBEDDING_TARGET_MAX_TOKENS = int(os.environ.get("EMBEDDING_TARGET_MAX_TOKENS", 512))
+EMBED_MIGRATION_BATCH_SIZE = int(os.environ.get("EMBED_MIGRATION_BATCH_SIZE", 64))
+# Seconds between re-embedding batches
+EMBED_MIGRATION_INTERVAL = float(os.environ.get("EMBED_MIGRATION_INTERVAL", 1.0))
+
+# Chunk budgets are counted in "characters" or in "tokens" of the embedding model's tokenizer
+CHUNK_UNIT = os.environ.get("CHUNK_UNIT", "characters")
 CHUNK_SIZE = 512
 CHUNK_OVERLAP = 128
+CHUNK_SIZE_TOKENS = int(os.environ.get("CHUNK_SIZE_TOKENS", 256))
+CHUNK_OVERLAP_TOKENS = int(os.environ.get("CHUNK_OVERLAP_TOKENS", 32))
+
+# Cross-page embedding batches, flushed when full or when the oldest chunk waited long enough
+EMBED_BATCH_SIZE = int(os.environ.get("EMBED_BATCH_SIZE", 64))
+EMBED_BATCH_TOKENS = int(os.environ.get("EMBED_BATCH_TOKENS", 16384))
+EMBED_FLUSH_INTERVAL = float(os.environ.get("EMBED_FLUSH_INTERVAL", 0.05))
+# Model batches are formed from texts of similar length, sized by padded tokens (texts x longest)
+EMBED_PADDED_TOKEN_BUDGET = int(os.environ.get("EMBED_PADDED_TOKEN_BUDGET", 8192))
+EMBED_MAX_BATCH = int(os.environ.get("EMBED_MAX_BATCH", 128))
+
+# Dedicated threads for model inference, callers beyond the queue depth wait for admission
+EMBED_INFERENCE_WORKERS = int(os.environ.get("EMBED_INFERENCE_WORKERS", 1))
+EMBED_INFERENCE_QUEUE_DEPTH = int(os.environ.get("EMBED_INFERENCE_QUEUE_DEPTH", 16))
+
+# Concurrent search queries are coalesced into one encode, waiting a few milliseconds at most
+QUERY_BATCH_SIZE = int(os.environ.get("QUERY_BATCH_SIZE", 32))
+QUERY_MAX_WAIT_MS = float(os.environ.get("QUERY_MAX_WAIT_MS", 5))
+
+# Embedding cache, an in-memory LRU in front of a SQLite file, 0 disables a tier
+EMBED_CACHE_MEMORY_ITEMS = int(os.environ.get("EMBED_CACHE_MEMORY_ITEMS", 10000))
+EMBED_CACHE_DISK_MB = float(os.environ.get("EMBED_CACHE_DISK_MB", 512))
+EMBED_CACHE_PATH = os.environ.get("EMBED_CACHE_PATH", ".cache/embeddings.sqlite3")
+
+# Notion sync
+# Caps on paginated Notion requests (batches of 100), 0 walks every result
+NOTION_SEARCH_MAX_BATCHES = int(os.environ.get("NOTION_SEARCH_MAX_BATCHES", 0))
+NOTION_BLOCK_MAX_BATCHES = int(os.environ.get("NOTION_BLOCK_MAX_BATCHES", 0))
+# Pages with more blocks are streamed, extracted, chunked and embedded incrementally
+SYNC_STREAM_BLOCK_THRESHOLD = int(os.environ.get("SYNC_STREAM_BLOCK_THRESHOLD", 5000))
+SYNC_STREAM_GROUP_CHUNKS = int(os.environ.get("SYNC_STREAM_GROUP_CHUNKS", 64))
+SYNC_STREAM_CONTENT_MAX_CHARS = int(os.environ.get("SYNC_STREAM_CONTENT_MAX_CHARS", 1_000_000))
+SYNC_PAGE_CONCURRENCY = int(os.environ.get("SYNC_PAGE_CONCURRENCY", 4))
+BLOCK_FETCH_CONCURRENCY = int(os.environ.get("BLOCK_FETCH_CONCURRENCY", 4))
+# Pages writing their row and reading their stored chunks at once, extraction itself keeps a
+# batch of SYNC_PROCESS_BATCH_PAGES pages in the worker pool
+SYNC_EXTRACT_CONCURRENCY = int(os.environ.get("SYNC_EXTRACT_CONCURRENCY", 2))
+SYNC_EMBED_CONCURRENCY = int(os.environ.get("SYNC_EMBED_CONCURRENCY", 8))
+SYNC_STORE_CONCURRENCY = int(os.environ.get("SYNC_STORE_CONCURRENCY", 2))
+# Worker processes for extraction and chunking, 0 runs them in a thread instead
+SYNC_PROCESS_WORKERS = int(os.environ.get("SYNC_PROCESS_WORKERS", 2))
+SYNC_PROCESS_BATCH_PAGES = int(os.environ.get("SYNC_PROCESS_BATCH_PAGES", 8))
+SYNC_PROCESS_FLUSH_INTERVAL = float(os.environ.get("SYNC_PROCESS_FLUSH_INTERVAL", 0.02))
+SYNC_STAGE_QUEUE_SIZE = 8
+SYNC_JOB_WORKERS = int(os.environ.get("SYNC_JOB_WORKERS", 4))
+# Process wide caps shared fairly across users by the sync scheduler
+SYNC_NETWORK_SLOTS = int(os.environ.get("SYNC_NETWORK_SLOTS", 8))
+SYNC_CPU_SLOTS = int(os.environ.get("SYNC_CPU_SLOTS", 8))
+SYNC_JOB_HISTORY = 100
+# On-disk cache of fetched Notion block children, evicted least recently used first
+BLOCK_CACHE_PATH = os.environ.get("BLOCK_CACHE_PATH", ".cache/notion_blocks.sqlite3")
+BLOCK_CACHE_MAX_BYTES = int(os.environ.get("BLOCK_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+# Notion reports last_edited_time rounded down to the minute
+SYNC_WATERMARK_SLACK_SECONDS = 120
+# Change events for the same page within this window are collapsed into one re-index
+EVENT_DEBOUNCE_SECONDS = float(os.environ.get("EVENT_DEBOUNCE_SECONDS", 5))
+# Pending events are applied at the latest this long after the first of them, even mid-burst
+EVENT_DEBOUNCE_MAX_SECONDS = float(os.environ.get("EVENT_DEBOUNCE_MAX_SECONDS", 30))
 
 
 LOG_COLORS = {
@@ -1,10 +1,32 @@
 from typing import Any
 
+import numpy as np
+
 from app.config import setup_logger
 from app.database.connection import supabase
 
 logger = setup_logger(__name__)
 
+# Embedding model tag -> its vector column in page_chunks, a model never changes column
+_embedding_columns: dict[str, str] = {}
+
+
+def to_pgvector(vector: np.ndarray) -> str:
+    """
+    pgvector's text form ('[0.1,-0.2,...]'). Nine significant digits round-trip a float32, and
+    the string is far smaller to send than a JSON list of Python floats.
+    """
+    return "[" + ",".join(map("{:.9g}".format, np.asarray(vector, dtype=np.float32).tolist())) + "]"
+
+
+def from_pgvector(value: str | list[float] | None) -> np.ndarray | None:
+    # PostgREST returns vector columns in their text form, parsed straight into a float32 buffer
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return np.fromstring(value.strip("[]"), dtype=np.float32, sep=",")
+    return np.asarray(value, dtype=np.float32)
+
 
 class IntegrationOperations:
     @staticmethod
@@ -55,6 +77,22 @@ class IntegrationOperations:
         )
         return result.data[0] if result.data else None
 
+    @staticmethod
+    def get_integration_by_id(integration_id: str) -> dict[str, Any] | None:
+        result = supabase.table("integrations").select("*").eq("id", integration_id).execute()
+        return result.data[0] if result.data else None
+
+    @staticmethod
+    def update_last_synced_at(integration_id: str, synced_at: str) -> bool:
+        try:
+            supabase.table("integrations").update({"last_synced_at": synced_at}).eq(
+                "id", integration_id
+            ).execute()
+            return True
+        except Exception as e:
+            logger.error(f"Failed to update sync watermark for {integration_id}: {e}")
+            return False
+
     @staticmethod
     def delete_integration(integration_id: str) -> bool:
         try:
@@ -75,6 +113,7 @@ class NotionPageOperations:
         url: str | None = None,
         content: str | None = None,
         media_metadata: list[dict[str, Any]] | None = None,
+        last_edited_time: str | None = None,
     ) -> dict[str, Any] | None:
         data = {
             "integration_id": integration_id,
@@ -83,6 +122,7 @@ class NotionPageOperations:
             "url": url,
             "content": content,
             "media_metadata": media_metadata,
+            "last_edited_time": last_edited_time,
         }
 
         result = (
@@ -98,6 +138,61 @@ class NotionPageOperations:
         result = supabase.table("notion_pages").select("*").eq("id", page_id).execute()
         return result.data[0] if result.data else None
 
+    @staticmethod
+    def mark_page_indexed(page_id: str, last_edited_time: str | None) -> bool:
+        try:
+            supabase.table("notion_pages").update({"last_edited_time": last_edited_time}).eq(
+                "id", page_id
+            ).execute()
+            return True
+        except Exception as e:
+            logger.error(f"Failed to record edit time for page {page_id}: {e}")
+            return False
+
+    @staticmethod
+    def get_page_edit_times(
+        integration_id: str,
+        batch_size: int = 1000,
+        notion_page_ids: list[str] | None = None,
+    ) -> dict[str, str | None]:
+        edit_times: dict[str, str | None] = {}
+        offset = 0
+
+        # PostgREST caps responses at max_rows, so page through large workspaces
+        while True:
+            query = (
+                supabase.table("notion_pages")
+                .select("notion_page_id, last_edited_time")
+                .eq("integration_id", integration_id)
+            )
+            if notion_page_ids is not None:
+                query = query.in_("notion_page_id", notion_page_ids)
+
+            result = query.order("notion_page_id").range(offset, offset + batch_size - 1).execute()
+            rows = result.data or []
+            edit_times.update({row["notion_page_id"]: row["last_edited_time"] for row in rows})
+
+            if len(rows) < batch_size:
+                return edit_times
+            offset += batch_size
+
+    @staticmethod
+    def delete_notion_page(integration_id: str, notion_page_id: str) -> bool:
+        # Chunks are removed by the cascade on page_chunks.page_id. False when the page was
+        # never indexed, failures are raised.
+        result = (
+            supabase.table("notion_pages")
+            .delete()
+            .eq("integration_id", integration_id)
+            .eq("notion_page_id", notion_page_id)
+            .execute()
+        )
+
+        if not result.data:
+            return False
+        logger.info(f"Deleted page {notion_page_id}")
+        return True
+
     @staticmethod
     def list_notion_pages(integration_id: str) -> list[dict[str, Any]]:
         result = (
@@ -112,62 +207,326 @@ class NotionPageOperations:
 
 class PageChunkOperations:
     @staticmethod
-    def upsert_page_chunk(
+    def replace_page_chunks(
         page_id: str,
-        chunk_index: int,
-        content: str,
-        embedding: list[float],
-    ) -> dict[str, Any] | None:
-        data = {
-            "page_id": page_id,
-            "chunk_index": chunk_index,
-            "content": content,
-            "embedding": embedding,
-        }
+        chunk_count: int | None,
+        chunks: list[dict[str, Any]],
+        embedding_model: str | None = None,
+    ) -> int:
+        """
+        Upserts `chunks` (dicts with chunk_index, content, content_hash and embedding) keyed on
+        (page_id, chunk_index) and deletes every chunk at or past `chunk_count`, all in one
+        transaction. A `chunk_count` of None leaves the other chunks alone. Returns the number
+        of rows written.
+
+        Fails without writing anything when `embedding_model`, the model the embeddings came
+        from, is no longer the active one.
+        """
+        result = supabase.rpc(
+            "replace_page_chunks",
+            {
+                "p_page_id": page_id,
+                "p_chunk_count": chunk_count,
+                "p_chunks": [
+                    {**chunk, "embedding": to_pgvector(chunk["embedding"])} for chunk in chunks
+                ],
+                "p_embedding_model": embedding_model,
+            },
+        ).execute()
 
-        result = supabase.table("page_chunks").upsert(data).execute()
+        return result.data or 0
 
-        return result.data[0] if result.data else None
+    @staticmethod
+    def get_chunk_fingerprints(page_id: str, embedding_model: str) -> list[dict[str, Any]]:
+        # `embedding` is the chunk's vector from `embedding_model`, None when it has none
+        column = EmbeddingModelOperations.get_column(embedding_model)
+        result = (
+            supabase.table("page_chunks")
+            .select(f"chunk_index, content_hash, heading_path, block_ids, embedding:{column}")
+            .eq("page_id", page_id)
+            .order("chunk_index")
+            .execute()
+        )
+
+        rows = result.data or []
+        for row in rows:
+            row["embedding"] = from_pgvector(row.get("embedding"))
+        return rows
 
     @staticmethod
-    def delete_page_chunks(page_id: str) -> bool:
-        try:
-            supabase.table("page_chunks").delete().eq("page_id", page_id).execute()
-            logger.info(f"Deleted chunks for page {page_id}")
-            return True
-        except Exception as e:
-            logger.error(f"Failed to delete chunks for page {page_id}: {e}")
-            return False
+    def get_chunk_metadata(page_id: str, batch_size: int = 1000) -> list[dict[str, Any]]:
+        # Same as get_chunk_fingerprints without the vectors, paged for very large pages
+        rows: list[dict[str, Any]] = []
+        offset = 0
+
+        while True:
+            result = (
+                supabase.table("page_chunks")
+                .select("chunk_index, content_hash, heading_path, block_ids")
+                .eq("page_id", page_id)
+                .order("chunk_index")
+                .range(offset, offset + batch_size - 1)
+                .execute()
+            )
+            batch = result.data or []
+            rows.extend(batch)
+
+            if len(batch) < batch_size:
+                return rows
+            offset += batch_size
 
     @staticmethod
-    def get_page_chunks(page_id: str) -> list[dict[str, Any]]:
+    def get_chunk_embeddings(
+        page_id: str, content_hashes: list[str], embedding_model: str
+    ) -> dict[str, np.ndarray]:
+        if not content_hashes:
+            return {}
+
+        column = EmbeddingModelOperations.get_column(embedding_model)
         result = (
             supabase.table("page_chunks")
-            .select("*")
+            .select(f"content_hash, embedding:{column}")
             .eq("page_id", page_id)
-            .order("chunk_index")
+            .in_("content_hash", content_hashes)
             .execute()
         )
-        return result.data
+
+        embeddings: dict[str, np.ndarray] = {}
+        for row in result.data or []:
+            embedding = from_pgvector(row.get("embedding"))
+            if embedding is not None:
+                embeddings[row["content_hash"]] = embedding
+        return embeddings
 
     @staticmethod
     def search_similar_chunks(
-        query_embedding: list[float],
+        query_embedding: np.ndarray,
         user_id: str,
         limit: int = 5,
+        embedding_model: str | None = None,
     ) -> list[dict[str, Any]]:
-
+        # Only chunks embedded by the query's model are compared, the active one by default
         result = supabase.rpc(
             "search_chunks",
             {
-                "query_embedding": query_embedding,
+                "query_embedding": to_pgvector(query_embedding),
                 "match_count": limit,
                 "filter_user_id": user_id,
+                "p_embedding_model": embedding_model,
+            },
+        ).execute()
+
+        return result.data
+
+    @staticmethod
+    def get_chunks_missing_embedding(
+        embedding_model: str, after_id: str | None = None, limit: int = 64
+    ) -> list[dict[str, Any]]:
+        # Keyset paged by chunk id, pass the last id of one page to get the next
+        result = supabase.rpc(
+            "chunks_missing_embedding",
+            {"p_model": embedding_model, "p_after": after_id, "p_limit": limit},
+        ).execute()
+        return result.data or []
+
+    @staticmethod
+    def write_model_embeddings(embedding_model: str, rows: list[dict[str, Any]]) -> int:
+        """
+        Stores `rows` (dicts with id, content_hash and embedding) as the chunks' embeddings for
+        `embedding_model`. Chunks whose content changed since are skipped, returns the number of
+        chunks written.
+        """
+        result = supabase.rpc(
+            "write_model_embeddings",
+            {
+                "p_model": embedding_model,
+                "p_rows": [{**row, "embedding": to_pgvector(row["embedding"])} for row in rows],
             },
         ).execute()
+        return result.data or 0
 
+
+class EmbeddingModelOperations:
+    @staticmethod
+    def get_active_model() -> str | None:
+        result = supabase.rpc("active_embedding_model", {}).execute()
+        return result.data or None
+
+    @staticmethod
+    def register_model(tag: str, dims: int) -> str:
+        """
+        Adds a vector column of `dims` dimensions for `tag` to page_chunks and returns its name.
+        A model registered earlier keeps its column and status.
+        """
+        result = supabase.rpc("register_embedding_model", {"p_tag": tag, "p_dims": dims}).execute()
+        _embedding_columns[tag] = result.data
         return result.data
 
+    @staticmethod
+    def get_column(tag: str) -> str:
+        column = _embedding_columns.get(tag)
+        if column is None:
+            result = (
+                supabase.table("embedding_models").select("column_name").eq("tag", tag).execute()
+            )
+            if not result.data:
+                raise ValueError(f"Embedding model {tag} is not registered")
+            column = _embedding_columns[tag] = result.data[0]["column_name"]
+        return column
+
+    @staticmethod
+    def get_coverage(tag: str) -> tuple[int, int]:
+        # (chunks, chunks with an embedding from `tag`)
+        result = supabase.rpc("embedding_coverage", {"p_model": tag}).execute()
+        row = result.data[0] if result.data else {}
+        return row.get("total", 0), row.get("covered", 0)
+
+    @staticmethod
+    def cutover(tag: str) -> int:
+        """
+        Makes `tag` the active model, returns the number of chunks it covers. Fails, changing
+        nothing, while any chunk is still missing an embedding from it. The previous model's
+        embeddings stay searchable by its tag.
+        """
+        result = supabase.rpc("cutover_embedding_model", {"p_model": tag}).execute()
+        return result.data or 0
+
+
+class SyncCheckpointOperations:
+    @staticmethod
+    def get_checkpoint(integration_id: str) -> dict[str, Any] | None:
+        result = (
+            supabase.table("sync_checkpoints")
+            .select("*")
+            .eq("integration_id", integration_id)
+            .execute()
+        )
+        return result.data[0] if result.data else None
+
+    @staticmethod
+    def list_running_checkpoints() -> list[dict[str, Any]]:
+        result = supabase.table("sync_checkpoints").select("*").eq("status", "running").execute()
+        return result.data if result.data else []
+
+    @staticmethod
+    def start_checkpoint(
+        integration_id: str,
+        recency_months: int,
+        full_resync: bool,
+        started_at: str,
+    ) -> dict[str, Any] | None:
+        supabase.table("sync_page_status").delete().eq("integration_id", integration_id).execute()
+
+        data = {
+            "integration_id": integration_id,
+            "status": "running",
+            "search_cursor": None,
+            "recency_months": recency_months,
+            "full_resync": full_resync,
+            "started_at": started_at,
+        }
+        result = (
+            supabase.table("sync_checkpoints").upsert(data, on_conflict="integration_id").execute()
+        )
+        return result.data[0] if result.data else None
+
+    @staticmethod
+    def update_cursor(integration_id: str, search_cursor: str | None) -> bool:
+        try:
+            supabase.table("sync_checkpoints").update({"search_cursor": search_cursor}).eq(
+                "integration_id", integration_id
+            ).execute()
+            return True
+        except Exception as e:
+            logger.error(f"Failed to checkpoint search cursor for {integration_id}: {e}")
+            return False
+
+    @staticmethod
+    def complete_checkpoint(integration_id: str) -> bool:
+        try:
+            supabase.table("sync_checkpoints").update(
+                {"status": "completed", "search_cursor": None}
+            ).eq("integration_id", integration_id).execute()
+            return True
+        except Exception as e:
+            logger.error(f"Failed to complete sync checkpoint for {integration_id}: {e}")
+            return False
+
+    @staticmethod
+    def fail_checkpoint(integration_id: str) -> bool:
+        # Only running checkpoints are resumed, a failed sync starts over when asked for again
+        try:
+            supabase.table("sync_checkpoints").update({"status": "failed"}).eq(
+                "integration_id", integration_id
+            ).eq("status", "running").execute()
+            return True
+        except Exception as e:
+            logger.error(f"Failed to mark sync checkpoint failed for {integration_id}: {e}")
+            return False
+
+    @staticmethod
+    def mark_pages_pending(integration_id: str, notion_page_ids: list[str]) -> bool:
+        if not notion_page_ids:
+            return True
+
+        rows = [
+            {"integration_id": integration_id, "notion_page_id": page_id, "status": "pending"}
+            for page_id in notion_page_ids
+        ]
+        try:
+            # Pages finished before a restart keep their status
+            supabase.table("sync_page_status").upsert(
+                rows, on_conflict="integration_id,notion_page_id", ignore_duplicates=True
+            ).execute()
+            return True
+        except Exception as e:
+            logger.error(f"Failed to mark {len(rows)} pages pending for {integration_id}: {e}")
+            return False
+
+    @staticmethod
+    def set_page_status(
+        integration_id: str,
+        notion_page_id: str,
+        status: str,
+        error: str | None = None,
+    ) -> bool:
+        data = {
+            "integration_id": integration_id,
+            "notion_page_id": notion_page_id,
+            "status": status,
+            "error": error,
+        }
+        try:
+            supabase.table("sync_page_status").upsert(
+                data, on_conflict="integration_id,notion_page_id"
+            ).execute()
+            return True
+        except Exception as e:
+            logger.error(f"Failed to record sync status of page {notion_page_id}: {e}")
+            return False
+
+    @staticmethod
+    def get_page_ids(integration_id: str, status: str, batch_size: int = 1000) -> set[str]:
+        page_ids: set[str] = set()
+        offset = 0
+
+        while True:
+            result = (
+                supabase.table("sync_page_status")
+                .select("notion_page_id")
+                .eq("integration_id", integration_id)
+                .eq("status", status)
+                .order("notion_page_id")
+                .range(offset, offset + batch_size - 1)
+                .execute()
+            )
+            rows = result.data or []
+            page_ids.update(row["notion_page_id"] for row in rows)
+
+            if len(rows) < batch_size:
+                return page_ids
+            offset += batch_size
+
 
 class ConversationOperations:
     @staticmethod
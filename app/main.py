@@ -3,6 +3,12 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from app.config import settings
 from app.routers import auth_router, chat_router, notion_router
+from app.services.embedding_batcher import embedding_batcher
+from app.services.embedding_migrator import embedding_migrator
+from app.services.embedding_service import embedding_service
+from app.services.notion_events import event_debouncer
+from app.services.page_processor import page_processor
+from app.services.sync_jobs import sync_job_manager
 
 app = FastAPI(
     title=settings.name,
@@ -24,6 +30,23 @@ app.include_router(notion_router, prefix=f"{settings.prefix}/notion", tags=["not
 app.include_router(chat_router, prefix=f"{settings.prefix}/chat", tags=["chat"])
 
 
+@app.on_event("startup")
+async def startup():
+    await embedding_service.preload()
+    embedding_migrator.start()
+    await sync_job_manager.resume_interrupted()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await event_debouncer.close()
+    await sync_job_manager.shutdown()
+    await embedding_batcher.close()
+    await embedding_migrator.close()
+    await page_processor.close()
+    await embedding_service.close()
+
+
 @app.get("/")
 async def root():
     return {"message": f"Backend is initialized and running\n version: {settings.version}"}
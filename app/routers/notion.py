@@ -1,11 +1,15 @@
+import asyncio
+from typing import Any
+
 from fastapi import APIRouter, HTTPException, status
 from pydantic import BaseModel
 
 from app.config import setup_logger
 from app.database.operations import IntegrationOperations, NotionPageOperations, PageChunkOperations
+from app.services.embedding_migrator import embedding_migrator
 from app.services.embedding_service import embedding_service
-from app.services.notion_service import NotionService
-from app.utils import chunk_text
+from app.services.notion_events import classify_event, event_debouncer
+from app.services.sync_jobs import sync_job_manager
 
 router = APIRouter()
 logger = setup_logger(__name__)
@@ -22,10 +26,52 @@ class NotionSyncRequest(BaseModel):
     user_id: str
     account_id: str
     recency_months: int = 6
+    full_resync: bool = False
 
 
 class NotionSyncResponse(BaseModel):
-    pages_fetched: int
+    job_id: str
+    status: str
+    coalesced: bool = False
+    message: str
+
+
+class NotionSyncStatusResponse(BaseModel):
+    job_id: str
+    integration_id: str
+    status: str
+    priority: str
+    pages_total: int
+    pages_done: int
+    pages_new: int
+    pages_reindexed: int
+    pages_skipped: int
+    pages_failed: int
+    pages_streamed: int
+    chunks_embedded: int
+    chunks_reused: int
+    chunks_truncated: int
+    pages_per_second: float
+    errors: list[str]
+    stages: list[dict]
+    truncation: dict[str, int]
+    error: str | None
+    created_at: str
+    started_at: str | None
+    finished_at: str | None
+
+
+class NotionPageEvent(BaseModel):
+    user_id: str
+    account_id: str
+    type: str
+    page_id: str
+
+
+class NotionEventResponse(BaseModel):
+    accepted: int
+    ignored: int
+    pending: int
     message: str
 
 
@@ -53,6 +99,7 @@ class SearchResultChunk(BaseModel):
     page_url: str
     similarity_score: float
     chunk_index: int
+    heading_path: list[str] = []
 
 
 class SearchResponse(BaseModel):
@@ -61,6 +108,13 @@ class SearchResponse(BaseModel):
     total_results: int
 
 
+class EmbeddingStatsResponse(BaseModel):
+    model: str
+    inference: dict[str, int | float]
+    cache: dict[str, int | float]
+    migration: dict[str, Any]
+
+
 @router.get("/accounts", response_model=list[NotionAccount])
 async def list_notion_accounts(user_id: str, app_name: str = None):
     try:
@@ -90,104 +144,109 @@ async def sync_pages(payload: NotionSyncRequest):
             )
 
         logger.info(
-            f"Starting Notion sync for user {payload.user_id}, account {payload.account_id}",
+            f"Requesting Notion sync for user {payload.user_id}, account {payload.account_id}",
             "WHITE",
         )
 
-        pages = await NotionService.fetch_pages(
-            external_user_id=payload.user_id,
-            account_id=payload.account_id,
-            recency=payload.recency_months,
+        job, coalesced = sync_job_manager.submit(
+            integration=integration,
+            recency_months=payload.recency_months,
+            full_resync=payload.full_resync,
         )
 
-        logger.info(f"Fetched {len(pages)} page metadata", "WHITE")
-
-        integration_id = integration["id"]
-        stored_count = 0
-
-        for page in pages:
-            try:
-                page_id = page.get("id")
-                title = (
-                    page.get("properties", {})
-                    .get("title", {})
-                    .get("title", [{}])[0]
-                    .get("plain_text", "Untitled")
-                )
-                url = page.get("url")
-
-                logger.info(f"Fetching content for page: {title}", "WHITE")
-
-                blocks = await NotionService.fetch_page_blocks(
-                    external_user_id=payload.user_id,
-                    account_id=payload.account_id,
-                    page_id=page_id,
-                )
-
-                content, media_metadata = NotionService.extract_text_from_blocks(blocks)
-
-                stored_page = NotionPageOperations.upsert_notion_page(
-                    integration_id=integration_id,
-                    notion_page_id=page_id,
-                    title=title,
-                    url=url,
-                    content=content,
-                    media_metadata=media_metadata if media_metadata else None,
-                )
+        return NotionSyncResponse(
+            job_id=job.id,
+            status=job.status,
+            coalesced=coalesced,
+            message=(
+                "Sync already in progress for this account" if coalesced else "Sync job queued"
+            ),
+        )
 
-                if not stored_page:
-                    logger.error(f"Failed to store page: {title}")
-                    continue
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to sync Notion pages: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to sync Notion pages",
+        )
 
-                db_page_id = stored_page["id"]
 
-                logger.info(f"Chunking and embedding page: {title}", "WHITE")
+@router.get("/sync/{job_id}", response_model=NotionSyncStatusResponse)
+async def get_sync_status(job_id: str):
+    job = sync_job_manager.get(job_id)
 
-                chunks = chunk_text(content) if content else []
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Sync job not found",
+        )
 
-                if chunks:
-                    logger.info(f"Generating embeddings for {len(chunks)} chunks")
-                    embeddings = embedding_service.generate_embeddings_batch(chunks)
+    return job.to_dict()
 
-                    logger.info("Storing chunks with embeddings")
-                    for idx, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
-                        PageChunkOperations.upsert_page_chunk(
-                            page_id=db_page_id,
-                            chunk_index=idx,
-                            content=chunk,
-                            embedding=embedding,
-                        )
 
-                    logger.info(f"Stored {len(chunks)} chunks for page: {title}", "GREEN")
+@router.post("/events", response_model=NotionEventResponse, status_code=status.HTTP_202_ACCEPTED)
+async def receive_page_events(
+    payload: NotionPageEvent | list[NotionPageEvent],
+    flush: bool = False,
+):
+    events = payload if isinstance(payload, list) else [payload]
 
-                stored_count += 1
-                logger.info(f"Completed page: {title}", "GREEN")
+    try:
+        integrations: dict[tuple[str, str], dict] = {}
+        accepted = 0
 
-            except Exception as page_error:
-                logger.error(f"Failed to process page {page.get('id')}: {page_error}")
+        for event in events:
+            kind = classify_event(event.type)
+            if kind is None:
                 continue
 
-        logger.info(f"Sync completed: {stored_count}/{len(pages)} pages stored", "GREEN")
+            key = (event.user_id, event.account_id)
+            if key not in integrations:
+                integration = IntegrationOperations.get_integration(
+                    user_id=event.user_id, account_id=event.account_id
+                )
 
-        return NotionSyncResponse(
-            pages_fetched=stored_count,
-            message=f"Successfully stored {stored_count} of {len(pages)} pages",
+                if not integration:
+                    raise HTTPException(
+                        status_code=status.HTTP_404_NOT_FOUND,
+                        detail=f"Notion integration not found for {event.user_id}",
+                    )
+                integrations[key] = integration
+
+            event_debouncer.add(integrations[key], event.page_id, kind)
+            accepted += 1
+
+        # Applies the events right away instead of after the debounce window, unless a sync of
+        # the account is running, they are then applied right after it
+        applied = False
+        if flush:
+            applied = True
+            for integration in integrations.values():
+                applied = await event_debouncer.flush(integration["id"]) and applied
+
+        return NotionEventResponse(
+            accepted=accepted,
+            ignored=len(events) - accepted,
+            pending=event_debouncer.pending_count(),
+            message="Events applied" if applied else "Events queued",
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Failed to sync Notion pages: {e}")
+        logger.error(f"Failed to process Notion events: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to sync Notion pages",
+            detail="Failed to process Notion events",
         )
 
 
 @router.get("/pages", response_model=list[NotionPageResponse])
 async def list_pages(user_id: str):
     try:
-        integration = IntegrationOperations.get_integration(
-            user_id=user_id, app_name="notion"
-        )
+        integration = IntegrationOperations.get_integration(user_id=user_id, app_name="notion")
 
         if not integration:
             raise HTTPException(
@@ -238,13 +297,17 @@ async def search_pages(request: SearchRequest):
     try:
         logger.info(f"Search query: {request.query}", "CYAN")
 
-        query_embedding = embedding_service.generate_embedding(request.query)
+        # Taken before embedding, a query is only compared with chunks of its own model
+        embedding_model = embedding_service.model_name
+        query_embedding = await embedding_service.embed_query(request.query)
 
         logger.info("Performing vector similarity search")
-        results = PageChunkOperations.search_similar_chunks(
+        results = await asyncio.to_thread(
+            PageChunkOperations.search_similar_chunks,
             query_embedding=query_embedding,
             user_id=request.user_id,
             limit=request.top_k,
+            embedding_model=embedding_model,
         )
 
         search_results = [
@@ -255,6 +318,7 @@ async def search_pages(request: SearchRequest):
                 page_url=r["page_url"] or "",
                 similarity_score=r["similarity_score"],
                 chunk_index=r["chunk_index"],
+                heading_path=r.get("heading_path") or [],
             )
             for r in results
         ]
@@ -273,3 +337,13 @@ async def search_pages(request: SearchRequest):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Search failed",
         )
+
+
+@router.get("/embeddings/stats", response_model=EmbeddingStatsResponse)
+async def get_embedding_stats():
+    return EmbeddingStatsResponse(
+        model=embedding_service.model_name,
+        inference=embedding_service.executor.stats.to_dict(),
+        cache=embedding_service.cache.stats.to_dict(),
+        migration=embedding_migrator.stats.to_dict(),
+    )
@@ -0,0 +1,114 @@
+import json
+import threading
+import zlib
+from datetime import datetime
+from typing import Any
+
+from app.config import BLOCK_CACHE_MAX_BYTES, BLOCK_CACHE_PATH, setup_logger
+from app.services.sqlite_store import SQLiteStore, StoreRow
+
+logger = setup_logger(__name__)
+
+BlockKey = tuple[str, str]
+
+# A row whose file URLs expire within this many seconds is fetched again instead
+EXPIRY_MARGIN_SECONDS = 300
+
+
+def files_expire_at(children: list[dict[str, Any]]) -> float | None:
+    """
+    Earliest expiry of the Notion hosted file URLs (images, files, PDFs...) among `children`,
+    as a unix timestamp. None when they only link to external files or have none.
+    """
+    expiries: list[float] = []
+    for block in children:
+        block_data = block.get(block.get("type") or "")
+        if not isinstance(block_data, dict):
+            continue
+
+        expiry_time = (block_data.get("file") or {}).get("expiry_time")
+        if not expiry_time:
+            continue
+        try:
+            expiries.append(datetime.fromisoformat(expiry_time.replace("Z", "+00:00")).timestamp())
+        except ValueError:
+            # Unknown expiry, the URL may already be dead when it is read back
+            expiries.append(0.0)
+
+    return min(expiries) if expiries else None
+
+
+class BlockCache:
+    """
+    On-disk cache of fetched Notion block children, one row per container block keyed by the
+    block id and tagged with the container's last_edited_time. Payloads are zlib compressed
+    JSON. Once the total size passes `max_bytes` the least recently used rows are evicted.
+
+    Notion hosted file URLs are signed and expire after about an hour. A row holding any is
+    stored with the earliest expiry and read as a miss once that is near, so its children are
+    fetched again with fresh URLs.
+    """
+
+    def __init__(self, path: str = BLOCK_CACHE_PATH, max_bytes: int = BLOCK_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._store = SQLiteStore.open(path, "block_children", max_bytes) if self.enabled else None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path) and self.max_bytes > 0
+
+    def get_many(self, keys: list[BlockKey]) -> dict[BlockKey, list[dict[str, Any]]]:
+        if not keys or self._store is None:
+            return {}
+
+        # A block keeps a single row, only the snapshot of its current edit time is a hit
+        found = self._store.load(
+            [block_id for block_id, _ in keys], [last_edited_time for _, last_edited_time in keys]
+        )
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+
+        return {
+            (block_id, last_edited_time): json.loads(zlib.decompress(found[block_id]))
+            for block_id, last_edited_time in keys
+            if block_id in found
+        }
+
+    def put_many(self, entries: dict[BlockKey, list[dict[str, Any]]]) -> None:
+        if not entries or self._store is None:
+            return
+
+        rows = []
+        for (block_id, last_edited_time), children in entries.items():
+            expires_at = files_expire_at(children)
+            rows.append(
+                StoreRow(
+                    key=block_id,
+                    value=zlib.compress(
+                        json.dumps(children, separators=(",", ":")).encode("utf-8")
+                    ),
+                    tag=last_edited_time,
+                    expires_at=expires_at - EXPIRY_MARGIN_SECONDS if expires_at else None,
+                )
+            )
+
+        evicted = self._store.store(rows)
+        if evicted:
+            logger.info(f"Evicted {evicted} cached block lists, {self._store.size} bytes cached")
+
+    def clear(self) -> None:
+        if self._store is not None:
+            self._store.clear()
+
+    def close(self) -> None:
+        if self._store is not None:
+            self._store.release()
+            self._store = None
+
+
+block_cache = BlockCache()
@@ -0,0 +1,244 @@
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from typing import Any
+
+from app.config import CHUNK_UNIT, EMBEDDING_MAX_TOKENS, setup_logger
+from app.services.notion_service import NotionService
+from app.utils import chunk_text, count_tokens, default_chunk_size, measure_texts
+
+logger = setup_logger(__name__)
+
+HEADING_TYPES = {"heading_1": 1, "heading_2": 2, "heading_3": 3}
+LIST_TYPES = {"bulleted_list_item", "numbered_list_item", "to_do"}
+
+
+@dataclass
+class BlockChunk:
+    content: str
+    heading_path: list[str] = field(default_factory=list)
+    block_ids: list[str] = field(default_factory=list)
+    # Size in tokens when chunking by tokens
+    tokens: int | None = None
+
+
+class BlockChunker:
+    """
+    Packs whole Notion blocks into chunks of up to `chunk_size` characters or tokens (`unit`).
+    Blocks are added in document order together with their nesting depth:
+
+    - a heading always starts a new chunk, and every chunk records the headings above it
+    - a block with children (e.g. a toggle) is kept together with its descendants, and a run
+      of list items is kept together, as long as the group fits in one chunk
+    - a group that does not fit is packed block by block, and a single block longer than a
+      chunk is split with `chunk_text`
+
+    `add` only returns chunks that can no longer change, so large pages can be chunked while
+    their blocks are still streaming in.
+    """
+
+    def __init__(self, chunk_size: int | None = None, unit: str = CHUNK_UNIT):
+        self.unit = unit
+        self.chunk_size = max(chunk_size or default_chunk_size(unit)[0], 1)
+        # Joining newlines are whitespace to the tokenizer
+        self._separator = 0 if unit == "tokens" else 1
+        self._headings: list[tuple[int, str]] = []
+        self._ready: list[BlockChunk] = []
+
+        self._units: list[tuple[str, str, int]] = []
+        self._length = 0
+        self._path: list[str] = []
+        self._only_headings = False
+
+        self._group: list[tuple[str, str, int]] = []
+        self._group_length = 0
+        self._group_depth: int | None = None
+        self._group_is_list = False
+
+    def add(
+        self, block: dict[str, Any], depth: int = 0, length: int | None = None
+    ) -> list[BlockChunk]:
+        """
+        `length` is the size of the block's text in the chunker's unit, measured here if left
+        out. Callers adding many blocks at once can measure them in one batch instead.
+        """
+        block_type = block.get("type")
+
+        if self._group_depth is not None and (
+            depth < self._group_depth
+            or (
+                depth == self._group_depth
+                and not (self._group_is_list and block_type in LIST_TYPES)
+            )
+        ):
+            self._close_group()
+
+        text, _ = NotionService.extract_from_single_block(block)
+        if text and length is None:
+            length = measure_texts([text], self.unit)[0]
+
+        if block_type in HEADING_TYPES:
+            level = HEADING_TYPES[block_type]
+            self._close_group()
+            if self._only_headings:
+                if level > self._headings[-1][0]:
+                    # An empty section, its title survives in the heading path of the next one
+                    self._units = []
+                    self._length = 0
+                else:
+                    # Closed without content, the title only survives as a chunk of its own
+                    self._flush(force=True)
+            self._flush()
+
+            self._headings = [heading for heading in self._headings if heading[0] < level]
+            if text:
+                self._headings.append((level, text))
+                # The heading opens the next chunk rather than ending up in a chunk of its own
+                self._append([(block.get("id", ""), text, length)])
+                self._only_headings = True
+            return self._take_ready()
+
+        if not text:
+            return self._take_ready()
+
+        if self._group_depth is None:
+            self._group_depth = depth
+            self._group_is_list = block_type in LIST_TYPES
+
+        self._group.append((block.get("id", ""), text, length))
+        self._group_length += length + self._separator
+
+        # Too large to stay whole anyway, pack what is there so memory stays bounded
+        if self._group_length > self.chunk_size:
+            self._pack(self._group, whole=False)
+            self._group = []
+            self._group_length = 0
+
+        return self._take_ready()
+
+    def finish(self) -> list[BlockChunk]:
+        self._close_group()
+        self._flush(force=True)
+        return self._take_ready()
+
+    def _close_group(self) -> None:
+        if self._group:
+            self._pack(self._group, whole=True)
+        self._group = []
+        self._group_length = 0
+        self._group_depth = None
+        self._group_is_list = False
+
+    def _pack(self, units: list[tuple[str, str, int]], whole: bool) -> None:
+        length = sum(unit_length + self._separator for _, _, unit_length in units)
+
+        if whole and length <= self.chunk_size:
+            if self._length + length > self.chunk_size:
+                self._flush()
+            self._append(units)
+            return
+
+        for block_id, text, unit_length in units:
+            if self._length + unit_length + self._separator > self.chunk_size:
+                self._flush()
+
+            if unit_length + self._separator <= self.chunk_size:
+                self._append([(block_id, text, unit_length)])
+                continue
+
+            # The first piece shares its chunk with a heading still waiting for content, unless
+            # the heading leaves too little room and goes out as a chunk of its own
+            if self.chunk_size - self._length < self.chunk_size // 4:
+                self._flush(force=True)
+            pieces = self._split(text, room=self.chunk_size - self._length)
+            for piece, piece_length in zip(pieces, measure_texts(pieces, self.unit)):
+                self._append([(block_id, piece, piece_length)])
+                self._flush()
+
+    def _split(self, text: str, room: int) -> list[str]:
+        """
+        Splits an oversized block so that only its first piece has to fit in `room`, the
+        remaining pieces get a chunk of their own each.
+        """
+        pieces = chunk_text(text, chunk_size=self.chunk_size, unit=self.unit)
+        if room >= self.chunk_size or len(pieces) < 2:
+            return pieces
+
+        first, *rest = chunk_text(text, chunk_size=room, unit=self.unit)
+        if not rest:
+            return [first]
+
+        # The remainder starts with the second piece, overlap with the first included
+        start = text.find(rest[0], text.find(first) + 1)
+        if start < 0:
+            return pieces
+        return [first, *chunk_text(text[start:], chunk_size=self.chunk_size, unit=self.unit)]
+
+    def _append(self, units: list[tuple[str, str, int]]) -> None:
+        if not self._units:
+            self._path = [text for _, text in self._headings]
+        self._units.extend(units)
+        self._length += sum(unit_length + self._separator for _, _, unit_length in units)
+        self._only_headings = False
+
+    def _flush(self, force: bool = False) -> None:
+        if not self._units or (self._only_headings and not force):
+            return
+
+        self._ready.append(
+            BlockChunk(
+                content="\n".join(text for _, text, _ in self._units),
+                heading_path=self._path,
+                block_ids=list(
+                    dict.fromkeys(block_id for block_id, _, _ in self._units if block_id)
+                ),
+                tokens=self._length if self.unit == "tokens" else None,
+            )
+        )
+        self._units = []
+        self._length = 0
+        self._path = []
+        self._only_headings = False
+
+    def _take_ready(self) -> list[BlockChunk]:
+        ready, self._ready = self._ready, []
+        return ready
+
+
+def walk_blocks(blocks: list[dict[str, Any]], depth: int = 0) -> Iterator[tuple[dict, int]]:
+    for block in blocks:
+        yield (block, depth)
+        if block.get("children"):
+            yield from walk_blocks(block["children"], depth + 1)
+
+
+def chunk_blocks(
+    blocks: list[dict[str, Any]],
+    chunk_size: int | None = None,
+    unit: str = CHUNK_UNIT,
+) -> list[BlockChunk]:
+    chunker = BlockChunker(chunk_size=chunk_size, unit=unit)
+    chunks: list[BlockChunk] = []
+
+    # One tokenizer call for the whole page rather than one per block
+    walked = list(walk_blocks(blocks))
+    texts = [NotionService.extract_from_single_block(block)[0] for block, _ in walked]
+    non_empty = [text for text in texts if text]
+    lengths = iter(measure_texts(non_empty, unit))
+
+    for (block, depth), text in zip(walked, texts):
+        chunks.extend(chunker.add(block, depth, next(lengths) if text else None))
+    chunks.extend(chunker.finish())
+
+    logger.info(f"Packed blocks into {len(chunks)} chunks", "CYAN")
+    return chunks
+
+
+def count_truncated(chunks: list[BlockChunk], max_tokens: int = EMBEDDING_MAX_TOKENS) -> int:
+    """
+    Number of chunks the embedding model would cut short, leaving room for its special tokens.
+    """
+    limit = max_tokens - 2
+    unmeasured = [chunk.content for chunk in chunks if chunk.tokens is None]
+    counts = [chunk.tokens for chunk in chunks if chunk.tokens is not None]
+    counts.extend(count_tokens(unmeasured))
+    return sum(1 for count in counts if count > limit)
@@ -1,3 +1,4 @@
+import asyncio
 import uuid
 from collections.abc import AsyncGenerator, Sequence
 from typing import Annotated, Any
@@ -38,7 +39,7 @@ class ChatService:
     def _create_search_tool(self, user_id: str, chunks_callback):
 
         @tool
-        def search_notion_pages(query: str) -> str:
+        async def search_notion_pages(query: str) -> str:
             """
             Search through user's Notion pages using similarity.
 
@@ -50,12 +51,15 @@ class ChatService:
             """
             logger.info(f"Tool called: search_notion_pages with query: {query}", "CYAN")
 
-            query_embedding = embedding_service.generate_embedding(query)
+            embedding_model = embedding_service.model_name
+            query_embedding = await embedding_service.embed_query(query)
 
-            chunks = PageChunkOperations.search_similar_chunks(
+            chunks = await asyncio.to_thread(
+                PageChunkOperations.search_similar_chunks,
                 query_embedding=query_embedding,
                 user_id=user_id,
                 limit=5,
+                embedding_model=embedding_model,
             )
 
             chunks_callback(chunks)
@@ -65,9 +69,12 @@ class ChatService:
 
             result_parts = []
             for i, chunk in enumerate(chunks, 1):
+                heading_path = chunk.get("heading_path") or []
+                section = f"Section: {' > '.join(heading_path)}\n" if heading_path else ""
                 result_parts.append(
                     f"[Result {i}]\n"
                     f"Page: {chunk['page_title']}\n"
+                    f"{section}"
                     f"Content: {chunk['chunk_content']}\n"
                     f"Relevance: {chunk['similarity_score']:.1%}\n"
                 )
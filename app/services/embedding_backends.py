@@ -0,0 +1,244 @@
+import inspect
+import os
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+from app.config import (
+    EMBED_MAX_BATCH,
+    EMBED_PADDED_TOKEN_BUDGET,
+    EMBEDDING_BACKEND,
+    EMBEDDING_MAX_TOKENS,
+    EMBEDDING_MODEL,
+    EMBEDDING_ONNX_DIR,
+    setup_logger,
+)
+from app.utils import count_tokens, get_tokenizer
+
+logger = setup_logger(__name__)
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+
+
+def plan_batches(lengths: list[int], token_budget: int, max_batch: int) -> list[list[int]]:
+    """
+    Groups text indices into model batches. Texts are sorted by token length so each batch holds
+    texts of similar length, and a batch grows while its padded size (texts times the longest
+    text) stays within `token_budget`: many short texts or a few long ones per batch.
+    """
+    batches: list[list[int]] = []
+    batch: list[int] = []
+
+    for index in sorted(range(len(lengths)), key=lengths.__getitem__):
+        # Sorted ascending, the text being added is the longest in the batch
+        if batch and (len(batch) >= max_batch or (len(batch) + 1) * lengths[index] > token_budget):
+            batches.append(batch)
+            batch = []
+        batch.append(index)
+
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+class EmbeddingBackend(ABC):
+    """
+    A way of running the embedding model. Subclasses run one padded batch in `encode_batch`,
+    `encode` takes any number of texts and returns their vectors in input order.
+    """
+
+    # Identifies the vectors a backend produces, e.g. for cache keys
+    name: str
+
+    def __init__(
+        self,
+        model: str = EMBEDDING_MODEL,
+        max_tokens: int = EMBEDDING_MAX_TOKENS,
+        token_budget: int = EMBED_PADDED_TOKEN_BUDGET,
+        max_batch: int = EMBED_MAX_BATCH,
+    ):
+        self.model_name = model
+        self.max_tokens = max_tokens
+        self.token_budget = max(token_budget, 1)
+        self.max_batch = max(max_batch, 1)
+
+    @abstractmethod
+    def encode_batch(self, texts: list[str]) -> np.ndarray: ...
+
+    def encode(self, texts: list[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        # Padded length as the model sees it, special tokens included and truncation applied
+        lengths = [
+            min(count + 2, self.max_tokens) for count in count_tokens(texts, self.model_name)
+        ]
+
+        vectors: np.ndarray | None = None
+        for batch in plan_batches(lengths, self.token_budget, self.max_batch):
+            encoded = self.encode_batch([texts[index] for index in batch])
+            if vectors is None:
+                vectors = np.empty((len(texts), encoded.shape[1]), dtype=np.float32)
+            vectors[batch] = encoded
+        return vectors
+
+
+def backend_name(backend: str = EMBEDDING_BACKEND, model: str = EMBEDDING_MODEL) -> str:
+    # Vectors from the quantized or exported model are close to, not equal to, the reference
+    return model if backend == "torch" else f"{model}:{backend}"
+
+
+def mean_pool_normalize(hidden: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+    """
+    Mean over the non-padding tokens followed by L2 normalization, the same pooling and
+    normalize modules the sentence-transformers model is configured with.
+    """
+    mask = attention_mask[..., None].astype(np.float32)
+    summed = (hidden * mask).sum(axis=1)
+    pooled = summed / np.clip(mask.sum(axis=1), 1e-9, None)
+    norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+    return (pooled / np.clip(norms, 1e-12, None)).astype(np.float32)
+
+
+class TorchBackend(EmbeddingBackend):
+    """
+    The reference sentence-transformers model on PyTorch.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        from sentence_transformers import SentenceTransformer
+
+        self.name = backend_name("torch", self.model_name)
+        self.model = SentenceTransformer(self.model_name)
+        # The model truncates at its own configured length
+        self.max_tokens = self.model.max_seq_length or self.max_tokens
+
+    def encode_batch(self, texts: list[str]) -> np.ndarray:
+        return self.model.encode(
+            texts, batch_size=len(texts), convert_to_numpy=True, show_progress_bar=False
+        )
+
+
+class OnnxBackend(EmbeddingBackend):
+    """
+    The same transformer exported to ONNX and run on ONNX Runtime, optionally with weights
+    dynamically quantized to int8. Pooling and normalization are applied here to match the
+    reference model. The export happens once and is kept in EMBEDDING_ONNX_DIR.
+    """
+
+    def __init__(self, quantized: bool = False, directory: str = EMBEDDING_ONNX_DIR, **kwargs):
+        super().__init__(**kwargs)
+        try:
+            import onnxruntime
+        except ImportError as e:
+            raise ImportError(
+                "The onnx embedding backends need onnxruntime, install the 'onnx' extra"
+            ) from e
+
+        self.name = backend_name("onnx-int8" if quantized else "onnx", self.model_name)
+        self.tokenizer = get_tokenizer(self.model_name)
+
+        directory = os.path.join(directory, self.model_name.replace("/", "--"))
+        path = export_onnx(self.model_name, directory)
+        if quantized:
+            path = quantize_onnx(path)
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(
+            path, options, providers=["CPUExecutionProvider"]
+        )
+        self._inputs = [node.name for node in self.session.get_inputs()]
+        logger.info(f"Loaded ONNX embedding model: {path}", "GREEN")
+
+    def encode_batch(self, texts: list[str]) -> np.ndarray:
+        encoded = self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.max_tokens,
+            return_tensors="np",
+        )
+        feeds = {name: encoded[name].astype(np.int64) for name in self._inputs}
+        hidden = self.session.run(None, feeds)[0]
+        return mean_pool_normalize(hidden, encoded["attention_mask"])
+
+
+def export_onnx(model_name: str, directory: str) -> str:
+    path = os.path.join(directory, "model.onnx")
+    if os.path.exists(path):
+        return path
+
+    # Exporting needs torch, running the exported model does not
+    import torch
+    from transformers import AutoModel
+
+    class HiddenStates(torch.nn.Module):
+        # Called by keyword, traced positional arguments land on the wrong parameters of some
+        # architectures (e.g. BERT's use_cache)
+        def __init__(self, model: torch.nn.Module):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask):
+            return self.model(input_ids=input_ids, attention_mask=attention_mask).last_hidden_state
+
+    logger.info(f"Exporting {model_name} to ONNX")
+    os.makedirs(directory, exist_ok=True)
+    model = HiddenStates(AutoModel.from_pretrained(model_name)).eval()
+    sample = get_tokenizer(model_name)(["Notion page export sample"], return_tensors="pt")
+
+    dynamic_axes = {
+        "input_ids": {0: "batch", 1: "sequence"},
+        "attention_mask": {0: "batch", 1: "sequence"},
+        "last_hidden_state": {0: "batch", 1: "sequence"},
+    }
+    # Newer torch releases default to the dynamo exporter, which handles dynamic_axes differently
+    options = (
+        {"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}
+    )
+
+    # Written under a temporary name so an interrupted export is never picked up
+    partial = f"{path}.partial"
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (sample["input_ids"], sample["attention_mask"]),
+            partial,
+            input_names=["input_ids", "attention_mask"],
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14,
+            **options,
+        )
+    os.replace(partial, path)
+    return path
+
+
+def quantize_onnx(path: str) -> str:
+    quantized = path.replace(".onnx", "-int8.onnx")
+    if os.path.exists(quantized):
+        return quantized
+
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    logger.info(f"Quantizing {path} to int8")
+    partial = f"{quantized}.partial"
+    quantize_dynamic(path, partial, weight_type=QuantType.QInt8)
+    os.replace(partial, quantized)
+    return quantized
+
+
+def load_backend(
+    backend: str = EMBEDDING_BACKEND,
+    model: str = EMBEDDING_MODEL,
+    max_tokens: int = EMBEDDING_MAX_TOKENS,
+) -> EmbeddingBackend:
+    if backend == "torch":
+        return TorchBackend(model=model, max_tokens=max_tokens)
+    if backend == "onnx":
+        return OnnxBackend(model=model, max_tokens=max_tokens)
+    if backend == "onnx-int8":
+        return OnnxBackend(quantized=True, model=model, max_tokens=max_tokens)
+    raise ValueError(f"Unknown embedding backend {backend!r}, expected one of {BACKENDS}")
@@ -0,0 +1,114 @@
+import asyncio
+import inspect
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from functools import partial
+
+import numpy as np
+
+from app.config import (
+    EMBED_BATCH_SIZE,
+    EMBED_BATCH_TOKENS,
+    EMBED_FLUSH_INTERVAL,
+    setup_logger,
+)
+from app.services.embedding_service import embedding_service
+from app.services.micro_batcher import MicroBatcher
+from app.services.sync_scheduler import PRIORITIES, SyncPriority
+
+logger = setup_logger(__name__)
+
+
+@dataclass
+class BatcherStats:
+    batches: int = 0
+    texts: int = 0
+    tokens: int = 0
+    encode_seconds: float = 0.0
+
+    @property
+    def avg_batch_size(self) -> float:
+        return self.texts / self.batches if self.batches else 0.0
+
+    @property
+    def texts_per_second(self) -> float:
+        return self.texts / self.encode_seconds if self.encode_seconds else 0.0
+
+
+def estimate_tokens(text: str) -> int:
+    # Roughly four characters per token for English prose, only used to size batches
+    return len(text) // 4 + 1
+
+
+class EmbeddingBatcher:
+    """
+    Collects texts from many concurrent callers (pages) into shared model batches. A batch is
+    encoded once it holds `batch_size` texts or `token_budget` estimated tokens, or once its
+    oldest text has waited `flush_interval` seconds. Each caller gets its own vectors back in
+    the order it submitted them.
+
+    Texts are batched per priority and `embed_fn` is called with the priority of its batch, so
+    a bulk import's texts never hold up an interactive caller's batch.
+    """
+
+    def __init__(
+        self,
+        embed_fn: (
+            Callable[[list[str], SyncPriority], np.ndarray]
+            | Callable[[list[str], SyncPriority], Awaitable[np.ndarray]]
+            | None
+        ) = None,
+        batch_size: int = EMBED_BATCH_SIZE,
+        token_budget: int = EMBED_BATCH_TOKENS,
+        flush_interval: float = EMBED_FLUSH_INTERVAL,
+    ):
+        self._embed_fn = embed_fn or embedding_service.embed_texts
+        self.batch_size = max(batch_size, 1)
+        self.token_budget = max(token_budget, 1)
+        self.flush_interval = max(flush_interval, 0.0)
+        self.stats = BatcherStats()
+
+        # One batch per priority is encoded at a time, texts arriving meanwhile fill the next one
+        self._lanes: dict[SyncPriority, MicroBatcher[str, np.ndarray]] = {
+            priority: MicroBatcher(
+                partial(self._encode, priority=priority),
+                max_items=self.batch_size,
+                max_weight=self.token_budget,
+                flush_interval=self.flush_interval,
+            )
+            for priority in PRIORITIES
+        }
+
+    async def embed(
+        self, texts: list[str], priority: SyncPriority = "interactive"
+    ) -> list[np.ndarray]:
+        return await self._lanes[priority].submit_many(
+            texts, [estimate_tokens(text) for text in texts]
+        )
+
+    async def close(self) -> None:
+        for lane in self._lanes.values():
+            await lane.close()
+
+    async def _encode(self, texts: list[str], priority: SyncPriority) -> np.ndarray:
+        started = time.perf_counter()
+
+        try:
+            # Blocking embed functions run in a thread, async ones bring their own executor
+            if inspect.iscoroutinefunction(self._embed_fn):
+                embeddings = await self._embed_fn(texts, priority)
+            else:
+                embeddings = await asyncio.to_thread(self._embed_fn, texts, priority)
+        except Exception as e:
+            logger.error(f"Embedding batch of {len(texts)} texts failed: {e}")
+            raise
+
+        self.stats.batches += 1
+        self.stats.texts += len(texts)
+        self.stats.tokens += sum(estimate_tokens(text) for text in texts)
+        self.stats.encode_seconds += time.perf_counter() - started
+        return embeddings
+
+
+embedding_batcher = EmbeddingBatcher()
@@ -0,0 +1,131 @@
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+
+import numpy as np
+
+from app.config import (
+    EMBED_CACHE_DISK_MB,
+    EMBED_CACHE_MEMORY_ITEMS,
+    EMBED_CACHE_PATH,
+    setup_logger,
+)
+from app.services.sqlite_store import SQLiteStore, StoreRow
+
+logger = setup_logger(__name__)
+
+
+@dataclass
+class CacheStats:
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    disk_evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0
+
+    def to_dict(self) -> dict:
+        return {**asdict(self), "hit_rate": round(self.hit_rate, 3)}
+
+
+def normalize_text(text: str) -> str:
+    # Texts that only differ in unicode form or whitespace embed the same
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def cache_key(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\0{normalize_text(text)}".encode()).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Two tier cache of embeddings keyed by model name and normalized text hash: a bounded
+    in-memory LRU in front of a SQLite file holding float32 vectors. The file is trimmed back
+    to 90% of `disk_mb`, least recently used entries first, whenever it grows past it.
+
+    Caches of different models pointed at the same file share it, `disk_mb` then bounds all of
+    their entries together (the first cache to open the file sets it).
+
+    Either tier is disabled by setting its size to 0. Safe to use from several threads.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        memory_items: int = EMBED_CACHE_MEMORY_ITEMS,
+        disk_mb: float = EMBED_CACHE_DISK_MB,
+        path: str = EMBED_CACHE_PATH,
+    ):
+        self.model = model
+        self.memory_items = max(memory_items, 0)
+        self.disk_bytes = int(max(disk_mb, 0) * 1024 * 1024)
+        self.path = path
+        self.stats = CacheStats()
+
+        self._memory: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = (
+            SQLiteStore.open(path, "embeddings", self.disk_bytes) if self.disk_bytes else None
+        )
+
+    def get_many(self, texts: list[str]) -> list[np.ndarray | None]:
+        keys = [cache_key(self.model, text) for text in texts]
+        found: dict[str, np.ndarray] = {}
+
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+
+            missing = [key for key in dict.fromkeys(keys) if key not in found]
+            blobs = self._disk.load(missing) if self._disk and missing else {}
+            on_disk = {key: np.frombuffer(blob, dtype=np.float32) for key, blob in blobs.items()}
+            for key, vector in on_disk.items():
+                self._remember(key, vector)
+            found.update(on_disk)
+
+            for key in keys:
+                if key in on_disk:
+                    self.stats.disk_hits += 1
+                elif key in found:
+                    self.stats.memory_hits += 1
+                else:
+                    self.stats.misses += 1
+
+        return [found.get(key) for key in keys]
+
+    def put_many(self, texts: list[str], vectors: np.ndarray) -> None:
+        # Copied, a row kept in memory would otherwise keep its whole batch array alive
+        entries = {
+            cache_key(self.model, text): np.array(vector, dtype=np.float32)
+            for text, vector in zip(texts, vectors)
+        }
+
+        with self._lock:
+            for key, vector in entries.items():
+                self._remember(key, vector)
+            if self._disk and entries:
+                self.stats.disk_evictions += self._disk.store(
+                    StoreRow(key, vector.tobytes()) for key, vector in entries.items()
+                )
+
+    def close(self) -> None:
+        with self._lock:
+            if self._disk is not None:
+                self._disk.release()
+                self._disk = None
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        if not self.memory_items:
+            return
+
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
@@ -0,0 +1,208 @@
+import asyncio
+from dataclasses import asdict, dataclass
+from typing import Any, Literal
+
+from app.config import (
+    EMBED_MIGRATION_BATCH_SIZE,
+    EMBED_MIGRATION_INTERVAL,
+    EMBEDDING_MAX_TOKENS,
+    EMBEDDING_TARGET_DIMS,
+    EMBEDDING_TARGET_MAX_TOKENS,
+    EMBEDDING_TARGET_MODEL,
+    setup_logger,
+)
+from app.database.operations import EmbeddingModelOperations, PageChunkOperations
+from app.services.embedding_service import EmbeddingService, embedding_service
+from app.services.sync_scheduler import cpu_slots
+
+logger = setup_logger(__name__)
+
+MigrationStatus = Literal["idle", "migrating", "done", "failed"]
+
+# The migrator's lane in the CPU slots, it only gets a slot when no sync is waiting for one
+MIGRATION_USER_ID = "embedding-migration"
+# Seconds to wait after a database error before the next pass
+RETRY_SECONDS = 30.0
+
+
+@dataclass
+class MigrationStats:
+    target: str = ""
+    status: MigrationStatus = "idle"
+    passes: int = 0
+    batches: int = 0
+    chunks_embedded: int = 0
+    chunks_skipped: int = 0
+    total_chunks: int = 0
+    covered_chunks: int = 0
+    last_error: str | None = None
+
+    @property
+    def coverage(self) -> float:
+        return self.covered_chunks / self.total_chunks if self.total_chunks else 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        return {**asdict(self), "coverage": round(self.coverage, 4)}
+
+
+class EmbeddingMigrator:
+    """
+    Re-embeds every chunk with the `target` model in the background, into the target's own
+    vector column. Batches of `batch_size` chunks run in a bulk CPU slot and the bulk inference
+    lane with `interval` seconds between them, so syncs and searches keep priority.
+
+    A pass over all chunks that finds none left to embed cuts over to the target, which becomes
+    the active model. The target is loaded beforehand, the process's embedding service switches
+    to it as soon as the cutover returns. Other processes keep searching the previous model's
+    column until they notice. Chunks rewritten by syncs in the meantime lose their vector from
+    the target and are picked up again by the next pass.
+    """
+
+    def __init__(
+        self,
+        target: str = EMBEDDING_TARGET_MODEL,
+        dims: int = EMBEDDING_TARGET_DIMS,
+        max_tokens: int = EMBEDDING_TARGET_MAX_TOKENS,
+        batch_size: int = EMBED_MIGRATION_BATCH_SIZE,
+        interval: float = EMBED_MIGRATION_INTERVAL,
+    ):
+        self.target = target
+        self.dims = dims
+        self.max_tokens = max_tokens
+        self.batch_size = max(batch_size, 1)
+        self.interval = max(interval, 0.0)
+        self.stats = MigrationStats(target=target)
+
+        self._service: EmbeddingService | None = None
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+        # Once switched to, the target's cache belongs to the embedding service
+        if self._service is not None and embedding_service.cache is not self._service.cache:
+            self._service.cache.close()
+
+    async def _run(self) -> None:
+        try:
+            active = await asyncio.to_thread(EmbeddingModelOperations.get_active_model)
+
+            # Cut over by another process, or earlier by this one before a restart
+            if active and active != embedding_service.model_name:
+                await self._switch(active)
+
+            if not self.target or self.target == active:
+                self.stats.status = "done" if self.target else "idle"
+                return
+
+            self._service = EmbeddingService(
+                self.target, max_tokens=self.max_tokens, priority="bulk"
+            )
+            dims = (await self._service.embed_texts(["embedding model check"])).shape[1]
+            if dims != self.dims:
+                raise ValueError(f"{self.target} returns {dims} dimensions, expected {self.dims}")
+
+        except Exception as e:
+            logger.error(f"Failed to start the embedding migration: {e}")
+            self.stats.status = "failed"
+            self.stats.last_error = str(e)
+            return
+
+        self.stats.status = "migrating"
+        logger.info(f"Re-embedding chunks with {self.target}", "CYAN")
+
+        while True:
+            try:
+                if await self._migrate_pass():
+                    self.stats.status = "done"
+                    return
+            except Exception as e:
+                logger.error(f"Embedding migration to {self.target} failed, retrying: {e}")
+                self.stats.last_error = str(e)
+                await asyncio.sleep(RETRY_SECONDS)
+
+    async def _migrate_pass(self) -> bool:
+        """
+        Embeds every chunk still missing a vector from the target once. Returns True once the
+        target model is the active one.
+        """
+        active = await asyncio.to_thread(EmbeddingModelOperations.get_active_model)
+        if active == self.target:
+            await self._switch(self.target)
+            return True
+
+        await asyncio.to_thread(EmbeddingModelOperations.register_model, self.target, self.dims)
+        self.stats.total_chunks, self.stats.covered_chunks = await asyncio.to_thread(
+            EmbeddingModelOperations.get_coverage, self.target
+        )
+        self.stats.passes += 1
+
+        found = 0
+        after_id = None
+        while True:
+            rows = await asyncio.to_thread(
+                PageChunkOperations.get_chunks_missing_embedding,
+                self.target,
+                after_id,
+                self.batch_size,
+            )
+            if not rows:
+                break
+
+            found += len(rows)
+            after_id = rows[-1]["id"]
+            await self._migrate_batch(rows)
+            await asyncio.sleep(self.interval)
+
+        if found:
+            # Chunks rewritten during the pass are only seen by the next one
+            return False
+
+        # Loaded first, the switch right after the cutover must not wait on it
+        service = await self._load(self.target)
+        covered = await asyncio.to_thread(EmbeddingModelOperations.cutover, self.target)
+        embedding_service.use_model(service)
+        logger.info(f"Cut over {covered} chunks to embedding model {self.target}", "GREEN")
+        return True
+
+    async def _migrate_batch(self, rows: list[dict[str, Any]]) -> None:
+        async with cpu_slots.slot(MIGRATION_USER_ID, "bulk"):
+            vectors = await self._service.embed_texts([row["content"] for row in rows])
+
+        written = await asyncio.to_thread(
+            PageChunkOperations.write_model_embeddings,
+            self.target,
+            [
+                {"id": row["id"], "content_hash": row["content_hash"], "embedding": vector}
+                for row, vector in zip(rows, vectors)
+            ],
+        )
+
+        self.stats.batches += 1
+        self.stats.chunks_embedded += written
+        # Changed while being embedded
+        self.stats.chunks_skipped += len(rows) - written
+        self.stats.covered_chunks += written
+
+    async def _switch(self, tag: str) -> None:
+        if tag != embedding_service.model_name:
+            embedding_service.use_model(await self._load(tag))
+
+    async def _load(self, tag: str) -> EmbeddingService:
+        if self._service is None or self._service.model_name != tag:
+            max_tokens = self.max_tokens if tag == self.target else EMBEDDING_MAX_TOKENS
+            self._service = EmbeddingService(tag, max_tokens=max_tokens, priority="bulk")
+
+        # Loaded on the inference executor, the event loop keeps serving requests meanwhile
+        await self._service.executor.run(self._service.get_model)
+        return self._service
+
+
+embedding_migrator = EmbeddingMigrator()
@@ -1,32 +1,155 @@
-from sentence_transformers import SentenceTransformer
+import threading
 
-from app.config import EMBEDDING_MODEL, setup_logger
+import numpy as np
+
+from app.config import (
+    EMBEDDING_BACKEND,
+    EMBEDDING_MAX_TOKENS,
+    EMBEDDING_MODEL,
+    QUERY_BATCH_SIZE,
+    QUERY_MAX_WAIT_MS,
+    setup_logger,
+)
+from app.services.embedding_backends import EmbeddingBackend, backend_name, load_backend
+from app.services.embedding_cache import EmbeddingCache
+from app.services.inference_executor import InferenceExecutor, inference_executor
+from app.services.sync_scheduler import SyncPriority
 
 logger = setup_logger(__name__)
 
 
 class EmbeddingService:
-    _model = None
-
-    @classmethod
-    def get_model(cls) -> SentenceTransformer:
-        if cls._model is None:
-            logger.info(f"Loading embedding model: {EMBEDDING_MODEL}")
-            cls._model = SentenceTransformer(EMBEDDING_MODEL)
-            logger.info("Embedding model loaded successfully", "GREEN")
-        return cls._model
-
-    @classmethod
-    def generate_embedding(cls, text: str) -> list[float]:
-        model = cls.get_model()
-        embedding = model.encode(text, convert_to_tensor=False)
-        return embedding.tolist()
-
-    @classmethod
-    def generate_embeddings_batch(cls, texts: list[str]) -> list[list[float]]:
-        model = cls.get_model()
-        embeddings = model.encode(texts, convert_to_tensor=False, show_progress_bar=True)
-        return [emb.tolist() for emb in embeddings]
+    """
+    Embeds texts with one model. `model_name` is the tag the chunk embeddings are stored
+    under, vectors of different tags are never compared. Encodes run in the executor's
+    `priority` lane unless a caller asks for another one.
+    """
+
+    def __init__(
+        self,
+        model: str = EMBEDDING_MODEL,
+        backend: str = EMBEDDING_BACKEND,
+        max_tokens: int = EMBEDDING_MAX_TOKENS,
+        executor: InferenceExecutor = inference_executor,
+        priority: SyncPriority = "interactive",
+    ):
+        self.model_name = model
+        self.backend = backend
+        self.max_tokens = max_tokens
+        self.executor = executor
+        self.priority = priority
+        self.cache = EmbeddingCache(backend_name(backend, model))
+
+        self._model: EmbeddingBackend | None = None
+        self._model_lock = threading.Lock()
+        self._query_batcher = None
+
+    def get_model(self) -> EmbeddingBackend:
+        # Several inference threads may ask for the model at once, it is only loaded once
+        with self._model_lock:
+            if self._model is None:
+                logger.info(
+                    f"Loading embedding model: {backend_name(self.backend, self.model_name)}"
+                )
+                self._model = load_backend(self.backend, self.model_name, self.max_tokens)
+                logger.info("Embedding model loaded successfully", "GREEN")
+            return self._model
+
+    def use_model(self, other: "EmbeddingService") -> None:
+        """
+        Switches this service over to `other`'s model, e.g. after a cutover to it. Callers keep
+        their reference to this service, texts already being encoded finish on the old model.
+        """
+        model = other.get_model()
+        with self._model_lock:
+            previous, previous_cache = self.model_name, self.cache
+            self.model_name = other.model_name
+            self.backend = other.backend
+            self.max_tokens = other.max_tokens
+            self.cache = other.cache
+            self._model = model
+        # A batch still in flight on the old model only fills its memory tier from here on
+        previous_cache.close()
+        logger.info(f"Embedding model switched from {previous} to {self.model_name}", "GREEN")
+
+    async def preload(self) -> None:
+        try:
+            await self.executor.run(self.get_model)
+        except Exception as e:
+            # Loaded again on first use, a slow start beats a failed one
+            logger.error(f"Failed to preload embedding model: {e}")
+
+    def generate_embedding(self, text: str) -> np.ndarray:
+        return self.generate_embeddings_batch([text])[0]
+
+    async def embed_texts(
+        self, texts: list[str], priority: SyncPriority | None = None
+    ) -> np.ndarray:
+        """
+        Awaitable `generate_embeddings_batch`, run on the inference executor in the `priority`
+        lane (the service's own by default).
+        """
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        return await self.executor.run(
+            self.generate_embeddings_batch, texts, priority=priority or self.priority
+        )
+
+    async def embed_query(self, text: str) -> np.ndarray:
+        """
+        Embeds a search query. Queries arriving together from concurrent requests are encoded
+        in one batch of up to QUERY_BATCH_SIZE, the first waits at most QUERY_MAX_WAIT_MS.
+        """
+        if self._query_batcher is None:
+            # Imported here, the batcher module builds on this one
+            from app.services.embedding_batcher import EmbeddingBatcher
+
+            self._query_batcher = EmbeddingBatcher(
+                embed_fn=self.embed_texts,
+                batch_size=QUERY_BATCH_SIZE,
+                flush_interval=QUERY_MAX_WAIT_MS / 1000,
+            )
+        return (await self._query_batcher.embed([text]))[0]
+
+    async def close(self) -> None:
+        if self._query_batcher is not None:
+            await self._query_batcher.close()
+        self.executor.shutdown()
+        self.cache.close()
+
+    def generate_embeddings_batch(self, texts: list[str]) -> np.ndarray:
+        """
+        One float32 row per text, in order. Vectors stay in NumPy buffers all the way to the
+        database, where they are written in pgvector's text form.
+        """
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        # Cache and model are taken together, a model switch must not mix their vectors
+        self.get_model()
+        with self._model_lock:
+            model, cache = self._model, self.cache
+
+        cached = cache.get_many(texts)
+
+        # Only texts the cache has never seen reach the model, each of them once
+        missing = list(dict.fromkeys(t for t, emb in zip(texts, cached) if emb is None))
+        encoded = None
+        if missing:
+            hits = sum(1 for emb in cached if emb is not None)
+            logger.info(f"Embedding {len(missing)} texts, {hits} cached")
+            encoded = model.encode(missing)
+            cache.put_many(missing, encoded)
+
+        if encoded is not None and len(missing) == len(texts):
+            return encoded
+
+        dims = encoded.shape[1] if encoded is not None else len(cached[0])
+        embeddings = np.empty((len(texts), dims), dtype=np.float32)
+        rows = {text: row for row, text in enumerate(missing)}
+        for i, (text, emb) in enumerate(zip(texts, cached)):
+            embeddings[i] = emb if emb is not None else encoded[rows[text]]
+        return embeddings
 
 
 embedding_service = EmbeddingService()
@@ -0,0 +1,132 @@
+import asyncio
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, TypeVar
+
+from app.config import EMBED_INFERENCE_QUEUE_DEPTH, EMBED_INFERENCE_WORKERS, setup_logger
+from app.services.sync_scheduler import FairLimiter, SyncPriority
+
+logger = setup_logger(__name__)
+
+T = TypeVar("T")
+
+
+@dataclass
+class InferenceStats:
+    calls: int = 0
+    failed: int = 0
+    queued: int = 0
+    running: int = 0
+    queue_wait_seconds: float = 0.0
+    inference_seconds: float = 0.0
+    max_queue_wait_seconds: float = 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        calls = self.calls or 1
+        return {
+            "calls": self.calls,
+            "failed": self.failed,
+            "queued": self.queued,
+            "running": self.running,
+            "avg_queue_wait_ms": round(self.queue_wait_seconds / calls * 1000, 2),
+            "max_queue_wait_ms": round(self.max_queue_wait_seconds * 1000, 2),
+            "avg_inference_ms": round(self.inference_seconds / calls * 1000, 2),
+        }
+
+
+class InferenceExecutor:
+    """
+    Dedicated pool of `workers` threads for model inference, so encodes never run on the event
+    loop or compete with the default executor used for database calls. Threads share a single
+    preloaded model, the heavy lifting happens in torch with the GIL released.
+
+    At most `queue_depth` calls wait for a free worker, further callers wait for admission. A
+    freed worker goes to a waiting interactive call before any bulk one (e.g. re-embedding every
+    chunk), calls are only handed to the threads once a worker is free. Time spent waiting
+    (admission included) and time spent in the model are recorded separately.
+    """
+
+    def __init__(
+        self,
+        workers: int = EMBED_INFERENCE_WORKERS,
+        queue_depth: int = EMBED_INFERENCE_QUEUE_DEPTH,
+    ):
+        self.workers = max(workers, 1)
+        self.queue_depth = max(queue_depth, 0)
+        self.stats = InferenceStats()
+
+        self._pool: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self._admission = asyncio.Semaphore(self.workers + self.queue_depth)
+        self._slots = FairLimiter("inference", self.workers)
+
+    async def run(
+        self, fn: Callable[..., T], *args: Any, priority: SyncPriority = "interactive"
+    ) -> T:
+        submitted = time.perf_counter()
+        # Set by the worker, a call cancelled while still waiting leaves the queue here instead
+        started = threading.Event()
+        with self._lock:
+            self.stats.queued += 1
+
+        try:
+            # One lane per priority, there are no users to rotate between here
+            async with self._admission, self._slots.slot(priority, priority):
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(
+                    self._get_pool(), self._timed, fn, args, submitted, started
+                )
+        finally:
+            with self._lock:
+                if not started.is_set():
+                    started.set()
+                    self.stats.queued -= 1
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="embedding-inference"
+            )
+            logger.info(f"Started embedding inference pool with {self.workers} workers", "CYAN")
+        return self._pool
+
+    def _timed(
+        self, fn: Callable[..., T], args: tuple, submitted: float, started: threading.Event
+    ) -> T:
+        with self._lock:
+            if started.is_set():
+                # Given up on while queued
+                raise asyncio.CancelledError()
+            started.set()
+            start = time.perf_counter()
+            queue_wait = start - submitted
+            self.stats.queued -= 1
+            self.stats.running += 1
+            self.stats.queue_wait_seconds += queue_wait
+            self.stats.max_queue_wait_seconds = max(self.stats.max_queue_wait_seconds, queue_wait)
+
+        failed = False
+        try:
+            return fn(*args)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            with self._lock:
+                self.stats.running -= 1
+                self.stats.calls += 1
+                self.stats.failed += failed
+                self.stats.inference_seconds += time.perf_counter() - start
+
+
+# Shared by every embedding model. Bulk syncs and re-embedding runs take the bulk lane and only
+# get a worker no search or interactive sync is waiting for
+inference_executor = InferenceExecutor()
@@ -0,0 +1,171 @@
+import asyncio
+import inspect
+import time
+from collections.abc import AsyncIterable, Awaitable, Callable, Iterable
+from dataclasses import dataclass
+from typing import Any
+
+from app.config import SYNC_STAGE_QUEUE_SIZE, setup_logger
+
+logger = setup_logger(__name__)
+
+# Marks the end of a stage's input, one is queued per downstream worker
+_DONE = object()
+
+
+@dataclass
+class Stage:
+    name: str
+    handler: Callable[[Any], Awaitable[Any]]
+    concurrency: int = 1
+    queue_size: int = SYNC_STAGE_QUEUE_SIZE
+
+    def __post_init__(self) -> None:
+        self.concurrency = max(self.concurrency, 1)
+        self.queue_size = max(self.queue_size, 1)
+
+
+@dataclass
+class StageStats:
+    name: str
+    concurrency: int
+    items_in: int = 0
+    items_out: int = 0
+    items_failed: int = 0
+    busy_seconds: float = 0.0
+    idle_seconds: float = 0.0
+    blocked_seconds: float = 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "concurrency": self.concurrency,
+            "items_in": self.items_in,
+            "items_out": self.items_out,
+            "items_failed": self.items_failed,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "idle_seconds": round(self.idle_seconds, 3),
+            "blocked_seconds": round(self.blocked_seconds, 3),
+            "avg_item_seconds": (
+                round(self.busy_seconds / self.items_in, 3) if self.items_in else 0.0
+            ),
+        }
+
+
+class IngestionPipeline:
+    """
+    Chain of async stages connected by bounded queues. Every stage runs its own pool of workers
+    and a full downstream queue blocks the upstream workers, so throughput is set by the slowest
+    stage rather than by the sum of all of them.
+
+    A handler returns the item to pass downstream, or None to drop it. The return value of the
+    last stage is ignored. Exceptions are reported through `on_error` (a plain or async
+    callable) and only drop the item that raised.
+
+    Per-stage timings are collected in `stats`: `busy` is time spent in the handler, `idle` is
+    time spent waiting for input and `blocked` is time spent waiting on a full downstream queue.
+    """
+
+    def __init__(
+        self,
+        stages: list[Stage],
+        on_error: Callable[[Any, str, Exception], Awaitable[None] | None] | None = None,
+    ):
+        if not stages:
+            raise ValueError("Pipeline needs at least one stage")
+
+        self.stages = stages
+        self.on_error = on_error
+        self.stats = {stage.name: StageStats(stage.name, stage.concurrency) for stage in stages}
+
+    async def run(self, items: Iterable[Any] | AsyncIterable[Any]) -> None:
+        """
+        Items may come from an async iterable, stages then start on the first item while the
+        source is still producing. An error raised by the source is re-raised once the items
+        already fed in have drained through the pipeline.
+        """
+        queues = [asyncio.Queue(maxsize=stage.queue_size) for stage in self.stages]
+        source_error: Exception | None = None
+
+        async def feed() -> None:
+            nonlocal source_error
+            try:
+                if isinstance(items, AsyncIterable):
+                    async for item in items:
+                        await queues[0].put(item)
+                else:
+                    for item in items:
+                        await queues[0].put(item)
+            except Exception as e:
+                source_error = e
+
+            for _ in range(self.stages[0].concurrency):
+                await queues[0].put(_DONE)
+
+        await asyncio.gather(
+            feed(),
+            *(self._run_stage(index, queues) for index in range(len(self.stages))),
+        )
+
+        if source_error is not None:
+            raise source_error
+
+    def stage_summary(self) -> list[dict[str, Any]]:
+        return [stats.to_dict() for stats in self.stats.values()]
+
+    async def _run_stage(self, index: int, queues: list[asyncio.Queue]) -> None:
+        stage = self.stages[index]
+        stats = self.stats[stage.name]
+        inbox = queues[index]
+        outbox = queues[index + 1] if index + 1 < len(queues) else None
+
+        async def worker() -> None:
+            while True:
+                started = time.perf_counter()
+                item = await inbox.get()
+                stats.idle_seconds += time.perf_counter() - started
+
+                if item is _DONE:
+                    return
+
+                stats.items_in += 1
+                started = time.perf_counter()
+                try:
+                    result = await stage.handler(item)
+                except Exception as e:
+                    stats.items_failed += 1
+                    await self._report_error(item, stage.name, e)
+                    continue
+                finally:
+                    stats.busy_seconds += time.perf_counter() - started
+
+                # The last stage has nowhere to pass results on, every success counts as output
+                if outbox is None:
+                    stats.items_out += 1
+                    continue
+
+                if result is None:
+                    continue
+
+                stats.items_out += 1
+                started = time.perf_counter()
+                await outbox.put(result)
+                stats.blocked_seconds += time.perf_counter() - started
+
+        await asyncio.gather(*(worker() for _ in range(stage.concurrency)))
+
+        if outbox is not None:
+            for _ in range(self.stages[index + 1].concurrency):
+                await outbox.put(_DONE)
+
+    async def _report_error(self, item: Any, stage_name: str, error: Exception) -> None:
+        if self.on_error is None:
+            logger.error(f"Pipeline stage {stage_name} failed: {error}")
+            return
+
+        try:
+            result = self.on_error(item, stage_name, error)
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            logger.error(f"Pipeline error handler failed in stage {stage_name}: {e}")
@@ -0,0 +1,171 @@
+import asyncio
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable, Sequence
+from dataclasses import dataclass
+from typing import Any, Generic, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+@dataclass
+class _PendingItem(Generic[T]):
+    item: T
+    weight: int
+    enqueued_at: float
+    future: asyncio.Future
+
+
+class MicroBatcher(Generic[T, R]):
+    """
+    Collects items from many concurrent callers into shared batches for `run_batch`. A batch is
+    sent once it holds `max_items` items or `max_weight` weight, or once its oldest item has
+    waited `flush_interval` seconds. Up to `max_in_flight` batches run at once, items arriving
+    meanwhile keep filling the next one.
+
+    `run_batch` returns one result per item, in order. An exception in place of a result only
+    fails the caller of that item, an exception raised by `run_batch` fails the whole batch.
+    Items whose caller gave up (e.g. a cancelled sync) are dropped before their batch is sent.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[list[T]], Awaitable[Sequence[R | Exception]]],
+        max_items: int,
+        flush_interval: float,
+        max_weight: int | None = None,
+        max_in_flight: int = 1,
+    ):
+        self._run_batch = run_batch
+        self.max_items = max(max_items, 1)
+        self.max_weight = max(max_weight, 1) if max_weight is not None else None
+        self.flush_interval = max(flush_interval, 0.0)
+
+        self._pending: deque[_PendingItem[T]] = deque()
+        self._pending_weight = 0
+        self._has_pending = asyncio.Event()
+        self._batch_ready = asyncio.Event()
+        self._flusher: asyncio.Task | None = None
+        self._running: set[asyncio.Task] = set()
+        self._in_flight = asyncio.Semaphore(max(max_in_flight, 1))
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    async def submit(self, item: T, weight: int = 1) -> R:
+        return (await self.submit_many([item], [weight]))[0]
+
+    async def submit_many(self, items: list[T], weights: list[int] | None = None) -> list[R]:
+        """
+        Queues `items` together and returns their results in the same order.
+        """
+        if not items:
+            return []
+
+        loop = asyncio.get_running_loop()
+        now = time.monotonic()
+        futures = []
+
+        for item, weight in zip(items, weights or [1] * len(items)):
+            future = loop.create_future()
+            self._pending.append(_PendingItem(item, weight, now, future))
+            self._pending_weight += weight
+            futures.append(future)
+
+        self._ensure_flusher()
+        self._has_pending.set()
+        if self._is_batch_ready():
+            self._batch_ready.set()
+
+        return list(await asyncio.gather(*futures))
+
+    async def close(self) -> None:
+        if self._flusher is not None:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+
+        for task in self._running:
+            task.cancel()
+        await asyncio.gather(*self._running, return_exceptions=True)
+
+        for pending in self._pending:
+            if not pending.future.done():
+                pending.future.cancel()
+        self._pending.clear()
+        self._pending_weight = 0
+
+    def _ensure_flusher(self) -> None:
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    def _is_batch_ready(self) -> bool:
+        return len(self._pending) >= self.max_items or (
+            self.max_weight is not None and self._pending_weight >= self.max_weight
+        )
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await self._has_pending.wait()
+            await self._in_flight.acquire()
+
+            # Give other callers until the oldest pending item hits its deadline to fill the batch
+            self._batch_ready.clear()
+            if self._pending and not self._is_batch_ready():
+                timeout = self.flush_interval - (time.monotonic() - self._pending[0].enqueued_at)
+                if timeout > 0:
+                    try:
+                        await asyncio.wait_for(self._batch_ready.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+
+            batch = self._take_batch()
+            if not self._pending:
+                self._has_pending.clear()
+
+            if not batch:
+                self._in_flight.release()
+                continue
+
+            task = asyncio.create_task(self._send(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    def _take_batch(self) -> list[_PendingItem[T]]:
+        batch: list[_PendingItem[T]] = []
+        weight = 0
+
+        while self._pending and len(batch) < self.max_items:
+            pending = self._pending[0]
+            if batch and self.max_weight is not None and weight + pending.weight > self.max_weight:
+                break
+
+            self._pending.popleft()
+            self._pending_weight -= pending.weight
+            if pending.future.cancelled():
+                continue
+
+            batch.append(pending)
+            weight += pending.weight
+
+        return batch
+
+    async def _send(self, batch: list[_PendingItem[T]]) -> None:
+        try:
+            results: Sequence[Any] = await self._run_batch([pending.item for pending in batch])
+        except Exception as e:
+            for pending in batch:
+                if not pending.future.done():
+                    pending.future.set_exception(e)
+            return
+        finally:
+            self._in_flight.release()
+
+        for pending, result in zip(batch, results):
+            if pending.future.done():
+                continue
+            if isinstance(result, Exception):
+                pending.future.set_exception(result)
+            else:
+                pending.future.set_result(result)
@@ -0,0 +1,183 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Literal
+
+from app.config import EVENT_DEBOUNCE_MAX_SECONDS, EVENT_DEBOUNCE_SECONDS, setup_logger
+from app.services.sync_jobs import SyncJobManager, sync_job_manager
+from app.services.sync_service import NotionSyncService
+
+logger = setup_logger(__name__)
+
+PageEventKind = Literal["changed", "deleted"]
+
+# Notion webhook event types, anything else is acknowledged and ignored
+CHANGED_EVENT_TYPES = {
+    "page.changed",
+    "page.created",
+    "page.content_updated",
+    "page.properties_updated",
+    "page.moved",
+    "page.undeleted",
+}
+DELETED_EVENT_TYPES = {"page.deleted"}
+
+
+def classify_event(event_type: str) -> PageEventKind | None:
+    if event_type in DELETED_EVENT_TYPES:
+        return "deleted"
+    if event_type in CHANGED_EVENT_TYPES:
+        return "changed"
+    return None
+
+
+@dataclass
+class EventStats:
+    received: int = 0
+    coalesced: int = 0
+    flushes: int = 0
+    pages_reindexed: int = 0
+    pages_deleted: int = 0
+    pages_failed: int = 0
+
+
+class EventDebouncer:
+    """
+    Collects page change events per integration and applies them once no new event for that
+    integration arrived for `window` seconds, or at the latest `max_wait` seconds after the
+    first of them. Events for the same page collapse into the latest one, so a burst of edits
+    re-indexes the page once.
+
+    Events are applied under the integration's sync job lock. While a sync job of the
+    integration runs they wait for it, and events arriving meanwhile join the waiting batch.
+    """
+
+    def __init__(
+        self,
+        window: float = EVENT_DEBOUNCE_SECONDS,
+        max_wait: float = EVENT_DEBOUNCE_MAX_SECONDS,
+        job_manager: SyncJobManager = sync_job_manager,
+    ):
+        self.window = max(window, 0.0)
+        self.max_wait = max(max_wait, self.window)
+        self.job_manager = job_manager
+        self.stats = EventStats()
+        self._integrations: dict[str, dict[str, Any]] = {}
+        self._pending: dict[str, dict[str, PageEventKind]] = {}
+        self._first_event_at: dict[str, float] = {}
+        self._timers: dict[str, asyncio.TimerHandle] = {}
+        self._waiting: set[str] = set()
+        self._flushes: set[asyncio.Task] = set()
+
+    def add(self, integration: dict[str, Any], page_id: str, kind: PageEventKind) -> None:
+        integration_id = integration["id"]
+        pending = self._pending.setdefault(integration_id, {})
+
+        self.stats.received += 1
+        if page_id in pending:
+            self.stats.coalesced += 1
+
+        # Insertion order is kept for logging, the latest event decides what happens to a page
+        pending.pop(page_id, None)
+        pending[page_id] = kind
+        self._integrations[integration_id] = integration
+
+        # A steady trickle of events would otherwise push the flush back forever
+        loop = asyncio.get_running_loop()
+        first_event_at = self._first_event_at.setdefault(integration_id, loop.time())
+        delay = min(self.window, max(first_event_at + self.max_wait - loop.time(), 0.0))
+
+        timer = self._timers.pop(integration_id, None)
+        if timer:
+            timer.cancel()
+        self._timers[integration_id] = loop.call_later(delay, self._start_flush, integration_id)
+
+    def pending_count(self, integration_id: str | None = None) -> int:
+        if integration_id is not None:
+            return len(self._pending.get(integration_id, {}))
+        return sum(len(pending) for pending in self._pending.values())
+
+    async def flush(self, integration_id: str | None = None) -> bool:
+        """
+        Applies pending events now. Returns False if some of them wait for a running sync job
+        of their integration instead, they are applied as soon as it finishes.
+        """
+        applied = True
+        integration_ids = [integration_id] if integration_id else list(self._pending)
+        for pending_id in integration_ids:
+            if self.job_manager.integration_lock(pending_id).locked():
+                self._start_flush(pending_id)
+                applied = False
+                continue
+
+            timer = self._timers.pop(pending_id, None)
+            if timer:
+                timer.cancel()
+            await self._apply(pending_id)
+        return applied
+
+    async def close(self) -> None:
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+
+        for task in self._flushes:
+            task.cancel()
+        await asyncio.gather(*self._flushes, return_exceptions=True)
+        self._flushes.clear()
+
+    def _start_flush(self, integration_id: str) -> None:
+        timer = self._timers.pop(integration_id, None)
+        if timer:
+            timer.cancel()
+
+        # A flush already waiting for the lock picks up these events as well
+        if integration_id in self._waiting:
+            return
+
+        task = asyncio.create_task(self._apply(integration_id))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _apply(self, integration_id: str) -> None:
+        self._waiting.add(integration_id)
+        try:
+            async with self.job_manager.integration_lock(integration_id):
+                self._waiting.discard(integration_id)
+                await self._apply_pending(integration_id)
+        finally:
+            self._waiting.discard(integration_id)
+
+    async def _apply_pending(self, integration_id: str) -> None:
+        timer = self._timers.pop(integration_id, None)
+        if timer:
+            timer.cancel()
+
+        pending = self._pending.pop(integration_id, None)
+        integration = self._integrations.pop(integration_id, None)
+        self._first_event_at.pop(integration_id, None)
+        if not pending or not integration:
+            return
+
+        changed = [page_id for page_id, kind in pending.items() if kind == "changed"]
+        deleted = [page_id for page_id, kind in pending.items() if kind == "deleted"]
+        self.stats.flushes += 1
+
+        logger.info(
+            f"Applying page events for {integration_id}: {len(changed)} changed, "
+            f"{len(deleted)} deleted",
+            "CYAN",
+        )
+
+        try:
+            stats = await NotionSyncService.sync_page_events(integration, changed, deleted)
+        except Exception as e:
+            logger.error(f"Failed to apply page events for {integration_id}: {e}")
+            self.stats.pages_failed += len(pending)
+            return
+
+        self.stats.pages_reindexed += stats.pages_stored
+        self.stats.pages_deleted += stats.pages_deleted
+        self.stats.pages_failed += stats.pages_failed
+
+
+event_debouncer = EventDebouncer()
@@ -1,11 +1,75 @@
+import asyncio
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterable
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
-from typing import Any
-
-from app.config import setup_logger
+from typing import Any, TypeVar
+
+from app.config import (
+    BLOCK_FETCH_CONCURRENCY,
+    NOTION_BLOCK_MAX_BATCHES,
+    NOTION_SEARCH_MAX_BATCHES,
+    setup_logger,
+)
+from app.services.block_cache import block_cache
 from app.services.pipedream_service import pipedream_client
 
 logger = setup_logger(__name__)
 
+# A limit of 0 disables it, pagination then runs until Notion reports no more results
+SEARCH_MAX_BATCHES = NOTION_SEARCH_MAX_BATCHES or None
+BLOCK_MAX_BATCHES = NOTION_BLOCK_MAX_BATCHES or None
+
+T = TypeVar("T")
+
+
+@dataclass
+class TruncationStats:
+    searches_truncated: int = 0
+    block_lists_truncated: int = 0
+    pages_content_truncated: int = 0
+
+    @property
+    def truncated(self) -> bool:
+        return bool(
+            self.searches_truncated or self.block_lists_truncated or self.pages_content_truncated
+        )
+
+    def to_dict(self) -> dict[str, int]:
+        return {
+            "searches_truncated": self.searches_truncated,
+            "block_lists_truncated": self.block_lists_truncated,
+            "pages_content_truncated": self.pages_content_truncated,
+        }
+
+
+class PageTooLargeError(Exception):
+    """
+    Raised by `fetch_page_blocks` once a page has more blocks than `max_blocks`, such pages are
+    meant to go through `stream_page_blocks` instead of being held in memory as a whole tree.
+
+    `prefetched` maps the containers whose children were fully fetched before giving up to
+    those children, the walk over the page can start from them instead of fetching them again.
+    """
+
+    def __init__(self, message: str, prefetched: dict[str, list[dict[str, Any]]] | None = None):
+        super().__init__(message)
+        self.prefetched = prefetched or {}
+
+
+async def gather_or_cancel(coros: Iterable[Awaitable[T]]) -> list[T]:
+    """
+    Like `asyncio.gather`, but once one of the awaitables fails the others are cancelled and
+    awaited before the error is raised, instead of being left running.
+    """
+    tasks = [asyncio.ensure_future(coro) for coro in coros]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
 
 class NotionService:
     app_name: str = "notion"
@@ -16,32 +80,101 @@ class NotionService:
         account_id: str,
         recency: int = 6,
         page_size: int = 100,
-        max_iterations: int = 10,
+        max_iterations: int | None = SEARCH_MAX_BATCHES,
+        since: datetime | None = None,
+        truncation: TruncationStats | None = None,
     ) -> list[dict[str, Any]]:
 
+        return [
+            page
+            async for page in NotionService.stream_pages(
+                external_user_id=external_user_id,
+                account_id=account_id,
+                recency=recency,
+                page_size=page_size,
+                max_iterations=max_iterations,
+                since=since,
+                truncation=truncation,
+            )
+        ]
+
+    @staticmethod
+    async def stream_pages(
+        external_user_id: str,
+        account_id: str,
+        recency: int = 6,
+        page_size: int = 100,
+        max_iterations: int | None = SEARCH_MAX_BATCHES,
+        since: datetime | None = None,
+        truncation: TruncationStats | None = None,
+    ) -> AsyncIterator[dict[str, Any]]:
+
+        async for _, pages in NotionService.stream_page_batches(
+            external_user_id=external_user_id,
+            account_id=account_id,
+            recency=recency,
+            page_size=page_size,
+            max_iterations=max_iterations,
+            since=since,
+            truncation=truncation,
+        ):
+            for page in pages:
+                yield page
+
+    @staticmethod
+    async def stream_page_batches(
+        external_user_id: str,
+        account_id: str,
+        recency: int = 6,
+        page_size: int = 100,
+        max_iterations: int | None = SEARCH_MAX_BATCHES,
+        since: datetime | None = None,
+        start_cursor: str | None = None,
+        truncation: TruncationStats | None = None,
+    ) -> AsyncIterator[tuple[str | None, list[dict[str, Any]]]]:
+        """
+        Yields the pages of each search batch as soon as it arrives, together with the cursor
+        the batch was requested with, so a sync can start processing the first batch right away
+        and checkpoint its progress to resume the search later from `start_cursor`.
+
+        Pagination is unbounded unless `max_iterations` is set. A search cut short by that limit
+        is counted in `truncation`.
+        """
+
         if not external_user_id or not account_id:
             raise ValueError("Invalid user id or account id specified")
 
         cutoff_date = datetime.now(timezone.utc) - timedelta(days=recency * 30)
-        collected_pages: list[dict[str, Any]] = []
-        next_cursor: str | None = None
+
+        # Results are sorted by last_edited_time, so anything older than the last successful
+        # sync watermark is already indexed and pagination can stop there
+        if since and since > cutoff_date:
+            cutoff_date = since
+
+        next_cursor: str | None = start_cursor
         iteration = 0
+        page_count = 0
+        has_more = False
 
         try:
-            while iteration < max_iterations:
+            while max_iterations is None or iteration < max_iterations:
                 iteration += 1
+                batch_cursor = next_cursor
                 response = await NotionService._fetch_search_batch(
                     external_user_id=external_user_id,
                     account_id=account_id,
-                    cursor=next_cursor,
+                    cursor=batch_cursor,
                     page_size=page_size,
                 )
 
                 results = response.get("results", [])
                 if not results:
+                    # The search is done, whatever the previous batch said
+                    has_more = False
                     break
 
                 reached_cutoff = False
+                batch_pages: list[dict[str, Any]] = []
                 for page in results:
                     should_include, page_reached_cutoff = NotionService._process_single_page(
                         page, cutoff_date
@@ -52,27 +185,29 @@ class NotionService:
                         break
 
                     if should_include:
-                        collected_pages.append(page)
+                        batch_pages.append(page)
 
                 has_more = response.get("has_more", False)
                 next_cursor = response.get("next_cursor")
 
-                if reached_cutoff or not has_more:
+                if batch_pages:
+                    page_count += len(batch_pages)
+                    yield (batch_cursor, batch_pages)
+
+                if reached_cutoff:
+                    has_more = False
+                if not has_more:
                     break
 
-            if iteration >= max_iterations:
-                logger.warning(f"Reached max iterations ({max_iterations}), stopping pagination")
+            if has_more:
+                logger.info(f"Search stopped after {max_iterations} batches", "WHITE")
+                if truncation is not None:
+                    truncation.searches_truncated += 1
 
             logger.info(
-                f"Fetched {len(collected_pages)} pages updated since {cutoff_date.isoformat()}",
+                f"Fetched {page_count} pages updated since {cutoff_date.isoformat()}",
                 "WHITE",
             )
-            logger.info(
-                f"Pages: \n{collected_pages}",
-                "GREEN",
-            )
-
-            return collected_pages
 
         except Exception as e:
             logger.error(f"Failed to fetch Notion pages: {e}")
@@ -106,25 +241,35 @@ class NotionService:
 
         return response
 
+    @staticmethod
+    async def fetch_page(external_user_id: str, account_id: str, page_id: str) -> dict[str, Any]:
+
+        return await pipedream_client.proxy_request(
+            external_user_id=external_user_id,
+            account_id=account_id,
+            url=f"https://api.notion.com/v1/pages/{page_id}",
+            method="GET",
+            headers={"Notion-Version": "2022-06-28"},
+        )
+
+    @staticmethod
+    def is_page_removed(page: dict[str, Any]) -> bool:
+        return bool(page.get("archived") or page.get("in_trash"))
+
     @staticmethod
     def _process_single_page(
         page: dict[str, Any],
         cutoff_date: datetime,
     ) -> tuple[bool, bool]:
 
-        last_edited = NotionService._parse_iso_timestamp(page.get("last_edited_time"))
+        last_edited = NotionService.parse_iso_timestamp(page.get("last_edited_time"))
         if not last_edited:
             return (False, False)
 
         if last_edited < cutoff_date:
             return (False, True)
 
-        page_title = (
-            page.get("properties", {})
-            .get("title", {})
-            .get("title", [{}])[0]
-            .get("plain_text", "Untitled")
-        )
+        page_title = NotionService.get_page_title(page)
         logger.info(
             f"Fetched page: {page_title} | ID: {page.get('id')} | Last edited: {last_edited.isoformat()}",
             "WHITE",
@@ -132,65 +277,261 @@ class NotionService:
 
         return (True, False)
 
+    @staticmethod
+    def get_page_title(page: dict[str, Any]) -> str:
+        return (
+            page.get("properties", {})
+            .get("title", {})
+            .get("title", [{}])[0]
+            .get("plain_text", "Untitled")
+        )
+
     @staticmethod
     async def fetch_page_blocks(
         external_user_id: str,
         account_id: str,
         page_id: str,
-        max_iterations: int = 10,
+        max_iterations: int | None = BLOCK_MAX_BATCHES,
+        concurrency: int = BLOCK_FETCH_CONCURRENCY,
+        last_edited_time: str | None = None,
+        max_blocks: int | None = None,
+        truncation: TruncationStats | None = None,
     ) -> list[dict[str, Any]]:
+        """
+        Fetches the block tree of a page breadth first. All containers on one depth level are
+        fetched concurrently (bounded by `concurrency` requests in flight) and their results
+        are attached under `children`, exactly as the recursive traversal used to do.
+
+        When the page's `last_edited_time` is given, fetched children are written to the block
+        cache keyed by container id and edit time. A page whose edit time is unchanged is then
+        rebuilt from the cache, only falling back to the API for evicted containers and those
+        whose signed file URLs are about to expire. Nested edits do not bump a parent block's
+        edit time, so containers of a changed page are always fetched again.
+
+        With `max_blocks` set, `PageTooLargeError` is raised as soon as more blocks than that
+        have been fetched. Fetches still in flight are cancelled, the children fetched so far are
+        handed over with the error.
+        """
+        semaphore = asyncio.Semaphore(max(concurrency, 1))
+        use_cache = block_cache.enabled and last_edited_time is not None
+        block_count = 0
+        # Children of every container fetched (or read from the cache) completely
+        complete: dict[str, list[dict[str, Any]]] = {}
+
+        def count_blocks(count: int) -> None:
+            nonlocal block_count
+            block_count += count
+            if max_blocks is not None and block_count > max_blocks:
+                raise PageTooLargeError(
+                    f"page {page_id} has more than {max_blocks} blocks", prefetched=complete
+                )
 
-        all_blocks: list[dict[str, Any]] = []
-        next_cursor: str | None = None
-        iteration = 0
+        async def fetch_children(block_id: str) -> list[dict[str, Any]]:
+            children = await NotionService._fetch_block_children(
+                external_user_id=external_user_id,
+                account_id=account_id,
+                block_id=block_id,
+                max_iterations=max_iterations,
+                semaphore=semaphore,
+                on_batch=count_blocks,
+                truncation=truncation,
+            )
+            complete[block_id] = children
+            return children
+
+        async def fetch_level(
+            containers: list[tuple[str, str | None]], read_cache: bool
+        ) -> tuple[list[list[dict[str, Any]]], int]:
+
+            cached: dict[tuple[str, str], list[dict[str, Any]]] = {}
+            if use_cache and read_cache:
+                keys = [(block_id, edited) for block_id, edited in containers if edited]
+                cached = await asyncio.to_thread(block_cache.get_many, keys)
+                complete.update((block_id, children) for (block_id, _), children in cached.items())
+                count_blocks(sum(len(children) for children in cached.values()))
+
+            missing = [container for container in containers if container not in cached]
+            fetched = await gather_or_cancel(fetch_children(block_id) for block_id, _ in missing)
+            fetched_by_container = dict(zip(missing, fetched))
+
+            if use_cache:
+                await asyncio.to_thread(
+                    block_cache.put_many,
+                    {
+                        container: children
+                        for container, children in fetched_by_container.items()
+                        if container[1]
+                    },
+                )
+
+            children = [
+                cached[container] if container in cached else fetched_by_container[container]
+                for container in containers
+            ]
+            return (children, len(cached))
 
         try:
-            while iteration < max_iterations:
-                iteration += 1
+            (root_blocks,), root_hits = await fetch_level(
+                [(page_id, last_edited_time)], read_cache=True
+            )
 
-                url = f"https://api.notion.com/v1/blocks/{page_id}/children"
-                if next_cursor:
-                    url += f"?start_cursor={next_cursor}"
+            # Descendants only come from the cache when the page itself is unchanged
+            page_unchanged = root_hits == 1
 
-                response = await pipedream_client.proxy_request(
-                    external_user_id=external_user_id,
-                    account_id=account_id,
-                    url=url,
-                    method="GET",
-                    headers={"Notion-Version": "2022-06-28"},
+            level = [block for block in root_blocks if block.get("has_children")]
+            while level:
+                level_children, _ = await fetch_level(
+                    [(block["id"], block.get("last_edited_time")) for block in level],
+                    read_cache=page_unchanged,
                 )
 
-                results = response.get("results", [])
-                if not results:
-                    break
+                next_level: list[dict[str, Any]] = []
+                for block, child_blocks in zip(level, level_children):
+                    block["children"] = child_blocks
+                    next_level.extend(child for child in child_blocks if child.get("has_children"))
 
-                all_blocks.extend(results)
+                level = next_level
 
-                has_more = response.get("has_more", False)
-                next_cursor = response.get("next_cursor")
+            return root_blocks
 
-                if not has_more:
-                    break
+        except PageTooLargeError:
+            raise
+        except Exception as exc:
+            logger.error(f"Failed to fetch blocks for page: {page_id}: {exc}")
+            raise
 
-            if iteration >= max_iterations:
-                logger.warning(
-                    f"Reached max iterations ({max_iterations}) fetching blocks for page: {page_id}"
-                )
+    @staticmethod
+    async def _fetch_block_children(
+        external_user_id: str,
+        account_id: str,
+        block_id: str,
+        max_iterations: int | None,
+        semaphore: asyncio.Semaphore,
+        on_batch: Callable[[int], None] | None = None,
+        truncation: TruncationStats | None = None,
+    ) -> list[dict[str, Any]]:
 
-            for block in all_blocks:
-                if block.get("has_children"):
-                    child_blocks = await NotionService.fetch_page_blocks(
-                        external_user_id=external_user_id,
-                        account_id=account_id,
-                        page_id=block["id"],
-                        max_iterations=max_iterations,
-                    )
-                    block["children"] = child_blocks
+        blocks: list[dict[str, Any]] = []
+        async for batch in NotionService._iter_block_children(
+            external_user_id=external_user_id,
+            account_id=account_id,
+            block_id=block_id,
+            max_iterations=max_iterations,
+            semaphore=semaphore,
+            truncation=truncation,
+        ):
+            blocks.extend(batch)
+            if on_batch:
+                on_batch(len(batch))
+
+        return blocks
+
+    @staticmethod
+    async def _iter_block_children(
+        external_user_id: str,
+        account_id: str,
+        block_id: str,
+        max_iterations: int | None = BLOCK_MAX_BATCHES,
+        semaphore: asyncio.Semaphore | None = None,
+        truncation: TruncationStats | None = None,
+    ) -> AsyncIterator[list[dict[str, Any]]]:
+
+        next_cursor: str | None = None
+        iteration = 0
+        has_more = False
+
+        while max_iterations is None or iteration < max_iterations:
+            iteration += 1
+
+            url = f"https://api.notion.com/v1/blocks/{block_id}/children"
+            if next_cursor:
+                url += f"?start_cursor={next_cursor}"
+
+            request = pipedream_client.proxy_request(
+                external_user_id=external_user_id,
+                account_id=account_id,
+                url=url,
+                method="GET",
+                headers={"Notion-Version": "2022-06-28"},
+            )
+            if semaphore:
+                async with semaphore:
+                    response = await request
+            else:
+                response = await request
+
+            results = response.get("results", [])
+            if not results:
+                return
 
-            return all_blocks
+            has_more = response.get("has_more", False)
+            next_cursor = response.get("next_cursor")
+            yield results
+
+            if not has_more:
+                return
+
+        if has_more:
+            logger.info(f"Children of block {block_id} cut at {max_iterations} batches", "WHITE")
+            if truncation is not None:
+                truncation.block_lists_truncated += 1
+
+    @staticmethod
+    async def stream_page_blocks(
+        external_user_id: str,
+        account_id: str,
+        page_id: str,
+        max_iterations: int | None = BLOCK_MAX_BATCHES,
+        truncation: TruncationStats | None = None,
+        prefetched: dict[str, list[dict[str, Any]]] | None = None,
+    ) -> AsyncIterator[tuple[dict[str, Any], int]]:
+        """
+        Walks the block tree depth first and yields every block with its nesting depth, in the
+        same order as `extract_text_from_blocks` reads them. Only one batch of children per open
+        level is held at a time, so memory depends on nesting depth rather than on page size.
+
+        Children of the containers in `prefetched` (see `PageTooLargeError`) are taken from
+        there instead of being fetched, each entry is dropped once walked.
+        """
+        prefetched = prefetched if prefetched is not None else {}
+
+        async def known_children(children: list[dict[str, Any]]):
+            if children:
+                yield children
+
+        def children_of(block_id: str) -> AsyncIterator[list[dict[str, Any]]]:
+            if block_id in prefetched:
+                return known_children(prefetched.pop(block_id))
+            return NotionService._iter_block_children(
+                external_user_id=external_user_id,
+                account_id=account_id,
+                block_id=block_id,
+                max_iterations=max_iterations,
+                truncation=truncation,
+            )
+
+        stack: list[tuple[AsyncIterator[list[dict[str, Any]]], list[dict[str, Any]]]] = [
+            (children_of(page_id), [])
+        ]
+
+        try:
+            while stack:
+                batches, pending = stack[-1]
+                if not pending:
+                    batch = await anext(batches, None)
+                    if batch is None:
+                        stack.pop()
+                        continue
+                    pending.extend(reversed(batch))
+
+                block = pending.pop()
+                yield (block, len(stack) - 1)
+
+                if block.get("has_children"):
+                    stack.append((children_of(block["id"]), []))
 
         except Exception as exc:
-            logger.error(f"Failed to fetch blocks for page: {page_id}: {exc}")
+            logger.error(f"Failed to stream blocks for page: {page_id}: {exc}")
             raise
 
     @staticmethod
@@ -200,7 +541,7 @@ class NotionService:
         media_metadata: list[dict[str, Any]] = []
 
         for block in blocks:
-            block_text, block_media = NotionService._extract_from_single_block(block)
+            block_text, block_media = NotionService.extract_from_single_block(block)
 
             if block_text:
                 text_parts.append(block_text)
@@ -218,7 +559,7 @@ class NotionService:
         return ("\n".join(text_parts), media_metadata)
 
     @staticmethod
-    def _extract_from_single_block(block: dict[str, Any]) -> tuple[str, list[dict[str, Any]]]:
+    def extract_from_single_block(block: dict[str, Any]) -> tuple[str, list[dict[str, Any]]]:
 
         block_type = block.get("type")
         if not block_type:
@@ -278,7 +619,7 @@ class NotionService:
         return ("", [])
 
     @staticmethod
-    def _parse_iso_timestamp(timestamp: str | None) -> datetime | None:
+    def parse_iso_timestamp(timestamp: str | None) -> datetime | None:
         if not timestamp:
             return None
         ts = timestamp.replace("Z", "+00:00") if timestamp.endswith("Z") else timestamp
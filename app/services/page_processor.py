@@ -0,0 +1,122 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Any
+
+from app.config import (
+    SYNC_PROCESS_BATCH_PAGES,
+    SYNC_PROCESS_FLUSH_INTERVAL,
+    SYNC_PROCESS_WORKERS,
+    setup_logger,
+)
+from app.services.block_chunker import BlockChunk, chunk_blocks, count_truncated
+from app.services.micro_batcher import MicroBatcher
+from app.services.notion_service import NotionService
+from app.utils import hash_chunk
+
+logger = setup_logger(__name__)
+
+
+@dataclass
+class ProcessedPage:
+    content: str
+    media_metadata: list[dict[str, Any]] = field(default_factory=list)
+    chunks: list[BlockChunk] = field(default_factory=list)
+    hashes: list[str] = field(default_factory=list)
+    chunks_truncated: int = 0
+
+
+def process_page(blocks: list[dict[str, Any]]) -> ProcessedPage:
+    content, media_metadata = NotionService.extract_text_from_blocks(blocks)
+    chunks = chunk_blocks(blocks)
+    return ProcessedPage(
+        content=content,
+        media_metadata=media_metadata,
+        chunks=chunks,
+        hashes=[hash_chunk(chunk.content) for chunk in chunks],
+        chunks_truncated=count_truncated(chunks),
+    )
+
+
+def process_pages(pages: list[list[dict[str, Any]]]) -> list[ProcessedPage | Exception]:
+    """
+    Runs in a worker process, one round trip per batch rather than per page. A page that fails
+    comes back as its exception so the rest of the batch is not lost with it.
+    """
+    results: list[ProcessedPage | Exception] = []
+    for blocks in pages:
+        try:
+            results.append(process_page(blocks))
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+class PageProcessor:
+    """
+    Runs text extraction and chunking, which are CPU bound, in a pool of worker processes so
+    bulk imports do not block the event loop. Pages from concurrent callers are handed to the
+    workers in batches of up to `batch_pages`, a batch is sent once it is full or its oldest
+    page has waited `flush_interval` seconds. Every caller gets the result for its own page.
+
+    With `workers=0` the batches run in a thread of this process instead.
+    """
+
+    def __init__(
+        self,
+        workers: int = SYNC_PROCESS_WORKERS,
+        batch_pages: int = SYNC_PROCESS_BATCH_PAGES,
+        flush_interval: float = SYNC_PROCESS_FLUSH_INTERVAL,
+    ):
+        self.workers = max(workers, 0)
+        self.batch_pages = max(batch_pages, 1)
+        self.flush_interval = max(flush_interval, 0.0)
+
+        self._pool: ProcessPoolExecutor | None = None
+        # One batch in flight per worker, the rest wait and keep filling up
+        self._batcher: MicroBatcher[list[dict[str, Any]], ProcessedPage] = MicroBatcher(
+            self._run_batch,
+            max_items=self.batch_pages,
+            flush_interval=self.flush_interval,
+            max_in_flight=max(self.workers, 1),
+        )
+
+    async def process(self, blocks: list[dict[str, Any]]) -> ProcessedPage:
+        return await self._batcher.submit(blocks)
+
+    async def close(self) -> None:
+        await self._batcher.close()
+
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # Spawned rather than forked, the server process runs threads that fork would copy
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            logger.info(f"Started page processing pool with {self.workers} workers", "CYAN")
+        return self._pool
+
+    async def _run_batch(
+        self, pages: list[list[dict[str, Any]]]
+    ) -> list[ProcessedPage | Exception]:
+        try:
+            if self.workers:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._get_pool(), process_pages, pages)
+            return await asyncio.to_thread(process_pages, pages)
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                # A worker died (e.g. killed for memory), the next batch gets a fresh pool
+                self._pool = None
+            logger.error(f"Processing batch of {len(pages)} pages failed: {e}")
+            raise
+
+
+page_processor = PageProcessor()
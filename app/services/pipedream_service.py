@@ -1,18 +1,36 @@
+import asyncio
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from typing import Any
 
+import httpx
 from pipedream import AsyncPipedream, CreateTokenResponse
+from pipedream.core.api_error import ApiError
 from pipedream.types import Account
+from tenacity import (
+    AsyncRetrying,
+    RetryCallState,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_random_exponential,
+)
 
 from app.config import (
     ENVIRONMENT,
     PIPEDREAM_CLIENT_ID,
     PIPEDREAM_CLIENT_SECRET,
     PIPEDREAM_PROJECT_ID,
+    PROXY_MAX_ATTEMPTS,
+    PROXY_RETRY_BASE_DELAY,
+    PROXY_RETRY_MAX_DELAY,
     setup_logger,
 )
+from app.services.rate_limiter import proxy_rate_limiter
 
 logger = setup_logger(__name__)
 
+TRANSIENT_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
 
 # Custom Exception for pipedream
 class PipedreamClientError(Exception):
@@ -35,6 +53,8 @@ class PipedreamService:
             client_secret=client_secret,
             project_id=project_id,
             project_environment=environment,
+            # Retried by `proxy_request`, the SDK's own retries would bypass the rate limiter
+            max_retries=0,
         )
 
     async def create_connect_token(self, external_user_id: str) -> CreateTokenResponse | None:
@@ -94,6 +114,11 @@ class PipedreamService:
         body: dict[str, Any] | None = None,
         headers: dict[str, str] | None = None,
     ) -> dict[str, Any]:
+        """
+        Proxies a request through the connected account. Requests are paced by a token bucket
+        shared per account, and rate limited or transient failures are retried with jittered
+        exponential backoff (or after Retry-After, when the upstream sends one).
+        """
         try:
             proxy_method = getattr(self._client.proxy, method.lower())
             kwargs = {
@@ -105,7 +130,26 @@ class PipedreamService:
             if method.upper() != "GET":
                 kwargs["body"] = body or {}
 
-            result = await proxy_method(**kwargs)
+            retrying = AsyncRetrying(
+                stop=stop_after_attempt(PROXY_MAX_ATTEMPTS),
+                wait=_retry_wait,
+                retry=retry_if_exception(_is_transient_error),
+                before_sleep=_log_retry,
+                reraise=True,
+            )
+
+            async for attempt in retrying:
+                with attempt:
+                    await proxy_rate_limiter.acquire(account_id)
+                    try:
+                        result = await proxy_method(**kwargs)
+                    except ApiError as e:
+                        if e.status_code == 429:
+                            proxy_rate_limiter.pause(
+                                account_id, _retry_after_seconds(e) or PROXY_RETRY_BASE_DELAY
+                            )
+                        raise
+
             logger.info(f"Successful {method} request to {url}", "GREEN")
             return result
         except Exception as e:
@@ -113,4 +157,45 @@ class PipedreamService:
             raise PipedreamClientError("Proxy request failed") from e
 
 
+_backoff = wait_random_exponential(multiplier=PROXY_RETRY_BASE_DELAY, max=PROXY_RETRY_MAX_DELAY)
+
+
+def _is_transient_error(error: BaseException) -> bool:
+    if isinstance(error, ApiError):
+        return error.status_code in TRANSIENT_STATUS_CODES
+    return isinstance(error, (httpx.TransportError, asyncio.TimeoutError))
+
+
+def _retry_after_seconds(error: BaseException | None) -> float | None:
+    headers = getattr(error, "headers", None) or {}
+    value = next((v for k, v in headers.items() if k.lower() == "retry-after"), None)
+    if value is None:
+        return None
+
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _retry_wait(retry_state: RetryCallState) -> float:
+    retry_after = _retry_after_seconds(retry_state.outcome.exception())
+    if retry_after is not None:
+        return min(retry_after, PROXY_RETRY_MAX_DELAY)
+    return _backoff(retry_state)
+
+
+def _log_retry(retry_state: RetryCallState) -> None:
+    logger.warning(
+        f"Proxy request failed ({retry_state.outcome.exception()}), retrying in "
+        f"{retry_state.next_action.sleep:.1f}s (attempt {retry_state.attempt_number})"
+    )
+
+
 pipedream_client = PipedreamService()
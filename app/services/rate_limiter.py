@@ -0,0 +1,83 @@
+import asyncio
+import time
+
+from app.config import PROXY_RATE_LIMIT_BURST, PROXY_RATE_LIMIT_PER_SECOND, setup_logger
+
+logger = setup_logger(__name__)
+
+
+class TokenBucket:
+    """
+    Async token bucket. `acquire` waits until a token is available, waiters are served in
+    arrival order. `pause` blocks the bucket for everyone, e.g. while honoring a Retry-After.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = max(rate, 0.001)
+        self.capacity = max(capacity, 1.0)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        paused_until = time.monotonic() + max(seconds, 0.0)
+        if paused_until > self._paused_until:
+            self._paused_until = paused_until
+            # Nothing was spent while paused, start again from an empty bucket
+            self._tokens = 0.0
+            self._updated_at = paused_until
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated_at
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated_at = now
+
+
+class RateLimiter:
+    """
+    One token bucket per key (a connected account), shared by every caller in the process so
+    concurrent syncs of the same account draw from the same budget.
+    """
+
+    def __init__(
+        self,
+        rate: float = PROXY_RATE_LIMIT_PER_SECOND,
+        burst: float = PROXY_RATE_LIMIT_BURST,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self._buckets: dict[str, TokenBucket] = {}
+
+    def bucket(self, key: str) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(rate=self.rate, capacity=self.burst)
+            self._buckets[key] = bucket
+        return bucket
+
+    async def acquire(self, key: str) -> None:
+        await self.bucket(key).acquire()
+
+    def pause(self, key: str, seconds: float) -> None:
+        logger.warning(f"Rate limited on {key}, pausing requests for {seconds:.1f}s")
+        self.bucket(key).pause(seconds)
+
+
+proxy_rate_limiter = RateLimiter()
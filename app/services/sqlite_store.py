@@ -0,0 +1,228 @@
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import Iterable, Sequence
+from typing import NamedTuple
+
+from app.config import setup_logger
+
+logger = setup_logger(__name__)
+
+# Stays well under SQLite's limit on bound parameters
+_BATCH = 500
+
+_COLUMNS = ["key", "tag", "value", "last_used", "expires_at"]
+
+
+class StoreRow(NamedTuple):
+    key: str
+    value: bytes
+    # Read back only when asked for with the same tag, e.g. an edit time
+    tag: str | None = None
+    # Unix time from which the row reads as missing
+    expires_at: float | None = None
+
+
+class SQLiteStore:
+    """
+    Size-bounded key/value table in a SQLite file, used by the on-disk caches. Once the values
+    stored pass `max_bytes` in total, the least recently used rows are evicted down to 90% of
+    it so that every write does not trigger another pass.
+
+    Caches opening the same table of the same file share one store, with a single connection
+    and a single running total of its size (the first to open it sets `max_bytes`). It is
+    connected lazily and closed once the last of them releases it. A table left with another
+    layout by an older version is dropped, its rows are only a cache.
+
+    SQLite errors are logged and read as misses, the caches only ever save work.
+    """
+
+    _open: dict[tuple[str, str], "SQLiteStore"] = {}
+    _open_lock = threading.Lock()
+
+    def __init__(self, path: str, table: str, max_bytes: int):
+        self.path = path
+        self.table = table
+        self.max_bytes = max_bytes
+        self._users = 0
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+        self._size = 0
+
+    @classmethod
+    def open(cls, path: str, table: str, max_bytes: int) -> "SQLiteStore":
+        with cls._open_lock:
+            store = cls._open.get((path, table))
+            if store is None:
+                store = cls._open[(path, table)] = cls(path, table, max_bytes)
+            store._users += 1
+            return store
+
+    def release(self) -> None:
+        with self._open_lock:
+            self._users -= 1
+            if self._users > 0:
+                return
+            if self._open.get((self.path, self.table)) is self:
+                del self._open[(self.path, self.table)]
+
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def load(
+        self, keys: Sequence[str], tags: Sequence[str | None] | None = None
+    ) -> dict[str, bytes]:
+        """
+        Values of the `keys` found, marked as used. With `tags`, a row is only found when it was
+        stored with the tag given for its key.
+        """
+        wanted = dict(zip(keys, tags)) if tags is not None else None
+        try:
+            with self._lock:
+                db = self._connect()
+                now = time.time()
+
+                found: dict[str, bytes] = {}
+                unique = list(dict.fromkeys(keys))
+                for start in range(0, len(unique), _BATCH):
+                    batch = unique[start : start + _BATCH]
+                    placeholders = ",".join("?" * len(batch))
+                    rows = db.execute(
+                        f"SELECT key, tag, value FROM {self.table} WHERE key IN ({placeholders}) "
+                        "AND (expires_at IS NULL OR expires_at > ?)",
+                        [*batch, now],
+                    ).fetchall()
+                    for key, tag, value in rows:
+                        if wanted is None or wanted[key] == tag:
+                            found[key] = value
+
+                if found:
+                    db.executemany(
+                        f"UPDATE {self.table} SET last_used = ? WHERE key = ?",
+                        [(now, key) for key in found],
+                    )
+                    db.commit()
+                return found
+
+        except sqlite3.Error as e:
+            logger.error(f"Reading cache table {self.table} failed: {e}")
+            return {}
+
+    def store(self, rows: Iterable[StoreRow]) -> int:
+        """
+        Writes `rows`, replacing any row with the same key. Returns the number of rows evicted
+        to make room.
+        """
+        latest = {row.key: row for row in rows}
+        if not latest:
+            return 0
+
+        try:
+            with self._lock:
+                db = self._connect()
+
+                now = time.time()
+                replaced = self._sizes(db, list(latest))
+                db.executemany(
+                    f"INSERT OR REPLACE INTO {self.table} ({', '.join(_COLUMNS)}) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [(row.key, row.tag, row.value, now, row.expires_at) for row in latest.values()],
+                )
+                db.commit()
+                self._size += sum(len(row.value) for row in latest.values()) - replaced
+
+                if self._size > self.max_bytes:
+                    return self._evict(db)
+                return 0
+
+        except sqlite3.Error as e:
+            logger.error(f"Writing cache table {self.table} failed: {e}")
+            return 0
+
+    def clear(self) -> None:
+        try:
+            with self._lock:
+                db = self._connect()
+                db.execute(f"DELETE FROM {self.table}")
+                db.commit()
+                self._size = 0
+        except sqlite3.Error as e:
+            logger.error(f"Clearing cache table {self.table} failed: {e}")
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is not None:
+            return self._db
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        db = sqlite3.connect(self.path, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+
+        columns = [row[1] for row in db.execute(f"PRAGMA table_info({self.table})")]
+        if columns and columns != _COLUMNS:
+            logger.info(f"Dropping cache table {self.table} written by an older version")
+            db.execute(f"DROP TABLE {self.table}")
+
+        db.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} ("
+            "key TEXT PRIMARY KEY, tag TEXT, value BLOB NOT NULL, last_used REAL NOT NULL, "
+            "expires_at REAL)"
+        )
+        db.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_last_used ON {self.table} (last_used)")
+        db.commit()
+
+        self._size = db.execute(
+            f"SELECT COALESCE(SUM(LENGTH(value)), 0) FROM {self.table}"
+        ).fetchone()[0]
+        logger.info(f"Opened cache table {self.table} at {self.path} ({self._size} bytes)")
+        self._db = db
+        return db
+
+    def _sizes(self, db: sqlite3.Connection, keys: list[str]) -> int:
+        total = 0
+        for start in range(0, len(keys), _BATCH):
+            batch = keys[start : start + _BATCH]
+            placeholders = ",".join("?" * len(batch))
+            total += db.execute(
+                f"SELECT COALESCE(SUM(LENGTH(value)), 0) FROM {self.table} "
+                f"WHERE key IN ({placeholders})",
+                batch,
+            ).fetchone()[0]
+        return total
+
+    def _evict(self, db: sqlite3.Connection) -> int:
+        target = int(self.max_bytes * 0.9)
+        evicted = 0
+
+        while self._size > target:
+            rows = db.execute(
+                f"SELECT key, LENGTH(value) FROM {self.table} ORDER BY last_used LIMIT {_BATCH}"
+            ).fetchall()
+            if not rows:
+                self._size = 0
+                break
+
+            victims = []
+            for key, size in rows:
+                if self._size <= target:
+                    break
+                victims.append((key,))
+                self._size -= size
+
+            db.executemany(f"DELETE FROM {self.table} WHERE key = ?", victims)
+            evicted += len(victims)
+
+        db.commit()
+        logger.info(
+            f"Evicted {evicted} rows from cache table {self.table}, {self._size} bytes left"
+        )
+        return evicted
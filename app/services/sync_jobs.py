@@ -0,0 +1,273 @@
+import asyncio
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Literal
+
+from app.config import SYNC_JOB_HISTORY, SYNC_JOB_WORKERS, setup_logger
+from app.database.operations import IntegrationOperations, SyncCheckpointOperations
+from app.services.sync_scheduler import FairQueue, SyncPriority
+from app.services.sync_service import NotionSyncService, SyncStats
+
+logger = setup_logger(__name__)
+
+JobStatus = Literal["queued", "running", "completed", "failed"]
+
+
+@dataclass
+class SyncJob:
+    integration: dict[str, Any]
+    recency_months: int = 6
+    full_resync: bool = False
+    priority: SyncPriority = "interactive"
+    id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    status: JobStatus = "queued"
+    stats: SyncStats = field(default_factory=SyncStats)
+    error: str | None = None
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+
+    @property
+    def is_active(self) -> bool:
+        return self.status in ("queued", "running")
+
+    @property
+    def pages_per_second(self) -> float:
+        if not self.started_at:
+            return 0.0
+
+        finished_at = self.finished_at or datetime.now(timezone.utc)
+        elapsed = (finished_at - self.started_at).total_seconds()
+        return self.stats.pages_done / elapsed if elapsed > 0 else 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "integration_id": self.integration["id"],
+            "status": self.status,
+            "priority": self.priority,
+            "pages_total": self.stats.pages_total,
+            "pages_done": self.stats.pages_done,
+            "pages_new": self.stats.pages_new,
+            "pages_reindexed": self.stats.pages_reindexed,
+            "pages_skipped": self.stats.pages_skipped,
+            "pages_failed": self.stats.pages_failed,
+            "pages_streamed": self.stats.pages_streamed,
+            "chunks_embedded": self.stats.chunks_embedded,
+            "chunks_reused": self.stats.chunks_reused,
+            "chunks_truncated": self.stats.chunks_truncated,
+            "pages_per_second": round(self.pages_per_second, 3),
+            "errors": list(self.stats.errors),
+            "stages": [stage.to_dict() for stage in self.stats.stages.values()],
+            "truncation": self.stats.truncation.to_dict(),
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+class SyncJobManager:
+    """
+    Runs Notion syncs on local background workers. At most one job per integration is queued
+    or running at any time, further requests for it are coalesced into the active job. A full
+    resync requested while an incremental job is active takes that job over if it has not
+    started yet, otherwise it is queued to run right after it.
+
+    Queued jobs are picked round-robin across users. Re-syncs of already indexed integrations
+    are interactive and go before bulk work (initial imports and full resyncs).
+    """
+
+    def __init__(self, workers: int = SYNC_JOB_WORKERS, history: int = SYNC_JOB_HISTORY):
+        self._workers = max(workers, 1)
+        self._history = history
+        self._jobs: dict[str, SyncJob] = {}
+        self._active_jobs: dict[str, SyncJob] = {}
+        self._follow_ups: dict[str, SyncJob] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._queue: FairQueue[SyncJob] | None = None
+        self._tasks: list[asyncio.Task] = []
+
+    def submit(
+        self,
+        integration: dict[str, Any],
+        recency_months: int = 6,
+        full_resync: bool = False,
+    ) -> tuple[SyncJob, bool]:
+        integration_id = integration["id"]
+
+        active_job = self._active_jobs.get(integration_id)
+        if active_job and (active_job.full_resync or not full_resync):
+            logger.info(f"Sync already in progress for {integration_id}: {active_job.id}")
+            return (active_job, True)
+
+        if active_job and active_job.status == "queued":
+            active_job.full_resync = True
+            active_job.recency_months = recency_months
+            # A full re-index is bulk work, it must not go ahead of other users' re-syncs
+            active_job.priority = self._priority(integration, full_resync=True)
+            self._queue.requeue(active_job, integration["user_id"], active_job.priority)
+            logger.info(f"Upgraded queued sync job {active_job.id} to a full resync")
+            return (active_job, True)
+
+        if active_job:
+            # The running job skips unchanged pages, which a full resync must re-index
+            follow_up = self._follow_ups.get(integration_id)
+            if follow_up:
+                return (follow_up, True)
+
+            job = self._create(integration, recency_months, full_resync)
+            self._follow_ups[integration_id] = job
+            logger.info(f"Full resync {job.id} queued after running sync job {active_job.id}")
+            return (job, False)
+
+        job = self._create(integration, recency_months, full_resync)
+        self._enqueue(job)
+        return (job, False)
+
+    def get(self, job_id: str) -> SyncJob | None:
+        return self._jobs.get(job_id)
+
+    def integration_lock(self, integration_id: str) -> asyncio.Lock:
+        """
+        Held while a job of the integration runs. Anything else re-indexing the integration's
+        pages takes it too, so the same page is never indexed twice at once.
+        """
+        lock = self._locks.get(integration_id)
+        if lock is None:
+            lock = self._locks[integration_id] = asyncio.Lock()
+        return lock
+
+    async def resume_interrupted(self) -> list[SyncJob]:
+        """
+        Re-queues the syncs whose checkpoint was left running by a previous process, each one
+        picks up from its persisted search cursor and page statuses.
+        """
+        try:
+            checkpoints = await asyncio.to_thread(SyncCheckpointOperations.list_running_checkpoints)
+        except Exception as e:
+            logger.error(f"Failed to load interrupted syncs: {e}")
+            return []
+
+        jobs: list[SyncJob] = []
+        for checkpoint in checkpoints:
+            integration = await asyncio.to_thread(
+                IntegrationOperations.get_integration_by_id, checkpoint["integration_id"]
+            )
+            if not integration:
+                continue
+
+            job, _ = self.submit(
+                integration,
+                recency_months=checkpoint["recency_months"],
+                full_resync=checkpoint["full_resync"],
+            )
+            jobs.append(job)
+
+        if jobs:
+            logger.info(f"Resumed {len(jobs)} interrupted sync jobs", "CYAN")
+        return jobs
+
+    def queued(self) -> dict[str, dict[str, int]]:
+        return self._queue.counts() if self._queue else {}
+
+    async def shutdown(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def _create(
+        self, integration: dict[str, Any], recency_months: int, full_resync: bool
+    ) -> SyncJob:
+        job = SyncJob(
+            integration=integration,
+            recency_months=recency_months,
+            full_resync=full_resync,
+            priority=self._priority(integration, full_resync),
+        )
+        self._jobs[job.id] = job
+        self._prune_history()
+        return job
+
+    def _enqueue(self, job: SyncJob) -> None:
+        self._active_jobs[job.integration["id"]] = job
+        self._ensure_workers()
+        self._queue.put_nowait(job, job.integration["user_id"], job.priority)
+
+        logger.info(
+            f"Queued {job.priority} sync job {job.id} for integration {job.integration['id']}",
+            "CYAN",
+        )
+
+    def _ensure_workers(self) -> None:
+        if self._queue is None:
+            self._queue = FairQueue()
+
+        self._tasks = [task for task in self._tasks if not task.done()]
+        while len(self._tasks) < self._workers:
+            self._tasks.append(asyncio.create_task(self._worker()))
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            await self._run(job)
+
+    async def _run(self, job: SyncJob) -> None:
+        job.status = "running"
+        job.started_at = datetime.now(timezone.utc)
+        logger.info(f"Starting sync job {job.id}", "WHITE")
+
+        try:
+            async with self.integration_lock(job.integration["id"]):
+                await NotionSyncService.sync_pages(
+                    integration=job.integration,
+                    recency_months=job.recency_months,
+                    full_resync=job.full_resync,
+                    stats=job.stats,
+                    priority=job.priority,
+                )
+            job.status = "completed"
+
+        except Exception as e:
+            logger.error(f"Sync job {job.id} failed: {e}")
+            job.status = "failed"
+            job.error = str(e)
+            # Left running, the checkpoint would bring the failed job back on every restart
+            try:
+                await asyncio.to_thread(
+                    SyncCheckpointOperations.fail_checkpoint, job.integration["id"]
+                )
+            except Exception as checkpoint_error:
+                # The worker must survive this, the jobs queued behind it would stall otherwise
+                logger.error(
+                    f"Failed to mark checkpoint of sync job {job.id} failed: {checkpoint_error}"
+                )
+
+        finally:
+            job.finished_at = datetime.now(timezone.utc)
+            self._active_jobs.pop(job.integration["id"], None)
+            logger.info(
+                f"Sync job {job.id} {job.status}: {job.stats.pages_done}/"
+                f"{job.stats.pages_total} pages, {job.pages_per_second:.2f} pages/s",
+                "GREEN" if job.status == "completed" else "RED",
+            )
+
+            follow_up = self._follow_ups.pop(job.integration["id"], None)
+            if follow_up:
+                self._enqueue(follow_up)
+
+    @staticmethod
+    def _priority(integration: dict[str, Any], full_resync: bool) -> SyncPriority:
+        if full_resync or not integration.get("last_synced_at"):
+            return "bulk"
+        return "interactive"
+
+    def _prune_history(self) -> None:
+        finished = [job for job in self._jobs.values() if not job.is_active]
+        for job in finished[: max(len(finished) - self._history, 0)]:
+            del self._jobs[job.id]
+
+
+sync_job_manager = SyncJobManager()
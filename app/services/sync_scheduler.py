@@ -0,0 +1,175 @@
+import asyncio
+from collections import OrderedDict, deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Any, Generic, Literal, TypeVar
+
+from app.config import SYNC_CPU_SLOTS, SYNC_NETWORK_SLOTS, setup_logger
+
+logger = setup_logger(__name__)
+
+T = TypeVar("T")
+
+SyncPriority = Literal["interactive", "bulk"]
+
+# Served strictly in this order, bulk work only runs when no interactive work is waiting
+PRIORITIES: tuple[SyncPriority, ...] = ("interactive", "bulk")
+
+
+class _RoundRobin(Generic[T]):
+    """
+    Per-priority, per-user FIFO lanes. `pop` takes the head of the next user's lane within the
+    highest priority that has work, then moves that user to the back of the rotation.
+    """
+
+    def __init__(self):
+        self._lanes: dict[SyncPriority, OrderedDict[str, deque[T]]] = {
+            priority: OrderedDict() for priority in PRIORITIES
+        }
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def push(self, item: T, user_id: str, priority: SyncPriority) -> None:
+        self._lanes[priority].setdefault(user_id, deque()).append(item)
+        self._size += 1
+
+    def pop(self) -> T | None:
+        for priority in PRIORITIES:
+            users = self._lanes[priority]
+            if not users:
+                continue
+
+            user_id, lane = users.popitem(last=False)
+            item = lane.popleft()
+            if lane:
+                users[user_id] = lane
+            self._size -= 1
+            return item
+
+        return None
+
+    def remove(self, item: T, user_id: str) -> bool:
+        for users in self._lanes.values():
+            lane = users.get(user_id)
+            if lane is None or item not in lane:
+                continue
+
+            lane.remove(item)
+            if not lane:
+                del users[user_id]
+            self._size -= 1
+            return True
+
+        return False
+
+    def counts(self) -> dict[str, dict[str, int]]:
+        return {
+            priority: {user_id: len(lane) for user_id, lane in users.items()}
+            for priority, users in self._lanes.items()
+        }
+
+
+class FairQueue(Generic[T]):
+    """
+    Async queue handing out items round-robin across users, interactive items first.
+    """
+
+    def __init__(self):
+        self._items: _RoundRobin[T] = _RoundRobin()
+        self._available = asyncio.Semaphore(0)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def put_nowait(self, item: T, user_id: str, priority: SyncPriority = "interactive") -> None:
+        self._items.push(item, user_id, priority)
+        self._available.release()
+
+    async def get(self) -> T:
+        await self._available.acquire()
+        return self._items.pop()
+
+    def requeue(self, item: T, user_id: str, priority: SyncPriority) -> bool:
+        """
+        Moves a queued item to the back of its user's lane in `priority`. Returns False when the
+        item is no longer queued.
+        """
+        if not self._items.remove(item, user_id):
+            return False
+        self._items.push(item, user_id, priority)
+        return True
+
+    def counts(self) -> dict[str, dict[str, int]]:
+        return self._items.counts()
+
+
+class FairLimiter:
+    """
+    Global concurrency cap shared by every sync in the process. When all slots are taken, a
+    freed slot goes to the next waiting user in round-robin order, interactive waiters first,
+    so a single large workspace cannot hold every slot while other users queue behind it.
+    """
+
+    def __init__(self, name: str, capacity: int):
+        self.name = name
+        self.capacity = max(capacity, 1)
+        self._in_use = 0
+        self._waiters: _RoundRobin[asyncio.Future] = _RoundRobin()
+
+    @property
+    def in_use(self) -> int:
+        return self._in_use
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self, user_id: str, priority: SyncPriority = "interactive") -> None:
+        if self._in_use < self.capacity and not self._waiters:
+            self._in_use += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.push(future, user_id, priority)
+        try:
+            await future
+        except asyncio.CancelledError:
+            # The slot may have been handed over right before the cancellation
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self) -> None:
+        while self._waiters:
+            future = self._waiters.pop()
+            if not future.done():
+                # The slot passes straight to the waiter, in_use stays the same
+                future.set_result(None)
+                return
+
+        self._in_use -= 1
+
+    @asynccontextmanager
+    async def slot(
+        self, user_id: str, priority: SyncPriority = "interactive"
+    ) -> AsyncIterator[None]:
+        await self.acquire(user_id, priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "capacity": self.capacity,
+            "in_use": self._in_use,
+            "waiting": self._waiters.counts(),
+        }
+
+
+# Notion requests (page block fetches) and local CPU work (extraction, chunking, embedding)
+network_slots = FairLimiter("network", SYNC_NETWORK_SLOTS)
+cpu_slots = FairLimiter("cpu", SYNC_CPU_SLOTS)
@@ -0,0 +1,751 @@
+import asyncio
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+import numpy as np
+
+from app.config import (
+    SYNC_EMBED_CONCURRENCY,
+    SYNC_EXTRACT_CONCURRENCY,
+    SYNC_PAGE_CONCURRENCY,
+    SYNC_STORE_CONCURRENCY,
+    SYNC_STREAM_BLOCK_THRESHOLD,
+    SYNC_STREAM_CONTENT_MAX_CHARS,
+    SYNC_STREAM_GROUP_CHUNKS,
+    SYNC_WATERMARK_SLACK_SECONDS,
+    setup_logger,
+)
+from app.database.operations import (
+    IntegrationOperations,
+    NotionPageOperations,
+    PageChunkOperations,
+    SyncCheckpointOperations,
+)
+from app.services.block_chunker import BlockChunk, BlockChunker, count_truncated
+from app.services.embedding_batcher import embedding_batcher
+from app.services.embedding_service import embedding_service
+from app.services.ingestion_pipeline import IngestionPipeline, Stage, StageStats
+from app.services.notion_service import NotionService, PageTooLargeError, TruncationStats
+from app.services.page_processor import page_processor
+from app.services.sync_scheduler import SyncPriority, cpu_slots, network_slots
+from app.utils import hash_chunk
+
+logger = setup_logger(__name__)
+
+
+@dataclass
+class SyncStats:
+    pages_total: int = 0
+    pages_new: int = 0
+    pages_reindexed: int = 0
+    pages_skipped: int = 0
+    pages_failed: int = 0
+    pages_deleted: int = 0
+    pages_streamed: int = 0
+    chunks_embedded: int = 0
+    chunks_reused: int = 0
+    # Chunks longer than the embedding model's max sequence length, their tail is not embedded
+    chunks_truncated: int = 0
+    errors: list[str] = field(default_factory=list)
+    stages: dict[str, StageStats] = field(default_factory=dict)
+    truncation: TruncationStats = field(default_factory=TruncationStats)
+
+    @property
+    def pages_stored(self) -> int:
+        return self.pages_new + self.pages_reindexed
+
+    @property
+    def pages_done(self) -> int:
+        return self.pages_stored + self.pages_skipped + self.pages_failed + self.pages_deleted
+
+
+@dataclass
+class PageTask:
+    page: dict[str, Any]
+    is_known: bool
+    title: str = "Untitled"
+    blocks: list[dict[str, Any]] = field(default_factory=list)
+    content: str = ""
+    media_metadata: list[dict[str, Any]] = field(default_factory=list)
+    db_page_id: str | None = None
+    chunks: list[BlockChunk] = field(default_factory=list)
+    hashes: list[str] = field(default_factory=list)
+    stored_signatures: dict[int, tuple] = field(default_factory=dict)
+    vectors: dict[str, np.ndarray] = field(default_factory=dict)
+    embedding_model: str | None = None
+    missing: list[str] = field(default_factory=list)
+    batch_index: int = 0
+    streamed: bool = False
+    chunk_count: int = 0
+    embedded_count: int = 0
+
+    @property
+    def page_id(self) -> str | None:
+        return self.page.get("id")
+
+
+def chunk_signature(
+    content_hash: str | None, heading_path: list[str], block_ids: list[str]
+) -> tuple:
+    # A stored chunk is rewritten when its text or its position in the page changed
+    return (content_hash, tuple(heading_path or ()), tuple(block_ids or ()))
+
+
+def stored_signatures(rows: list[dict[str, Any]]) -> dict[int, tuple]:
+    return {
+        row["chunk_index"]: chunk_signature(
+            row.get("content_hash"), row.get("heading_path"), row.get("block_ids")
+        )
+        for row in rows
+    }
+
+
+class SyncCheckpoint:
+    """
+    Persists the progress of one integration's sync: the status of every page sent through the
+    pipeline and the search cursor of the earliest batch that still has unfinished pages. A
+    restarted sync resumes the search from that cursor and skips pages already marked done.
+    """
+
+    def __init__(self, integration_id: str, search_cursor: str | None = None):
+        self.integration_id = integration_id
+        self._cursor = search_cursor
+        self._batch_cursors: list[str | None] = []
+        self._remaining: list[int] = []
+
+    def add_batch(self, cursor: str | None, page_count: int) -> int:
+        self._batch_cursors.append(cursor)
+        self._remaining.append(page_count)
+        return len(self._batch_cursors) - 1
+
+    async def mark_pending(self, page_ids: list[str]) -> None:
+        await asyncio.to_thread(
+            SyncCheckpointOperations.mark_pages_pending, self.integration_id, page_ids
+        )
+
+    async def page_finished(self, task: PageTask, status: str, error: str | None = None) -> None:
+        await asyncio.to_thread(
+            SyncCheckpointOperations.set_page_status,
+            self.integration_id,
+            task.page_id,
+            status,
+            error,
+        )
+
+        self._remaining[task.batch_index] -= 1
+        unfinished = next((i for i, count in enumerate(self._remaining) if count > 0), None)
+        if unfinished is None:
+            return
+
+        # Search results before this batch are fully processed, a resumed sync can start here
+        cursor = self._batch_cursors[unfinished]
+        if cursor != self._cursor:
+            self._cursor = cursor
+            await asyncio.to_thread(
+                SyncCheckpointOperations.update_cursor, self.integration_id, cursor
+            )
+
+
+class NotionSyncService:
+    @staticmethod
+    async def sync_pages(
+        integration: dict[str, Any],
+        recency_months: int = 6,
+        full_resync: bool = False,
+        concurrency: int = SYNC_PAGE_CONCURRENCY,
+        stats: SyncStats | None = None,
+        priority: SyncPriority = "interactive",
+    ) -> SyncStats:
+
+        user_id = integration["user_id"]
+        account_id = integration["account_id"]
+        integration_id = integration["id"]
+
+        # An unfinished checkpoint means the previous sync was interrupted, pick it up where it
+        # stopped unless a full resync was asked for on top of an incremental one
+        checkpoint_row = await asyncio.to_thread(
+            SyncCheckpointOperations.get_checkpoint, integration_id
+        )
+        resuming = (
+            checkpoint_row is not None
+            and checkpoint_row["status"] == "running"
+            and (checkpoint_row["full_resync"] or not full_resync)
+        )
+
+        done_page_ids: set[str] = set()
+        if resuming:
+            recency_months = checkpoint_row["recency_months"]
+            full_resync = checkpoint_row["full_resync"]
+            sync_started_at = NotionService.parse_iso_timestamp(checkpoint_row["started_at"])
+            start_cursor = checkpoint_row.get("search_cursor")
+            done_page_ids = await asyncio.to_thread(
+                SyncCheckpointOperations.get_page_ids, integration_id, "done"
+            )
+            logger.info(
+                f"Resuming interrupted sync for {integration_id}, "
+                f"{len(done_page_ids)} pages already done",
+                "CYAN",
+            )
+        else:
+            # Pages edited while this sync runs must be picked up by the next one
+            sync_started_at = datetime.now(timezone.utc) - timedelta(
+                seconds=SYNC_WATERMARK_SLACK_SECONDS
+            )
+            start_cursor = None
+            await asyncio.to_thread(
+                SyncCheckpointOperations.start_checkpoint,
+                integration_id,
+                recency_months,
+                full_resync,
+                sync_started_at.isoformat(),
+            )
+
+        watermark = None
+        known_edit_times: dict[str, str | None] = {}
+        if not full_resync:
+            watermark = NotionService.parse_iso_timestamp(integration.get("last_synced_at"))
+            known_edit_times = await asyncio.to_thread(
+                NotionPageOperations.get_page_edit_times, integration_id
+            )
+
+        # Callers may pass their own stats object to observe progress while the sync runs
+        stats = stats if stats is not None else SyncStats()
+        checkpoint = SyncCheckpoint(integration_id, start_cursor)
+
+        async def search_batches() -> AsyncIterator[tuple[str | None, list[dict[str, Any]]]]:
+            cursor = start_cursor
+            while True:
+                batches = NotionService.stream_page_batches(
+                    external_user_id=user_id,
+                    account_id=account_id,
+                    recency=recency_months,
+                    since=watermark,
+                    start_cursor=cursor,
+                    truncation=stats.truncation,
+                )
+                started = False
+                try:
+                    async for batch in batches:
+                        started = True
+                        yield batch
+                    return
+                except Exception as e:
+                    if started or not cursor:
+                        raise
+
+                    # Search cursors expire, restart the search and rely on the page statuses
+                    logger.warning(f"Could not resume search from checkpoint, restarting: {e}")
+                    cursor = None
+
+        async def page_tasks() -> AsyncIterator[PageTask]:
+            # Pages enter the pipeline batch by batch as the search returns them
+            async for batch_cursor, pages in search_batches():
+                stats.pages_total += len(pages)
+                batch_tasks: list[PageTask] = []
+
+                for page in pages:
+                    page_id = page.get("id")
+                    is_known = page_id in known_edit_times
+
+                    if page_id in done_page_ids or (
+                        is_known
+                        and NotionSyncService._is_unchanged(page, known_edit_times[page_id])
+                    ):
+                        stats.pages_skipped += 1
+                        continue
+
+                    batch_tasks.append(PageTask(page=page, is_known=is_known))
+
+                batch_index = checkpoint.add_batch(batch_cursor, len(batch_tasks))
+                await checkpoint.mark_pending([task.page_id for task in batch_tasks])
+                for task in batch_tasks:
+                    task.batch_index = batch_index
+                    yield task
+
+            logger.info(f"Fetched {stats.pages_total} page metadata", "WHITE")
+
+        pipeline = NotionSyncService._build_pipeline(
+            user_id=user_id,
+            account_id=account_id,
+            integration_id=integration_id,
+            stats=stats,
+            checkpoint=checkpoint,
+            priority=priority,
+            fetch_concurrency=concurrency,
+        )
+        stats.stages = pipeline.stats
+
+        await pipeline.run(page_tasks())
+
+        if stats.pages_failed == 0:
+            await asyncio.to_thread(
+                IntegrationOperations.update_last_synced_at,
+                integration_id,
+                sync_started_at.isoformat(),
+            )
+
+        # Failed pages are retried by the next sync since the watermark did not move
+        await asyncio.to_thread(SyncCheckpointOperations.complete_checkpoint, integration_id)
+
+        logger.info(
+            f"Sync completed: {stats.pages_new} new, {stats.pages_reindexed} re-indexed, "
+            f"{stats.pages_skipped} unchanged, {stats.pages_failed} failed",
+            "GREEN",
+        )
+        if stats.truncation.truncated:
+            logger.info(f"Sync truncation: {stats.truncation.to_dict()}", "CYAN")
+        logger.info(f"Sync stage timings: {pipeline.stage_summary()}", "CYAN")
+        return stats
+
+    @staticmethod
+    async def sync_page_events(
+        integration: dict[str, Any],
+        changed_page_ids: list[str],
+        deleted_page_ids: list[str],
+        concurrency: int = SYNC_PAGE_CONCURRENCY,
+    ) -> SyncStats:
+        """
+        Applies a debounced set of change events: deleted pages are dropped from the index and
+        changed pages are fetched by id and re-indexed through the regular sync pipeline,
+        without searching the workspace.
+        """
+
+        user_id = integration["user_id"]
+        account_id = integration["account_id"]
+        integration_id = integration["id"]
+        stats = SyncStats(pages_total=len(changed_page_ids) + len(deleted_page_ids))
+
+        async def fetch_metadata(page_id: str) -> dict[str, Any] | None:
+            try:
+                return await NotionService.fetch_page(user_id, account_id, page_id)
+            except Exception as e:
+                logger.error(f"Failed to fetch changed page {page_id}: {e}")
+                stats.pages_failed += 1
+                stats.errors.append(f"{page_id}: fetch: {e}")
+                return None
+
+        pages = await asyncio.gather(*(fetch_metadata(page_id) for page_id in changed_page_ids))
+
+        removed = list(deleted_page_ids)
+        changed: list[dict[str, Any]] = []
+        for page in pages:
+            if page is None:
+                continue
+            if NotionService.is_page_removed(page):
+                removed.append(page["id"])
+            else:
+                changed.append(page)
+
+        for page_id in removed:
+            try:
+                deleted = await asyncio.to_thread(
+                    NotionPageOperations.delete_notion_page, integration_id, page_id
+                )
+            except Exception as e:
+                logger.error(f"Failed to delete page {page_id}: {e}")
+                stats.pages_failed += 1
+                stats.errors.append(f"{page_id}: delete: {e}")
+                continue
+
+            # A page that was never indexed has nothing to delete
+            if deleted:
+                stats.pages_deleted += 1
+            else:
+                stats.pages_skipped += 1
+
+        known_edit_times: dict[str, str | None] = {}
+        if changed:
+            known_edit_times = await asyncio.to_thread(
+                NotionPageOperations.get_page_edit_times,
+                integration_id,
+                notion_page_ids=[page["id"] for page in changed],
+            )
+
+        tasks: list[PageTask] = []
+        for page in changed:
+            page_id = page.get("id")
+            is_known = page_id in known_edit_times
+
+            # Repeated deliveries of an event that was already applied
+            if is_known and NotionSyncService._is_unchanged(page, known_edit_times[page_id]):
+                stats.pages_skipped += 1
+                continue
+
+            tasks.append(PageTask(page=page, is_known=is_known))
+
+        pipeline = NotionSyncService._build_pipeline(
+            user_id=user_id,
+            account_id=account_id,
+            integration_id=integration_id,
+            stats=stats,
+            fetch_concurrency=concurrency,
+        )
+        stats.stages = pipeline.stats
+
+        await pipeline.run(tasks)
+
+        logger.info(
+            f"Applied page events: {stats.pages_new} new, {stats.pages_reindexed} re-indexed, "
+            f"{stats.pages_deleted} deleted, {stats.pages_skipped} unchanged, "
+            f"{stats.pages_failed} failed",
+            "GREEN",
+        )
+        return stats
+
+    @staticmethod
+    def _is_unchanged(page: dict[str, Any], stored_edit_time: str | None) -> bool:
+        last_edited = NotionService.parse_iso_timestamp(page.get("last_edited_time"))
+        stored_edited = NotionService.parse_iso_timestamp(stored_edit_time)
+        return last_edited is not None and last_edited == stored_edited
+
+    @staticmethod
+    def _build_pipeline(
+        user_id: str,
+        account_id: str,
+        integration_id: str,
+        stats: SyncStats,
+        checkpoint: SyncCheckpoint | None = None,
+        priority: SyncPriority = "interactive",
+        fetch_concurrency: int = SYNC_PAGE_CONCURRENCY,
+    ) -> IngestionPipeline:
+        """
+        fetch -> extract -> chunk -> embed -> store. Blocking database calls run in threads,
+        extraction and chunking in the page processing pool and embeddings go through the shared
+        cross-page batcher, so the network bound stages keep making progress while pages are
+        processed. The extract stage only waits on the pool, with a full batch of pages in it
+        at once, the page row is written by the chunk stage.
+
+        Block fetches and embeddings take a slot from the process wide network and CPU limiters,
+        which are shared round-robin between users with interactive syncs served first.
+        """
+
+        async def fetch(task: PageTask) -> PageTask:
+            task.title = NotionService.get_page_title(task.page)
+            logger.info(f"Fetching content for page: {task.title}", "WHITE")
+
+            try:
+                async with network_slots.slot(user_id, priority):
+                    task.blocks = await NotionService.fetch_page_blocks(
+                        external_user_id=user_id,
+                        account_id=account_id,
+                        page_id=task.page_id,
+                        last_edited_time=task.page.get("last_edited_time"),
+                        max_blocks=SYNC_STREAM_BLOCK_THRESHOLD or None,
+                        truncation=stats.truncation,
+                    )
+            except PageTooLargeError as e:
+                logger.info(f"Streaming large page: {task.title}", "WHITE")
+                await NotionSyncService._index_page_streaming(
+                    task=task,
+                    user_id=user_id,
+                    account_id=account_id,
+                    integration_id=integration_id,
+                    stats=stats,
+                    priority=priority,
+                    prefetched=e.prefetched,
+                )
+            return task
+
+        async def extract(task: PageTask) -> PageTask:
+            if task.streamed:
+                return task
+
+            # Extraction and chunking run together in the worker pool, off the event loop
+            processed = await page_processor.process(task.blocks)
+            task.blocks = []
+            task.content = processed.content
+            task.chunks = processed.chunks
+            task.media_metadata = processed.media_metadata
+            task.hashes = processed.hashes
+            stats.chunks_truncated += processed.chunks_truncated
+            return task
+
+        async def chunk(task: PageTask) -> PageTask:
+            if task.streamed:
+                return task
+
+            stored_page = await asyncio.to_thread(
+                NotionPageOperations.upsert_notion_page,
+                integration_id=integration_id,
+                notion_page_id=task.page_id,
+                title=task.title,
+                url=task.page.get("url"),
+                content=task.content,
+                media_metadata=task.media_metadata or None,
+            )
+
+            if not stored_page:
+                raise RuntimeError("failed to store page")
+
+            task.db_page_id = stored_page["id"]
+            task.media_metadata = []
+
+            # Vectors of chunks whose text is already stored for this page are reused as is, as
+            # long as they come from the model new chunks are embedded with
+            task.embedding_model = embedding_service.model_name
+            existing = await asyncio.to_thread(
+                PageChunkOperations.get_chunk_fingerprints, task.db_page_id, task.embedding_model
+            )
+            task.stored_signatures = stored_signatures(existing)
+
+            hashes = set(task.hashes)
+            task.vectors = {
+                row["content_hash"]: row["embedding"]
+                for row in existing
+                if row.get("content_hash") in hashes and row.get("embedding") is not None
+            }
+            task.missing = list(dict.fromkeys(h for h in task.hashes if h not in task.vectors))
+            return task
+
+        async def embed(task: PageTask) -> PageTask:
+            if task.missing:
+                texts_by_hash = {
+                    content_hash: chunk.content
+                    for content_hash, chunk in zip(task.hashes, task.chunks)
+                }
+                logger.info(f"Generating embeddings for {len(task.missing)} new chunks")
+
+                # Several pages wait here at once so the batcher can pack their chunks together
+                async with cpu_slots.slot(user_id, priority):
+                    embeddings = await embedding_batcher.embed(
+                        [texts_by_hash[content_hash] for content_hash in task.missing], priority
+                    )
+                task.vectors.update(zip(task.missing, embeddings))
+            return task
+
+        async def store(task: PageTask) -> None:
+            # Streamed pages already wrote their chunks group by group
+            if not task.streamed:
+                changed = [
+                    {
+                        "chunk_index": idx,
+                        "content": chunk.content,
+                        "content_hash": content_hash,
+                        "heading_path": chunk.heading_path,
+                        "block_ids": chunk.block_ids,
+                        "embedding": task.vectors[content_hash],
+                    }
+                    for idx, (chunk, content_hash) in enumerate(zip(task.chunks, task.hashes))
+                    if task.stored_signatures.get(idx)
+                    != chunk_signature(content_hash, chunk.heading_path, chunk.block_ids)
+                ]
+
+                await asyncio.to_thread(
+                    PageChunkOperations.replace_page_chunks,
+                    page_id=task.db_page_id,
+                    chunk_count=len(task.chunks),
+                    chunks=changed,
+                    embedding_model=task.embedding_model,
+                )
+
+                missing = set(task.missing)
+                task.chunk_count = len(task.chunks)
+                task.embedded_count = sum(1 for h in task.hashes if h in missing)
+
+            # Only recorded once the chunks are stored, a page that failed halfway through is
+            # therefore never mistaken for an unchanged one on the next sync
+            await asyncio.to_thread(
+                NotionPageOperations.mark_page_indexed,
+                task.db_page_id,
+                task.page.get("last_edited_time"),
+            )
+
+            stats.chunks_embedded += task.embedded_count
+            stats.chunks_reused += task.chunk_count - task.embedded_count
+
+            if task.is_known:
+                stats.pages_reindexed += 1
+            else:
+                stats.pages_new += 1
+
+            logger.info(
+                f"Completed page: {task.title} ({task.chunk_count} chunks, "
+                f"{task.embedded_count} embedded)",
+                "GREEN",
+            )
+
+            if checkpoint:
+                await checkpoint.page_finished(task, "done")
+
+        async def on_error(task: PageTask, stage: str, error: Exception) -> None:
+            logger.error(f"Failed to process page {task.page_id} during {stage}: {error}")
+            stats.pages_failed += 1
+            stats.errors.append(f"{task.page_id}: {stage}: {error}")
+
+            if checkpoint:
+                await checkpoint.page_finished(task, "failed", f"{stage}: {error}")
+
+        return IngestionPipeline(
+            stages=[
+                Stage("fetch", fetch, concurrency=fetch_concurrency),
+                # Fewer pages in flight than a batch holds would leave every batch short
+                Stage("extract", extract, concurrency=page_processor.batch_pages),
+                Stage("chunk", chunk, concurrency=SYNC_EXTRACT_CONCURRENCY),
+                Stage("embed", embed, concurrency=SYNC_EMBED_CONCURRENCY),
+                Stage("store", store, concurrency=SYNC_STORE_CONCURRENCY),
+            ],
+            on_error=on_error,
+        )
+
+    @staticmethod
+    async def _index_page_streaming(
+        task: PageTask,
+        user_id: str,
+        account_id: str,
+        integration_id: str,
+        stats: SyncStats,
+        priority: SyncPriority = "interactive",
+        prefetched: dict[str, list[dict[str, Any]]] | None = None,
+    ) -> None:
+        """
+        Indexes a page too large to hold as a block tree. Text is extracted while the blocks are
+        walked, and chunks are embedded and written in groups of SYNC_STREAM_GROUP_CHUNKS, so
+        memory stays flat whatever the page size. The stored page content keeps the first
+        SYNC_STREAM_CONTENT_MAX_CHARS characters, the chunks cover the whole page.
+
+        The walk starts from the children `fetch_page_blocks` fetched before giving up. A network
+        slot is only held while blocks are fetched, it is given back before each group is
+        embedded and written.
+        """
+        task.streamed = True
+        task.blocks = []
+        stats.pages_streamed += 1
+
+        # The chunks need the page row first, its content is filled in once the walk is done
+        stored_page = await asyncio.to_thread(
+            NotionPageOperations.upsert_notion_page,
+            integration_id=integration_id,
+            notion_page_id=task.page_id,
+            title=task.title,
+            url=task.page.get("url"),
+            content="",
+        )
+        if not stored_page:
+            raise RuntimeError("failed to store page")
+
+        page_id = stored_page["id"]
+        task.db_page_id = page_id
+        stored = stored_signatures(
+            await asyncio.to_thread(PageChunkOperations.get_chunk_metadata, page_id)
+        )
+
+        chunker = BlockChunker()
+        group: list[BlockChunk] = []
+        content_parts: list[str] = []
+        content_length = 0
+        content_truncated = False
+        media_metadata: list[dict[str, Any]] = []
+
+        async def write_group(chunks: list[BlockChunk]) -> None:
+            first_index = task.chunk_count
+            task.chunk_count += len(chunks)
+            stats.chunks_truncated += await asyncio.to_thread(count_truncated, chunks)
+
+            rows = []
+            for offset, chunk in enumerate(chunks):
+                content_hash = hash_chunk(chunk.content)
+                signature = chunk_signature(content_hash, chunk.heading_path, chunk.block_ids)
+                if stored.get(first_index + offset) != signature:
+                    rows.append((first_index + offset, chunk, content_hash))
+            if not rows:
+                return
+
+            embedding_model = embedding_service.model_name
+            vectors = await asyncio.to_thread(
+                PageChunkOperations.get_chunk_embeddings,
+                page_id,
+                list({content_hash for _, _, content_hash in rows}),
+                embedding_model,
+            )
+            missing = list(dict.fromkeys(h for _, _, h in rows if h not in vectors))
+            if missing:
+                texts_by_hash = {content_hash: chunk.content for _, chunk, content_hash in rows}
+                async with cpu_slots.slot(user_id, priority):
+                    embeddings = await embedding_batcher.embed(
+                        [texts_by_hash[content_hash] for content_hash in missing], priority
+                    )
+                vectors.update(zip(missing, embeddings))
+                embedded = set(missing)
+                task.embedded_count += sum(1 for _, _, h in rows if h in embedded)
+
+            await asyncio.to_thread(
+                PageChunkOperations.replace_page_chunks,
+                page_id=page_id,
+                chunk_count=None,
+                chunks=[
+                    {
+                        "chunk_index": idx,
+                        "content": chunk.content,
+                        "content_hash": content_hash,
+                        "heading_path": chunk.heading_path,
+                        "block_ids": chunk.block_ids,
+                        "embedding": vectors[content_hash],
+                    }
+                    for idx, chunk, content_hash in rows
+                ],
+                embedding_model=embedding_model,
+            )
+
+        blocks = NotionService.stream_page_blocks(
+            external_user_id=user_id,
+            account_id=account_id,
+            page_id=task.page_id,
+            truncation=stats.truncation,
+            prefetched=prefetched,
+        )
+        walked = False
+        try:
+            while not walked:
+                async with network_slots.slot(user_id, priority):
+                    while len(group) < SYNC_STREAM_GROUP_CHUNKS:
+                        item = await anext(blocks, None)
+                        if item is None:
+                            walked = True
+                            break
+
+                        block, depth = item
+                        block_text, block_media = NotionService.extract_from_single_block(block)
+                        media_metadata.extend(block_media)
+                        group.extend(chunker.add(block, depth))
+
+                        if not block_text:
+                            continue
+
+                        if content_length < SYNC_STREAM_CONTENT_MAX_CHARS:
+                            content_parts.append(block_text)
+                            content_length += len(block_text) + 1
+                        else:
+                            content_truncated = True
+
+                if walked:
+                    group.extend(chunker.finish())
+                if group:
+                    await write_group(group)
+                    group = []
+        finally:
+            await blocks.aclose()
+
+        # Drop whatever the previous version of the page had past its new end
+        await asyncio.to_thread(
+            PageChunkOperations.replace_page_chunks,
+            page_id=page_id,
+            chunk_count=task.chunk_count,
+            chunks=[],
+        )
+
+        content = "\n".join(content_parts)
+        if content_truncated or len(content) > SYNC_STREAM_CONTENT_MAX_CHARS:
+            stats.truncation.pages_content_truncated += 1
+            content = content[:SYNC_STREAM_CONTENT_MAX_CHARS]
+
+        await asyncio.to_thread(
+            NotionPageOperations.upsert_notion_page,
+            integration_id=integration_id,
+            notion_page_id=task.page_id,
+            title=task.title,
+            url=task.page.get("url"),
+            content=content,
+            media_metadata=media_metadata if media_metadata else None,
+        )
@@ -1,27 +1,99 @@
+import hashlib
+from functools import lru_cache
+
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 
-from app.config import CHUNK_OVERLAP, CHUNK_SIZE, setup_logger
+from app.config import (
+    CHUNK_OVERLAP,
+    CHUNK_OVERLAP_TOKENS,
+    CHUNK_SIZE,
+    CHUNK_SIZE_TOKENS,
+    CHUNK_UNIT,
+    EMBEDDING_MODEL,
+    setup_logger,
+)
 
 logger = setup_logger(__name__)
 
+CHUNK_SEPARATORS = ["\n\n", "\n", ". ", " ", ""]
+
+
+@lru_cache(maxsize=4)
+def get_tokenizer(model: str = EMBEDDING_MODEL):
+    # Only the tokenizer files are loaded, the model weights stay with the embedding service
+    from transformers import AutoTokenizer
+
+    logger.info(f"Loading tokenizer: {model}")
+    return AutoTokenizer.from_pretrained(model, use_fast=True)
+
+
+def count_tokens(texts: list[str], model: str = EMBEDDING_MODEL) -> list[int]:
+    if not texts:
+        return []
+
+    encoded = get_tokenizer(model)(
+        texts,
+        add_special_tokens=False,
+        return_attention_mask=False,
+        return_token_type_ids=False,
+        verbose=False,
+    )
+    return [len(ids) for ids in encoded["input_ids"]]
+
+
+def measure_texts(texts: list[str], unit: str = CHUNK_UNIT) -> list[int]:
+    if unit == "tokens":
+        return count_tokens(texts)
+    return [len(text) for text in texts]
+
+
+def default_chunk_size(unit: str = CHUNK_UNIT) -> tuple[int, int]:
+    if unit == "tokens":
+        return (CHUNK_SIZE_TOKENS, CHUNK_OVERLAP_TOKENS)
+    return (CHUNK_SIZE, CHUNK_OVERLAP)
+
+
+@lru_cache(maxsize=16)
+def _get_text_splitter(unit: str, chunk_size: int, chunk_overlap: int):
+    if unit == "tokens":
+        return RecursiveCharacterTextSplitter.from_huggingface_tokenizer(
+            get_tokenizer(),
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            separators=CHUNK_SEPARATORS,
+        )
+
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=len,
+        separators=CHUNK_SEPARATORS,
+    )
+
 
 def chunk_text(
     text: str,
-    chunk_size: int = CHUNK_SIZE,
-    chunk_overlap: int = CHUNK_OVERLAP,
+    chunk_size: int | None = None,
+    chunk_overlap: int | None = None,
+    unit: str = CHUNK_UNIT,
 ) -> list[str]:
 
     if not text or not text.strip():
         return []
 
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size,
-        chunk_overlap=chunk_overlap,
-        length_function=len,
-        separators=["\n\n", "\n", ". ", " ", ""],
+    default_size, default_overlap = default_chunk_size(unit)
+    chunk_size = chunk_size or default_size
+    chunk_overlap = min(
+        default_overlap if chunk_overlap is None else chunk_overlap, chunk_size // 2
     )
 
+    text_splitter = _get_text_splitter(unit, chunk_size, chunk_overlap)
+
     chunks = text_splitter.split_text(text)
     logger.info(f"Split text into {len(chunks)} chunks", "CYAN")
 
     return chunks
+
+
+def hash_chunk(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
@@ -0,0 +1,102 @@
+"""
+Compares the embedding backends: throughput (texts/second), peak RSS, and cosine agreement of
+every backend's vectors with the reference sentence-transformers model on the same texts. Each
+backend runs in a fresh process so its memory is measured on its own.
+
+    python -m benchmarks.embedding_backends --texts 512 --backends torch onnx onnx-int8
+"""
+
+import argparse
+import multiprocessing
+import random
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+WORDS = (
+    "notion page block toggle heading paragraph meeting notes roadmap release planning "
+    "design review customer feedback backlog sprint retro incident onboarding checklist "
+    "the a of to and in for with on is was we our team will should next week"
+).split()
+
+
+def make_texts(num_texts: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    # Mostly chunk sized texts, with some short ones the size of search queries
+    return [
+        " ".join(rng.choices(WORDS, k=rng.choice([rng.randint(3, 12), rng.randint(40, 200)])))
+        for _ in range(num_texts)
+    ]
+
+
+def peak_rss_mb() -> float:
+    # Kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(backend: str, texts: list[str]) -> dict:
+    from app.services.embedding_backends import load_backend
+
+    baseline = peak_rss_mb()
+    started = time.perf_counter()
+    model = load_backend(backend)
+    load_seconds = time.perf_counter() - started
+
+    model.encode(texts[:8])
+
+    started = time.perf_counter()
+    vectors = np.asarray(model.encode(texts), dtype=np.float32)
+    elapsed = time.perf_counter() - started
+
+    return {
+        "backend": backend,
+        "load_seconds": round(load_seconds, 1),
+        "texts_per_second": round(len(texts) / elapsed, 1),
+        "rss_mb": round(peak_rss_mb() - baseline, 1),
+        "vectors": vectors,
+    }
+
+
+def cosine(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return (a * b).sum(axis=1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--texts", type=int, default=256)
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "onnx-int8"])
+    parser.add_argument("--texts-file", help="one text per line, instead of generated texts")
+    args = parser.parse_args()
+
+    if args.texts_file:
+        with open(args.texts_file, encoding="utf-8") as f:
+            texts = [line.strip() for line in f if line.strip()][: args.texts]
+    else:
+        texts = make_texts(args.texts)
+
+    backends = ["torch"] + [backend for backend in args.backends if backend != "torch"]
+    results = []
+    for backend in backends:
+        with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            results.append(pool.submit(measure, backend, texts).result())
+
+    reference = results[0]["vectors"]
+    print(
+        f"{'backend':>10} {'load s':>7} {'texts/s':>8} {'rss MB':>7} "
+        f"{'cos mean':>9} {'cos min':>8}"
+    )
+    for result in results:
+        agreement = cosine(result["vectors"], reference)
+        print(
+            f"{result['backend']:>10} {result['load_seconds']:>7} "
+            f"{result['texts_per_second']:>8} {result['rss_mb']:>7} "
+            f"{agreement.mean():>9.4f} {agreement.min():>8.4f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Measures cross-page embedding throughput (chunks/second) for different batch sizes and flush
+intervals. Pages are simulated with a realistic spread of chunk counts, every page submits its
+chunks concurrently the way the sync pipeline's embed stage does.
+
+    python -m benchmarks.embedding_batcher --pages 200 --batch-sizes 1 16 64 --flush 0.01 0.05
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from app.services.embedding_batcher import EmbeddingBatcher
+from app.services.embedding_service import embedding_service
+
+WORDS = (
+    "notion page block toggle heading paragraph meeting notes roadmap release planning "
+    "design review customer feedback backlog sprint retro incident onboarding checklist"
+).split()
+
+
+def make_pages(num_pages: int, seed: int = 0) -> list[list[str]]:
+    rng = random.Random(seed)
+    pages = []
+    for _ in range(num_pages):
+        # Most pages are small, a few are long
+        num_chunks = min(int(rng.expovariate(1 / 4)) + 1, 60)
+        pages.append(
+            [" ".join(rng.choices(WORDS, k=rng.randint(20, 90))) for _ in range(num_chunks)]
+        )
+    return pages
+
+
+async def run(pages: list[list[str]], batch_size: int, flush_interval: float) -> dict:
+    batcher = EmbeddingBatcher(batch_size=batch_size, flush_interval=flush_interval)
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(batcher.embed(chunks) for chunks in pages))
+    finally:
+        await batcher.close()
+    elapsed = time.perf_counter() - started
+
+    total = sum(len(chunks) for chunks in pages)
+    return {
+        "batch_size": batch_size,
+        "flush_interval": flush_interval,
+        "chunks": total,
+        "batches": batcher.stats.batches,
+        "avg_batch": round(batcher.stats.avg_batch_size, 1),
+        "chunks_per_second": round(total / elapsed, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32, 64, 128])
+    parser.add_argument("--flush", type=float, nargs="+", default=[0.01, 0.05])
+    args = parser.parse_args()
+
+    pages = make_pages(args.pages)
+
+    # Load the model up front so the first configuration is not charged for it
+    embedding_service.get_model()
+
+    print(f"{'batch':>6} {'flush':>7} {'chunks':>7} {'batches':>8} {'avg':>6} {'chunks/s':>9}")
+    for batch_size in args.batch_sizes:
+        for flush_interval in args.flush:
+            result = asyncio.run(run(pages, batch_size, flush_interval))
+            print(
+                f"{result['batch_size']:>6} {result['flush_interval']:>7} {result['chunks']:>7} "
+                f"{result['batches']:>8} {result['avg_batch']:>6} "
+                f"{result['chunks_per_second']:>9}"
+            )
+
+
+if __name__ == "__main__":
+    main()
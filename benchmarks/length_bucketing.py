@@ -0,0 +1,81 @@
+"""
+Measures embedding throughput (chunks/second) on mixed-length chunks: fixed size batches in
+document order against length-sorted batches sized by a padded-token budget. Also reports the
+share of the padded batches taken up by real tokens.
+
+    python -m benchmarks.length_bucketing --chunks 1024 --batch-size 32 --budgets 4096 8192 16384
+"""
+
+import argparse
+import random
+import time
+
+from app.config import EMBED_MAX_BATCH, EMBEDDING_MAX_TOKENS
+from app.services.embedding_backends import plan_batches
+from app.services.embedding_service import embedding_service
+from app.utils import count_tokens
+
+WORDS = (
+    "notion page block toggle heading paragraph meeting notes roadmap release planning "
+    "design review customer feedback backlog sprint retro incident onboarding checklist"
+).split()
+
+
+def make_chunks(num_chunks: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    chunks = []
+    for _ in range(num_chunks):
+        # Pages mix one line list items and headings with full paragraphs
+        words = rng.randint(2, 12) if rng.random() < 0.6 else rng.randint(60, 250)
+        chunks.append(" ".join(rng.choices(WORDS, k=words)))
+    return chunks
+
+
+def fill_rate(lengths: list[int], batches: list[list[int]]) -> float:
+    padded = sum(len(batch) * max(lengths[i] for i in batch) for batch in batches)
+    return sum(lengths) / padded
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chunks", type=int, default=512)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--budgets", type=int, nargs="+", default=[4096, 8192, 16384])
+    args = parser.parse_args()
+
+    chunks = make_chunks(args.chunks)
+    lengths = [min(count + 2, EMBEDDING_MAX_TOKENS) for count in count_tokens(chunks)]
+
+    model = embedding_service.get_model()
+    model.encode_batch(chunks[:8])
+
+    print(f"{'batching':>16} {'batches':>8} {'fill':>6} {'chunks/s':>9}")
+
+    # Document order, a fixed number of texts per batch
+    fixed = [
+        list(range(start, min(start + args.batch_size, len(chunks))))
+        for start in range(0, len(chunks), args.batch_size)
+    ]
+    started = time.perf_counter()
+    for batch in fixed:
+        model.encode_batch([chunks[i] for i in batch])
+    elapsed = time.perf_counter() - started
+    print(
+        f"{f'fixed {args.batch_size}':>16} {len(fixed):>8} {fill_rate(lengths, fixed):>6.2f} "
+        f"{len(chunks) / elapsed:>9.1f}"
+    )
+
+    for budget in args.budgets:
+        batches = plan_batches(lengths, budget, EMBED_MAX_BATCH)
+        model.token_budget = budget
+        started = time.perf_counter()
+        model.encode(chunks)
+        elapsed = time.perf_counter() - started
+        print(
+            f"{f'bucketed {budget}':>16} {len(batches):>8} {fill_rate(lengths, batches):>6.2f} "
+            f"{len(chunks) / elapsed:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
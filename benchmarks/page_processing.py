@@ -0,0 +1,115 @@
+"""
+Measures extraction and chunking throughput (pages/second) as the number of worker processes
+grows. Pages are simulated Notion block trees with a realistic spread of sizes, fed through an
+ingestion pipeline whose extract stage works like the sync's: `--extract-concurrency` pages in
+the processor at once, as many as a batch holds unless given. `0` workers runs in a thread.
+
+    python -m benchmarks.page_processing --pages 400 --workers 0 1 2 4 --batch-pages 8
+    python -m benchmarks.page_processing --workers 2 --extract-concurrency 2 8
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from typing import Any
+
+from app.services.ingestion_pipeline import IngestionPipeline, Stage
+from app.services.page_processor import PageProcessor, ProcessedPage
+
+WORDS = (
+    "notion page block toggle heading paragraph meeting notes roadmap release planning "
+    "design review customer feedback backlog sprint retro incident onboarding checklist"
+).split()
+
+BLOCK_TYPES = ["paragraph"] * 6 + ["bulleted_list_item"] * 3 + ["heading_2", "toggle"]
+
+
+def make_block(rng: random.Random, block_type: str, depth: int = 0) -> dict[str, Any]:
+    text = " ".join(rng.choices(WORDS, k=rng.randint(5, 120)))
+    block = {
+        "id": f"{rng.getrandbits(64):016x}",
+        "type": block_type,
+        block_type: {"rich_text": [{"type": "text", "plain_text": text}]},
+    }
+    if block_type == "toggle" and depth < 2:
+        block["has_children"] = True
+        block["children"] = [
+            make_block(rng, "paragraph", depth + 1) for _ in range(rng.randint(1, 6))
+        ]
+    return block
+
+
+def make_pages(num_pages: int, seed: int = 0) -> list[list[dict[str, Any]]]:
+    rng = random.Random(seed)
+    pages = []
+    for _ in range(num_pages):
+        # Most pages are small, a few are long
+        num_blocks = min(int(rng.expovariate(1 / 40)) + 1, 800)
+        pages.append([make_block(rng, rng.choice(BLOCK_TYPES)) for _ in range(num_blocks)])
+    return pages
+
+
+async def run(
+    pages: list[list[dict[str, Any]]],
+    workers: int,
+    batch_pages: int,
+    extract_concurrency: int | None = None,
+) -> dict:
+    processor = PageProcessor(workers=workers, batch_pages=batch_pages)
+    extract_concurrency = extract_concurrency or processor.batch_pages
+    results: list[ProcessedPage] = []
+
+    async def collect(result: ProcessedPage) -> None:
+        results.append(result)
+
+    pipeline = IngestionPipeline(
+        stages=[
+            Stage("extract", processor.process, concurrency=extract_concurrency),
+            Stage("collect", collect),
+        ]
+    )
+    try:
+        # Start the worker processes (and load their tokenizer) before timing
+        await asyncio.gather(*(processor.process(page) for page in pages[: max(workers, 1)]))
+
+        started = time.perf_counter()
+        await pipeline.run(pages)
+        elapsed = time.perf_counter() - started
+    finally:
+        await processor.close()
+
+    return {
+        "workers": workers,
+        "batch_pages": batch_pages,
+        "extract_concurrency": extract_concurrency,
+        "pages": len(results),
+        "chunks": sum(len(result.chunks) for result in results),
+        "pages_per_second": round(len(results) / elapsed, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, 4])
+    parser.add_argument("--batch-pages", type=int, nargs="+", default=[8])
+    parser.add_argument("--extract-concurrency", type=int, nargs="+", default=[0])
+    args = parser.parse_args()
+
+    pages = make_pages(args.pages)
+
+    print(f"{'workers':>8} {'batch':>6} {'extract':>8} {'pages':>6} {'chunks':>7} {'pages/s':>8}")
+    for workers in args.workers:
+        for batch_pages in args.batch_pages:
+            for extract_concurrency in args.extract_concurrency:
+                result = asyncio.run(run(pages, workers, batch_pages, extract_concurrency))
+                print(
+                    f"{result['workers']:>8} {result['batch_pages']:>6} "
+                    f"{result['extract_concurrency']:>8} {result['pages']:>6} "
+                    f"{result['chunks']:>7} {result['pages_per_second']:>8}"
+                )
+
+
+if __name__ == "__main__":
+    main()
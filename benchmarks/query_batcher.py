@@ -0,0 +1,92 @@
+"""
+Measures search query embedding latency (p50/p99) under concurrent load, one encode per query
+against queries coalesced by the micro-batcher. Each client sends its queries back to back,
+the way concurrent /notion/search requests and chat tool calls arrive.
+
+    python -m benchmarks.query_batcher --clients 1 8 32 --queries 20 --max-wait-ms 2 5
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+import numpy as np
+
+from app.services.embedding_batcher import EmbeddingBatcher
+from app.services.embedding_service import embedding_service
+
+WORDS = (
+    "roadmap release planning design review customer feedback backlog sprint retro incident "
+    "onboarding checklist meeting notes pricing hiring budget okrs launch migration"
+).split()
+
+
+def encode(texts: list[str], priority: str = "interactive") -> np.ndarray:
+    # Straight to the model, the embedding cache would hide the cost being measured
+    return embedding_service.get_model().encode(texts)
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * pct), len(ordered) - 1)]
+
+
+async def run(clients: int, queries: int, batch_size: int, max_wait_ms: float, seed: int) -> dict:
+    rng = random.Random(seed)
+    batcher = EmbeddingBatcher(
+        embed_fn=encode, batch_size=batch_size, flush_interval=max_wait_ms / 1000
+    )
+    latencies: list[float] = []
+
+    async def client() -> None:
+        for _ in range(queries):
+            query = " ".join(rng.choices(WORDS, k=rng.randint(3, 12)))
+            started = time.perf_counter()
+            await batcher.embed([query])
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(client() for _ in range(clients)))
+    finally:
+        await batcher.close()
+    elapsed = time.perf_counter() - started
+
+    return {
+        "clients": clients,
+        "batch_size": batch_size,
+        "max_wait_ms": max_wait_ms,
+        "p50_ms": round(statistics.median(latencies), 1),
+        "p99_ms": round(percentile(latencies, 0.99), 1),
+        "queries_per_second": round(len(latencies) / elapsed, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, nargs="+", default=[2, 5])
+    args = parser.parse_args()
+
+    # Load the model up front so the first configuration is not charged for it
+    encode(["warm up"])
+
+    print(f"{'clients':>8} {'batch':>6} {'wait':>5} {'p50 ms':>8} {'p99 ms':>8} {'q/s':>7}")
+    for clients in args.clients:
+        # A batch size of 1 is the old behaviour, one encode per query
+        configs = [(1, 0.0)] + [(args.batch_size, wait) for wait in args.max_wait_ms]
+        for batch_size, max_wait_ms in configs:
+            result = asyncio.run(run(clients, args.queries, batch_size, max_wait_ms, seed=0))
+            print(
+                f"{result['clients']:>8} {result['batch_size']:>6} {result['max_wait_ms']:>5} "
+                f"{result['p50_ms']:>8} {result['p99_ms']:>8} "
+                f"{result['queries_per_second']:>7}"
+            )
+
+
+if __name__ == "__main__":
+    main()
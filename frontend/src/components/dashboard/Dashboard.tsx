@@ -45,6 +45,7 @@ import Chat from '../chat/Chat';
 
 const DRAWER_WIDTH = 240;
 const backendUrl = import.meta.env.VITE_BACKEND_URL;
+const SYNC_POLL_INTERVAL_MS = 2000;
 
 interface ConnectPortalCloseStatus {
   successful: boolean;
@@ -266,8 +267,29 @@ export default function Dashboard() {
         throw new Error(body.detail || 'Failed to sync Notion pages');
       }
 
-      const result = await response.json();
-      toast.success(result.message || 'Sync completed successfully');
+      const { job_id: jobId } = await response.json();
+
+      // Syncs run as background jobs, poll until this one finishes
+      while (true) {
+        await new Promise(resolve => setTimeout(resolve, SYNC_POLL_INTERVAL_MS));
+
+        const statusResponse = await fetch(`${backendUrl}/api/v1/notion/sync/${jobId}`);
+        if (!statusResponse.ok) {
+          throw new Error('Failed to fetch sync status');
+        }
+
+        const job = await statusResponse.json();
+        if (job.status === 'failed') {
+          throw new Error(job.error || 'Failed to sync Notion pages');
+        }
+        if (job.status === 'completed') {
+          toast.success(
+            `Synced ${job.pages_new + job.pages_reindexed} of ${job.pages_total} pages` +
+              (job.pages_skipped ? `, ${job.pages_skipped} unchanged` : '')
+          );
+          break;
+        }
+      }
     } catch (error) {
       toast.error(error instanceof Error ? error.message : 'Failed to sync Notion pages');
       console.error(error);
@@ -0,0 +1,5 @@
+-- Track Notion edit times so unchanged pages can be skipped on re-sync
+ALTER TABLE notion_pages ADD COLUMN IF NOT EXISTS last_edited_time TIMESTAMPTZ;
+
+-- Watermark of the last sync that completed without failures
+ALTER TABLE integrations ADD COLUMN IF NOT EXISTS last_synced_at TIMESTAMPTZ;
@@ -0,0 +1,2 @@
+-- Hash of the chunk text, lets re-syncs reuse embeddings of unchanged chunks
+ALTER TABLE page_chunks ADD COLUMN IF NOT EXISTS content_hash TEXT;
@@ -0,0 +1,52 @@
+-- Earlier syncs appended a new row per chunk on every run, keep only the latest one per slot
+DELETE FROM page_chunks a
+USING page_chunks b
+WHERE a.page_id = b.page_id
+  AND a.chunk_index = b.chunk_index
+  AND (a.created_at, a.id) < (b.created_at, b.id);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_page_chunks_page_chunk_index
+    ON page_chunks(page_id, chunk_index);
+
+-- Writes the changed chunks of a page and drops every chunk at or past p_chunk_count in a
+-- single transaction. Unchanged chunks can be left out of p_chunks entirely.
+CREATE OR REPLACE FUNCTION replace_page_chunks(
+    p_page_id uuid,
+    p_chunk_count int,
+    p_chunks jsonb DEFAULT '[]'::jsonb
+)
+RETURNS int
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    written int;
+BEGIN
+    INSERT INTO page_chunks (page_id, chunk_index, content, content_hash, embedding)
+    SELECT
+        p_page_id,
+        c.chunk_index,
+        c.content,
+        c.content_hash,
+        c.embedding::vector
+    FROM jsonb_to_recordset(p_chunks) AS c(
+        chunk_index int,
+        content text,
+        content_hash text,
+        embedding text
+    )
+    WHERE c.chunk_index < p_chunk_count
+    ON CONFLICT (page_id, chunk_index) DO UPDATE
+    SET
+        content = EXCLUDED.content,
+        content_hash = EXCLUDED.content_hash,
+        embedding = EXCLUDED.embedding
+    WHERE page_chunks.content_hash IS DISTINCT FROM EXCLUDED.content_hash;
+
+    GET DIAGNOSTICS written = ROW_COUNT;
+
+    DELETE FROM page_chunks
+    WHERE page_id = p_page_id AND chunk_index >= p_chunk_count;
+
+    RETURN written;
+END;
+$$;
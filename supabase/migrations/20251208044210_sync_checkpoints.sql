@@ -0,0 +1,52 @@
+-- One checkpoint per integration, a sync left in 'running' was interrupted and is resumed
+CREATE TABLE sync_checkpoints (
+    integration_id UUID PRIMARY KEY REFERENCES integrations(id) ON DELETE CASCADE,
+    status TEXT NOT NULL CHECK (status IN ('running', 'completed')),
+    search_cursor TEXT,
+    recency_months INT NOT NULL DEFAULT 6,
+    full_resync BOOLEAN NOT NULL DEFAULT FALSE,
+    started_at TIMESTAMPTZ DEFAULT NOW() NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW() NOT NULL,
+    updated_at TIMESTAMPTZ DEFAULT NOW() NOT NULL
+);
+
+CREATE INDEX idx_sync_checkpoints_status ON sync_checkpoints(status);
+
+CREATE TRIGGER update_sync_checkpoints_timestamp
+    BEFORE UPDATE ON sync_checkpoints
+    FOR EACH ROW
+    EXECUTE FUNCTION update_timestamp();
+
+-- Per-page progress of the current sync of an integration
+CREATE TABLE sync_page_status (
+    integration_id UUID NOT NULL REFERENCES integrations(id) ON DELETE CASCADE,
+    notion_page_id TEXT NOT NULL,
+    status TEXT NOT NULL CHECK (status IN ('pending', 'done', 'failed')),
+    error TEXT,
+    updated_at TIMESTAMPTZ DEFAULT NOW() NOT NULL,
+    PRIMARY KEY (integration_id, notion_page_id)
+);
+
+CREATE TRIGGER update_sync_page_status_timestamp
+    BEFORE UPDATE ON sync_page_status
+    FOR EACH ROW
+    EXECUTE FUNCTION update_timestamp();
+
+ALTER TABLE sync_checkpoints ENABLE ROW LEVEL SECURITY;
+ALTER TABLE sync_page_status ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Users can view their own sync checkpoints"
+ON sync_checkpoints FOR SELECT
+USING (
+  integration_id IN (
+    SELECT id FROM integrations WHERE user_id = auth.uid()
+  )
+);
+
+CREATE POLICY "Users can view their own sync page status"
+ON sync_page_status FOR SELECT
+USING (
+  integration_id IN (
+    SELECT id FROM integrations WHERE user_id = auth.uid()
+  )
+);
@@ -0,0 +1,44 @@
+-- A NULL p_chunk_count writes p_chunks without trimming the page, large pages are streamed in
+-- groups this way and trimmed to their final chunk count by a last call
+CREATE OR REPLACE FUNCTION replace_page_chunks(
+    p_page_id uuid,
+    p_chunk_count int,
+    p_chunks jsonb DEFAULT '[]'::jsonb
+)
+RETURNS int
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    written int;
+BEGIN
+    INSERT INTO page_chunks (page_id, chunk_index, content, content_hash, embedding)
+    SELECT
+        p_page_id,
+        c.chunk_index,
+        c.content,
+        c.content_hash,
+        c.embedding::vector
+    FROM jsonb_to_recordset(p_chunks) AS c(
+        chunk_index int,
+        content text,
+        content_hash text,
+        embedding text
+    )
+    WHERE p_chunk_count IS NULL OR c.chunk_index < p_chunk_count
+    ON CONFLICT (page_id, chunk_index) DO UPDATE
+    SET
+        content = EXCLUDED.content,
+        content_hash = EXCLUDED.content_hash,
+        embedding = EXCLUDED.embedding
+    WHERE page_chunks.content_hash IS DISTINCT FROM EXCLUDED.content_hash;
+
+    GET DIAGNOSTICS written = ROW_COUNT;
+
+    IF p_chunk_count IS NOT NULL THEN
+        DELETE FROM page_chunks
+        WHERE page_id = p_page_id AND chunk_index >= p_chunk_count;
+    END IF;
+
+    RETURN written;
+END;
+$$;
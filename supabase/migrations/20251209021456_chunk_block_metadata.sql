@@ -0,0 +1,101 @@
+-- Chunks are packed from whole blocks, record where in the page each one comes from
+ALTER TABLE page_chunks
+    ADD COLUMN IF NOT EXISTS heading_path TEXT[] NOT NULL DEFAULT '{}',
+    ADD COLUMN IF NOT EXISTS block_ids TEXT[] NOT NULL DEFAULT '{}';
+
+CREATE OR REPLACE FUNCTION replace_page_chunks(
+    p_page_id uuid,
+    p_chunk_count int,
+    p_chunks jsonb DEFAULT '[]'::jsonb
+)
+RETURNS int
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    written int;
+BEGIN
+    INSERT INTO page_chunks (
+        page_id, chunk_index, content, content_hash, embedding, heading_path, block_ids
+    )
+    SELECT
+        p_page_id,
+        c.chunk_index,
+        c.content,
+        c.content_hash,
+        c.embedding::vector,
+        COALESCE(c.heading_path, '{}'),
+        COALESCE(c.block_ids, '{}')
+    FROM jsonb_to_recordset(p_chunks) AS c(
+        chunk_index int,
+        content text,
+        content_hash text,
+        embedding text,
+        heading_path text[],
+        block_ids text[]
+    )
+    WHERE p_chunk_count IS NULL OR c.chunk_index < p_chunk_count
+    ON CONFLICT (page_id, chunk_index) DO UPDATE
+    SET
+        content = EXCLUDED.content,
+        content_hash = EXCLUDED.content_hash,
+        embedding = EXCLUDED.embedding,
+        heading_path = EXCLUDED.heading_path,
+        block_ids = EXCLUDED.block_ids
+    WHERE page_chunks.content_hash IS DISTINCT FROM EXCLUDED.content_hash
+       OR page_chunks.heading_path IS DISTINCT FROM EXCLUDED.heading_path
+       OR page_chunks.block_ids IS DISTINCT FROM EXCLUDED.block_ids;
+
+    GET DIAGNOSTICS written = ROW_COUNT;
+
+    IF p_chunk_count IS NOT NULL THEN
+        DELETE FROM page_chunks
+        WHERE page_id = p_page_id AND chunk_index >= p_chunk_count;
+    END IF;
+
+    RETURN written;
+END;
+$$;
+
+-- The result columns change, so the function has to be dropped first
+DROP FUNCTION IF EXISTS search_chunks(vector, int, uuid);
+
+CREATE OR REPLACE FUNCTION search_chunks(
+    query_embedding vector(768),
+    match_count int DEFAULT 5,
+    filter_user_id uuid DEFAULT NULL
+)
+RETURNS TABLE (
+    chunk_id uuid,
+    chunk_content text,
+    chunk_index int,
+    heading_path text[],
+    block_ids text[],
+    page_id uuid,
+    page_title text,
+    page_url text,
+    page_notion_id text,
+    similarity_score float
+)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    RETURN QUERY
+    SELECT
+        pc.id as chunk_id,
+        pc.content as chunk_content,
+        pc.chunk_index,
+        pc.heading_path,
+        pc.block_ids,
+        np.id as page_id,
+        np.title as page_title,
+        np.url as page_url,
+        np.notion_page_id as page_notion_id,
+        1 - (pc.embedding <=> query_embedding) as similarity_score
+    FROM page_chunks pc
+    INNER JOIN notion_pages np ON pc.page_id = np.id
+    INNER JOIN integrations i ON np.integration_id = i.id
+    WHERE (filter_user_id IS NULL OR i.user_id = filter_user_id)
+    ORDER BY pc.embedding <=> query_embedding
+    LIMIT match_count;
+END;
+$$;
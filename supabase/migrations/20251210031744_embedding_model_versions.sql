@@ -0,0 +1,251 @@
+-- Every chunk records the model that produced its embedding. A new model is rolled out by
+-- filling shadow_embedding in the background and swapping it in once every chunk has one.
+CREATE TABLE IF NOT EXISTS embedding_models (
+    tag TEXT PRIMARY KEY,
+    dims INT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'active', 'retired')),
+    created_at TIMESTAMPTZ DEFAULT NOW() NOT NULL,
+    activated_at TIMESTAMPTZ
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_embedding_models_active
+    ON embedding_models(status) WHERE status = 'active';
+
+INSERT INTO embedding_models (tag, dims, status, activated_at)
+VALUES ('sentence-transformers/all-mpnet-base-v2', 768, 'active', NOW())
+ON CONFLICT (tag) DO NOTHING;
+
+-- Dimensions are no longer fixed by the column, they follow the active model
+ALTER TABLE page_chunks ALTER COLUMN embedding TYPE vector;
+
+ALTER TABLE page_chunks
+    ADD COLUMN IF NOT EXISTS embedding_model TEXT,
+    ADD COLUMN IF NOT EXISTS shadow_embedding vector,
+    ADD COLUMN IF NOT EXISTS shadow_embedding_model TEXT;
+
+UPDATE page_chunks
+SET embedding_model = 'sentence-transformers/all-mpnet-base-v2'
+WHERE embedding_model IS NULL AND embedding IS NOT NULL;
+
+CREATE OR REPLACE FUNCTION active_embedding_model()
+RETURNS text
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT tag FROM embedding_models WHERE status = 'active';
+$$;
+
+-- The embedding model becomes a parameter, the old signature would make calls ambiguous
+DROP FUNCTION IF EXISTS replace_page_chunks(uuid, int, jsonb);
+
+CREATE OR REPLACE FUNCTION replace_page_chunks(
+    p_page_id uuid,
+    p_chunk_count int,
+    p_chunks jsonb DEFAULT '[]'::jsonb,
+    p_embedding_model text DEFAULT NULL
+)
+RETURNS int
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    written int;
+    active text := active_embedding_model();
+BEGIN
+    -- Vectors computed before a cutover must not land next to the new model's
+    IF p_embedding_model IS NOT NULL AND p_embedding_model IS DISTINCT FROM active THEN
+        RAISE EXCEPTION 'embedding model % is not the active model %', p_embedding_model, active;
+    END IF;
+
+    INSERT INTO page_chunks (
+        page_id, chunk_index, content, content_hash, embedding, embedding_model,
+        heading_path, block_ids
+    )
+    SELECT
+        p_page_id,
+        c.chunk_index,
+        c.content,
+        c.content_hash,
+        c.embedding::vector,
+        active,
+        COALESCE(c.heading_path, '{}'),
+        COALESCE(c.block_ids, '{}')
+    FROM jsonb_to_recordset(p_chunks) AS c(
+        chunk_index int,
+        content text,
+        content_hash text,
+        embedding text,
+        heading_path text[],
+        block_ids text[]
+    )
+    WHERE p_chunk_count IS NULL OR c.chunk_index < p_chunk_count
+    ON CONFLICT (page_id, chunk_index) DO UPDATE
+    SET
+        content = EXCLUDED.content,
+        content_hash = EXCLUDED.content_hash,
+        embedding = EXCLUDED.embedding,
+        embedding_model = EXCLUDED.embedding_model,
+        heading_path = EXCLUDED.heading_path,
+        block_ids = EXCLUDED.block_ids,
+        -- A shadow vector for the old text is useless, the migrator picks the chunk up again
+        shadow_embedding = CASE
+            WHEN page_chunks.content_hash IS DISTINCT FROM EXCLUDED.content_hash THEN NULL
+            ELSE page_chunks.shadow_embedding
+        END,
+        shadow_embedding_model = CASE
+            WHEN page_chunks.content_hash IS DISTINCT FROM EXCLUDED.content_hash THEN NULL
+            ELSE page_chunks.shadow_embedding_model
+        END
+    WHERE page_chunks.content_hash IS DISTINCT FROM EXCLUDED.content_hash
+       OR page_chunks.embedding_model IS DISTINCT FROM EXCLUDED.embedding_model
+       OR page_chunks.heading_path IS DISTINCT FROM EXCLUDED.heading_path
+       OR page_chunks.block_ids IS DISTINCT FROM EXCLUDED.block_ids;
+
+    GET DIAGNOSTICS written = ROW_COUNT;
+
+    IF p_chunk_count IS NOT NULL THEN
+        DELETE FROM page_chunks
+        WHERE page_id = p_page_id AND chunk_index >= p_chunk_count;
+    END IF;
+
+    RETURN written;
+END;
+$$;
+
+-- Chunks still without a shadow vector for p_model, in id order for keyset paging
+CREATE OR REPLACE FUNCTION chunks_missing_shadow(
+    p_model text,
+    p_after uuid DEFAULT NULL,
+    p_limit int DEFAULT 64
+)
+RETURNS TABLE (id uuid, content text, content_hash text)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT pc.id, pc.content, pc.content_hash
+    FROM page_chunks pc
+    WHERE pc.shadow_embedding_model IS DISTINCT FROM p_model
+      AND (p_after IS NULL OR pc.id > p_after)
+    ORDER BY pc.id
+    LIMIT p_limit;
+$$;
+
+-- Only written where the chunk text is still the one that was embedded
+CREATE OR REPLACE FUNCTION write_shadow_embeddings(
+    p_model text,
+    p_rows jsonb
+)
+RETURNS int
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    written int;
+BEGIN
+    UPDATE page_chunks pc
+    SET
+        shadow_embedding = r.embedding::vector,
+        shadow_embedding_model = p_model
+    FROM jsonb_to_recordset(p_rows) AS r(id uuid, content_hash text, embedding text)
+    WHERE pc.id = r.id
+      AND pc.content_hash IS NOT DISTINCT FROM r.content_hash;
+
+    GET DIAGNOSTICS written = ROW_COUNT;
+    RETURN written;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION embedding_coverage(p_model text)
+RETURNS TABLE (total bigint, covered bigint)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT
+        COUNT(*),
+        COUNT(*) FILTER (WHERE shadow_embedding_model = p_model)
+    FROM page_chunks;
+$$;
+
+-- Swaps every chunk over to p_model in one transaction, searches see either the old vectors
+-- or the new ones. Writers are locked out while coverage is checked so none can slip in.
+CREATE OR REPLACE FUNCTION cutover_embedding_model(p_model text)
+RETURNS int
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    missing bigint;
+    swapped int;
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM embedding_models WHERE tag = p_model) THEN
+        RAISE EXCEPTION 'embedding model % is not registered', p_model;
+    END IF;
+
+    LOCK TABLE page_chunks IN SHARE ROW EXCLUSIVE MODE;
+
+    SELECT COUNT(*) INTO missing
+    FROM page_chunks
+    WHERE shadow_embedding_model IS DISTINCT FROM p_model;
+
+    IF missing > 0 THEN
+        RAISE EXCEPTION 'embedding model % covers all but % chunks', p_model, missing;
+    END IF;
+
+    UPDATE page_chunks
+    SET
+        embedding = shadow_embedding,
+        embedding_model = p_model,
+        shadow_embedding = NULL,
+        shadow_embedding_model = NULL;
+
+    GET DIAGNOSTICS swapped = ROW_COUNT;
+
+    UPDATE embedding_models SET status = 'retired' WHERE status = 'active';
+    UPDATE embedding_models SET status = 'active', activated_at = NOW() WHERE tag = p_model;
+
+    RETURN swapped;
+END;
+$$;
+
+DROP FUNCTION IF EXISTS search_chunks(vector, int, uuid);
+
+CREATE OR REPLACE FUNCTION search_chunks(
+    query_embedding vector,
+    match_count int DEFAULT 5,
+    filter_user_id uuid DEFAULT NULL,
+    p_embedding_model text DEFAULT NULL
+)
+RETURNS TABLE (
+    chunk_id uuid,
+    chunk_content text,
+    chunk_index int,
+    heading_path text[],
+    block_ids text[],
+    page_id uuid,
+    page_title text,
+    page_url text,
+    page_notion_id text,
+    similarity_score float
+)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    -- Vectors of different models are never compared, whatever model the caller embedded with
+    RETURN QUERY
+    SELECT
+        pc.id as chunk_id,
+        pc.content as chunk_content,
+        pc.chunk_index,
+        pc.heading_path,
+        pc.block_ids,
+        np.id as page_id,
+        np.title as page_title,
+        np.url as page_url,
+        np.notion_page_id as page_notion_id,
+        1 - (pc.embedding <=> query_embedding) as similarity_score
+    FROM page_chunks pc
+    INNER JOIN notion_pages np ON pc.page_id = np.id
+    INNER JOIN integrations i ON np.integration_id = i.id
+    WHERE (filter_user_id IS NULL OR i.user_id = filter_user_id)
+      AND pc.embedding_model = COALESCE(p_embedding_model, active_embedding_model())
+    ORDER BY pc.embedding <=> query_embedding
+    LIMIT match_count;
+END;
+$$;
@@ -0,0 +1,6 @@
+-- Failed syncs keep their checkpoint for inspection, only running ones are resumed on startup
+ALTER TABLE sync_checkpoints DROP CONSTRAINT IF EXISTS sync_checkpoints_status_check;
+
+ALTER TABLE sync_checkpoints
+    ADD CONSTRAINT sync_checkpoints_status_check
+    CHECK (status IN ('running', 'completed', 'failed'));
@@ -0,0 +1,325 @@
+-- Every embedding model keeps its vectors in a column of its own, typed with the model's
+-- dimensions so it can carry an ivfflat or hnsw index. A cutover only changes which model is
+-- active: the previous model's column stays, so a process that has not switched yet still gets
+-- results for its queries.
+ALTER TABLE embedding_models ADD COLUMN IF NOT EXISTS column_name TEXT UNIQUE;
+
+-- The vectors of retired models were overwritten by their cutover, nothing is left of them
+DELETE FROM embedding_models WHERE status = 'retired';
+
+-- The active model keeps the original column, typed with its dimensions again
+UPDATE embedding_models SET column_name = 'embedding' WHERE status = 'active';
+
+DO $$
+DECLARE
+    active_dims int;
+BEGIN
+    SELECT dims INTO active_dims FROM embedding_models WHERE status = 'active';
+    EXECUTE format(
+        'ALTER TABLE page_chunks ALTER COLUMN embedding TYPE vector(%s)', COALESCE(active_dims, 768)
+    );
+END;
+$$;
+
+-- Adds the column of a model, returns the column a registered model already has
+CREATE OR REPLACE FUNCTION register_embedding_model(p_tag text, p_dims int)
+RETURNS text
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    col text;
+BEGIN
+    SELECT column_name INTO col FROM embedding_models WHERE tag = p_tag;
+    IF col IS NOT NULL THEN
+        RETURN col;
+    END IF;
+
+    col := 'embedding_' || left(md5(p_tag), 12);
+    EXECUTE format('ALTER TABLE page_chunks ADD COLUMN IF NOT EXISTS %I vector(%s)', col, p_dims);
+
+    INSERT INTO embedding_models (tag, dims, column_name)
+    VALUES (p_tag, p_dims, col)
+    ON CONFLICT (tag) DO UPDATE SET column_name = EXCLUDED.column_name;
+
+    -- The REST API only sees the new column once it reloads its schema cache
+    NOTIFY pgrst, 'reload schema';
+    RETURN col;
+END;
+$$;
+
+-- Models still being migrated to keep the vectors already computed for them
+DO $$
+DECLARE
+    m record;
+BEGIN
+    FOR m IN SELECT tag, dims FROM embedding_models WHERE column_name IS NULL LOOP
+        EXECUTE format(
+            'UPDATE page_chunks SET %I = shadow_embedding WHERE shadow_embedding_model = %L',
+            register_embedding_model(m.tag, m.dims),
+            m.tag
+        );
+    END LOOP;
+END;
+$$;
+
+ALTER TABLE embedding_models ALTER COLUMN column_name SET NOT NULL;
+
+DROP FUNCTION IF EXISTS chunks_missing_shadow(text, uuid, int);
+DROP FUNCTION IF EXISTS write_shadow_embeddings(text, jsonb);
+
+ALTER TABLE page_chunks
+    DROP COLUMN IF EXISTS shadow_embedding,
+    DROP COLUMN IF EXISTS shadow_embedding_model,
+    DROP COLUMN IF EXISTS embedding_model;
+
+CREATE OR REPLACE FUNCTION embedding_column(p_model text)
+RETURNS text
+LANGUAGE plpgsql
+STABLE
+AS $$
+DECLARE
+    col text;
+BEGIN
+    SELECT column_name INTO col FROM embedding_models WHERE tag = p_model;
+    IF col IS NULL THEN
+        RAISE EXCEPTION 'embedding model % is not registered', p_model;
+    END IF;
+    RETURN col;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION replace_page_chunks(
+    p_page_id uuid,
+    p_chunk_count int,
+    p_chunks jsonb DEFAULT '[]'::jsonb,
+    p_embedding_model text DEFAULT NULL
+)
+RETURNS int
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    written int;
+    active text;
+    active_column text;
+    stale_columns text;
+BEGIN
+    -- Taken before the active model is read, a cutover waits for this write or the other way
+    -- round, so vectors of the previous model never land after it
+    LOCK TABLE page_chunks IN ROW EXCLUSIVE MODE;
+
+    active := active_embedding_model();
+    active_column := embedding_column(active);
+
+    -- Vectors computed before a cutover must not land next to the new model's
+    IF p_embedding_model IS NOT NULL AND p_embedding_model IS DISTINCT FROM active THEN
+        RAISE EXCEPTION 'embedding model % is not the active model %', p_embedding_model, active;
+    END IF;
+
+    -- Other models' vectors of a chunk's old text are useless, the migrator embeds it again
+    SELECT string_agg(
+        format(
+            ', %1$I = CASE WHEN page_chunks.content_hash IS DISTINCT FROM EXCLUDED.content_hash '
+            'THEN NULL ELSE page_chunks.%1$I END',
+            column_name
+        ),
+        ''
+    )
+    INTO stale_columns
+    FROM embedding_models
+    WHERE tag <> active;
+
+    EXECUTE format(
+        $sql$
+        INSERT INTO page_chunks (
+            page_id, chunk_index, content, content_hash, %1$I, heading_path, block_ids
+        )
+        SELECT
+            $1,
+            c.chunk_index,
+            c.content,
+            c.content_hash,
+            c.embedding::vector,
+            COALESCE(c.heading_path, '{}'),
+            COALESCE(c.block_ids, '{}')
+        FROM jsonb_to_recordset($3) AS c(
+            chunk_index int,
+            content text,
+            content_hash text,
+            embedding text,
+            heading_path text[],
+            block_ids text[]
+        )
+        WHERE $2 IS NULL OR c.chunk_index < $2
+        ON CONFLICT (page_id, chunk_index) DO UPDATE
+        SET
+            content = EXCLUDED.content,
+            content_hash = EXCLUDED.content_hash,
+            %1$I = EXCLUDED.%1$I,
+            heading_path = EXCLUDED.heading_path,
+            block_ids = EXCLUDED.block_ids
+            %2$s
+        WHERE page_chunks.content_hash IS DISTINCT FROM EXCLUDED.content_hash
+           OR page_chunks.%1$I IS NULL
+           OR page_chunks.heading_path IS DISTINCT FROM EXCLUDED.heading_path
+           OR page_chunks.block_ids IS DISTINCT FROM EXCLUDED.block_ids
+        $sql$,
+        active_column,
+        COALESCE(stale_columns, '')
+    )
+    USING p_page_id, p_chunk_count, p_chunks;
+
+    GET DIAGNOSTICS written = ROW_COUNT;
+
+    IF p_chunk_count IS NOT NULL THEN
+        DELETE FROM page_chunks
+        WHERE page_id = p_page_id AND chunk_index >= p_chunk_count;
+    END IF;
+
+    RETURN written;
+END;
+$$;
+
+-- Chunks still without a vector from p_model, in id order for keyset paging
+CREATE OR REPLACE FUNCTION chunks_missing_embedding(
+    p_model text,
+    p_after uuid DEFAULT NULL,
+    p_limit int DEFAULT 64
+)
+RETURNS TABLE (id uuid, content text, content_hash text)
+LANGUAGE plpgsql
+STABLE
+AS $$
+BEGIN
+    RETURN QUERY EXECUTE format(
+        'SELECT pc.id, pc.content, pc.content_hash FROM page_chunks pc '
+        'WHERE pc.%I IS NULL AND ($1 IS NULL OR pc.id > $1) ORDER BY pc.id LIMIT $2',
+        embedding_column(p_model)
+    )
+    USING p_after, p_limit;
+END;
+$$;
+
+-- Only written where the chunk text is still the one that was embedded
+CREATE OR REPLACE FUNCTION write_model_embeddings(
+    p_model text,
+    p_rows jsonb
+)
+RETURNS int
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    written int;
+BEGIN
+    EXECUTE format(
+        'UPDATE page_chunks pc SET %I = r.embedding::vector '
+        'FROM jsonb_to_recordset($1) AS r(id uuid, content_hash text, embedding text) '
+        'WHERE pc.id = r.id AND pc.content_hash IS NOT DISTINCT FROM r.content_hash',
+        embedding_column(p_model)
+    )
+    USING p_rows;
+
+    GET DIAGNOSTICS written = ROW_COUNT;
+    RETURN written;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION embedding_coverage(p_model text)
+RETURNS TABLE (total bigint, covered bigint)
+LANGUAGE plpgsql
+STABLE
+AS $$
+BEGIN
+    RETURN QUERY EXECUTE format(
+        'SELECT COUNT(*), COUNT(*) FILTER (WHERE %I IS NOT NULL) FROM page_chunks',
+        embedding_column(p_model)
+    );
+END;
+$$;
+
+-- Makes p_model the active model once every chunk has a vector from it. Writers are locked out
+-- while coverage is checked so none can slip in, no vectors are moved.
+CREATE OR REPLACE FUNCTION cutover_embedding_model(p_model text)
+RETURNS int
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    col text := embedding_column(p_model);
+    missing bigint;
+    covered bigint;
+BEGIN
+    LOCK TABLE page_chunks IN SHARE ROW EXCLUSIVE MODE;
+
+    EXECUTE format(
+        'SELECT COUNT(*) FILTER (WHERE %1$I IS NULL), COUNT(*) FILTER (WHERE %1$I IS NOT NULL) '
+        'FROM page_chunks',
+        col
+    )
+    INTO missing, covered;
+
+    IF missing > 0 THEN
+        RAISE EXCEPTION 'embedding model % covers all but % chunks', p_model, missing;
+    END IF;
+
+    UPDATE embedding_models SET status = 'retired' WHERE status = 'active' AND tag <> p_model;
+    UPDATE embedding_models SET status = 'active', activated_at = NOW() WHERE tag = p_model;
+
+    RETURN covered;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION search_chunks(
+    query_embedding vector,
+    match_count int DEFAULT 5,
+    filter_user_id uuid DEFAULT NULL,
+    p_embedding_model text DEFAULT NULL
+)
+RETURNS TABLE (
+    chunk_id uuid,
+    chunk_content text,
+    chunk_index int,
+    heading_path text[],
+    block_ids text[],
+    page_id uuid,
+    page_title text,
+    page_url text,
+    page_notion_id text,
+    similarity_score float
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    model text := COALESCE(p_embedding_model, active_embedding_model());
+    col text := embedding_column(model);
+    model_dims int;
+BEGIN
+    SELECT em.dims INTO model_dims FROM embedding_models em WHERE em.tag = model;
+
+    -- Queries are compared with the vectors of their own model only, the previous model's
+    -- column keeps answering processes that have not switched after a cutover yet
+    RETURN QUERY EXECUTE format(
+        $sql$
+        SELECT
+            pc.id,
+            pc.content,
+            pc.chunk_index,
+            pc.heading_path,
+            pc.block_ids,
+            np.id,
+            np.title,
+            np.url,
+            np.notion_page_id,
+            1 - (pc.%1$I <=> $1::vector(%2$s))
+        FROM page_chunks pc
+        INNER JOIN notion_pages np ON pc.page_id = np.id
+        INNER JOIN integrations i ON np.integration_id = i.id
+        WHERE ($2 IS NULL OR i.user_id = $2)
+          AND pc.%1$I IS NOT NULL
+        ORDER BY pc.%1$I <=> $1::vector(%2$s)
+        LIMIT $3
+        $sql$,
+        col,
+        model_dims
+    )
+    USING query_embedding, filter_user_id, match_count;
+END;
+$$;
@@ -0,0 +1,9 @@
+import os
+
+# Settings read at import time, the services under test never reach these services
+os.environ.setdefault("PIPEDREAM_CLIENT_ID", "test-client")
+os.environ.setdefault("PIPEDREAM_CLIENT_SECRET", "test-secret")
+os.environ.setdefault("PIPEDREAM_PROJECT_ID", "test-project")
+os.environ.setdefault("SUPABASE_URL_DEV", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_SECRET_KEY_DEV", "test.supabase.key")
+os.environ.setdefault("EMBED_CACHE_DISK_MB", "0")
@@ -0,0 +1,96 @@
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.services.block_cache import BlockCache
+
+
+def paragraph(block_id: str, text: str = "") -> dict:
+    return {
+        "id": block_id,
+        "type": "paragraph",
+        "paragraph": {"rich_text": [{"plain_text": text or block_id}]},
+    }
+
+
+def noise(seed: int, length: int = 1000) -> str:
+    # Barely compresses, every row takes most of `length` bytes
+    return "".join(random.Random(seed).choices([chr(c) for c in range(33, 123)], k=length))
+
+
+def image(block_id: str, expires_in: float | None) -> dict:
+    # Hosted by Notion with a URL signed for `expires_in` seconds, or external when None
+    if expires_in is None:
+        source = {"type": "external", "external": {"url": "https://example.com/cat.png"}}
+    else:
+        expiry = datetime.now(timezone.utc) + timedelta(seconds=expires_in)
+        source = {
+            "type": "file",
+            "file": {
+                "url": "https://files.notion.so/cat.png?signature=abc",
+                "expiry_time": expiry.isoformat().replace("+00:00", "Z"),
+            },
+        }
+    return {"id": block_id, "type": "image", "image": {"caption": [], **source}}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = BlockCache(path=str(tmp_path / "blocks.sqlite3"), max_bytes=1024 * 1024)
+    yield cache
+    cache.close()
+
+
+def test_children_come_back_for_the_same_edit_time(cache):
+    children = [paragraph("a"), paragraph("b")]
+    cache.put_many({("page", "2025-01-01"): children})
+
+    assert cache.get_many([("page", "2025-01-01")]) == {("page", "2025-01-01"): children}
+    assert (cache.hits, cache.misses) == (1, 0)
+
+
+def test_a_changed_edit_time_is_a_miss(cache):
+    cache.put_many({("page", "2025-01-01"): [paragraph("a")]})
+
+    assert cache.get_many([("page", "2025-01-02"), ("other", "2025-01-01")]) == {}
+    assert (cache.hits, cache.misses) == (0, 2)
+
+    # The newer snapshot replaces the older one
+    cache.put_many({("page", "2025-01-02"): [paragraph("b")]})
+    assert cache.get_many([("page", "2025-01-01")]) == {}
+    assert cache.get_many([("page", "2025-01-02")]) == {("page", "2025-01-02"): [paragraph("b")]}
+
+
+def test_least_recently_used_rows_are_evicted_past_the_limit(tmp_path):
+    cache = BlockCache(path=str(tmp_path / "blocks.sqlite3"), max_bytes=4000)
+
+    for i in range(3):
+        cache.put_many({(f"block-{i}", "t"): [paragraph(f"p{i}", noise(i))]})
+        time.sleep(0.01)
+    cache.get_many([("block-0", "t")])
+    time.sleep(0.01)
+    cache.put_many({("block-3", "t"): [paragraph("p3", noise(3))]})
+    cache.put_many({("block-4", "t"): [paragraph("p4", noise(4))]})
+
+    assert cache._store.size <= 4000
+    kept = cache.get_many([(f"block-{i}", "t") for i in range(5)])
+    assert ("block-0", "t") in kept
+    assert ("block-1", "t") not in kept
+    cache.close()
+
+
+def test_rows_with_expiring_file_urls_are_misses(cache):
+    cache.put_many(
+        {
+            ("fresh", "t"): [paragraph("a"), image("img-1", expires_in=3600)],
+            ("expiring", "t"): [image("img-2", expires_in=3600), image("img-3", expires_in=60)],
+            ("external", "t"): [image("img-4", expires_in=None)],
+        }
+    )
+
+    found = cache.get_many([("fresh", "t"), ("expiring", "t"), ("external", "t")])
+
+    assert set(found) == {("fresh", "t"), ("external", "t")}
+    assert cache.misses == 1
@@ -0,0 +1,113 @@
+import pytest
+
+from app.services import block_chunker
+from app.services.block_chunker import BlockChunker, chunk_blocks
+
+
+def rich_text(text: str) -> dict:
+    return {"rich_text": [{"plain_text": text}] if text else []}
+
+
+def heading(level: int, text: str, block_id: str | None = None) -> dict:
+    block_type = f"heading_{level}"
+    return {"id": block_id or f"h-{text}", "type": block_type, block_type: rich_text(text)}
+
+
+def paragraph(text: str, block_id: str | None = None) -> dict:
+    return {"id": block_id or f"p-{text[:8]}", "type": "paragraph", "paragraph": rich_text(text)}
+
+
+def bullet(text: str) -> dict:
+    return {"id": f"li-{text}", "type": "bulleted_list_item", "bulleted_list_item": rich_text(text)}
+
+
+def chunks_of(blocks: list[dict], chunk_size: int = 100, unit: str = "chars"):
+    return [(chunk.heading_path, chunk.content) for chunk in chunk_blocks(blocks, chunk_size, unit)]
+
+
+def test_chunks_record_the_headings_above_them():
+    blocks = [
+        heading(1, "Guide"),
+        paragraph("intro"),
+        heading(2, "Setup"),
+        paragraph("install"),
+        heading(3, "Linux"),
+        paragraph("apt"),
+        heading(2, "Usage"),
+        paragraph("run"),
+    ]
+
+    assert chunks_of(blocks) == [
+        (["Guide"], "Guide\nintro"),
+        (["Guide", "Setup"], "Setup\ninstall"),
+        (["Guide", "Setup", "Linux"], "Linux\napt"),
+        (["Guide", "Usage"], "Usage\nrun"),
+    ]
+
+
+def test_empty_section_title_survives_in_the_nested_heading_path():
+    blocks = [heading(1, "Guide"), heading(2, "Setup"), paragraph("install")]
+
+    assert chunks_of(blocks) == [(["Guide", "Setup"], "Setup\ninstall")]
+
+
+@pytest.mark.parametrize("next_heading", [heading(2, "Usage"), heading(2, "", "h-empty")])
+def test_empty_section_closed_by_same_level_heading_keeps_its_title(next_heading):
+    blocks = [heading(1, "Guide"), heading(2, "Setup"), next_heading, paragraph("run")]
+
+    chunks = chunks_of(blocks)
+
+    assert chunks[0] == (["Guide", "Setup"], "Setup")
+    assert chunks[1][1].endswith("run")
+
+
+def test_list_runs_stay_together():
+    blocks = [paragraph("a" * 90), bullet("one"), bullet("two"), bullet("three")]
+
+    assert chunks_of(blocks) == [([], "a" * 90), ([], "one\ntwo\nthree")]
+
+
+def test_oversized_block_only_shares_its_first_piece_with_the_heading():
+    text = " ".join(f"word{i:03d}" for i in range(60))
+    chunks = chunk_blocks([heading(1, "Title"), paragraph(text)], chunk_size=100, unit="chars")
+
+    assert chunks[0].content.startswith("Title\n")
+    assert all(len(chunk.content) <= 100 for chunk in chunks)
+    # Only the first piece makes room for the heading, the others fill a whole chunk
+    assert all(len(chunk.content) > 90 for chunk in chunks[1:-1])
+    assert " ".join(chunk.content for chunk in chunks).split()[-1] == "word059"
+
+
+@pytest.fixture
+def word_tokens(monkeypatch):
+    """Counts and splits by words in place of the embedding model's tokenizer."""
+
+    def measure_texts(texts: list[str], unit: str) -> list[int]:
+        return [len(text.split()) for text in texts]
+
+    def chunk_text(text: str, chunk_size: int, unit: str) -> list[str]:
+        words = text.split()
+        return [" ".join(words[i : i + chunk_size]) for i in range(0, len(words), chunk_size)]
+
+    monkeypatch.setattr(block_chunker, "measure_texts", measure_texts)
+    monkeypatch.setattr(block_chunker, "chunk_text", chunk_text)
+
+
+def test_token_unit_packs_by_token_count(word_tokens):
+    blocks = [heading(1, "Notes"), *(paragraph(f"w{i} " * 4) for i in range(5))]
+
+    chunks = chunk_blocks(blocks, chunk_size=10, unit="tokens")
+
+    # Joining newlines cost no tokens, the heading and two paragraphs fill the first chunk
+    assert [chunk.tokens for chunk in chunks] == [9, 8, 4]
+    assert all(chunk.heading_path == ["Notes"] for chunk in chunks)
+
+
+def test_token_unit_splits_oversized_block(word_tokens):
+    chunker = BlockChunker(chunk_size=10, unit="tokens")
+    chunks = chunker.add(heading(1, "Notes"))
+    chunks += chunker.add(paragraph(" ".join(f"w{i}" for i in range(25))))
+    chunks += chunker.finish()
+
+    assert [chunk.tokens for chunk in chunks] == [10, 10, 6]
+    assert chunks[0].content.startswith("Notes\nw0 ")
@@ -0,0 +1,123 @@
+import numpy as np
+import pytest
+
+from app.services import embedding_backends
+from app.services.embedding_backends import (
+    EmbeddingBackend,
+    OnnxBackend,
+    TorchBackend,
+    plan_batches,
+)
+
+TEXTS = [
+    "meeting notes for the release planning",
+    "roadmap",
+    "customer feedback on the onboarding checklist and the design review of the new sprint",
+    "incident retro notes",
+]
+WORDS = sorted({word for text in TEXTS for word in text.split()})
+
+
+@pytest.fixture(scope="module")
+def tiny_model(tmp_path_factory) -> str:
+    """A small randomly initialized BERT with mean pooling and normalization, saved locally."""
+    pytest.importorskip("torch")
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("onnx")
+    pytest.importorskip("sentence_transformers")
+    from sentence_transformers import SentenceTransformer, models
+    from transformers import BertConfig, BertModel, BertTokenizerFast
+
+    base = tmp_path_factory.mktemp("bert")
+    vocab = base / "vocab.txt"
+    vocab.write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", *WORDS]))
+    BertTokenizerFast(vocab_file=str(vocab)).save_pretrained(base)
+    config = BertConfig(
+        vocab_size=len(WORDS) + 5,
+        hidden_size=64,
+        num_hidden_layers=2,
+        num_attention_heads=4,
+        intermediate_size=128,
+        max_position_embeddings=128,
+    )
+    BertModel(config).save_pretrained(base)
+
+    transformer = models.Transformer(str(base), max_seq_length=64)
+    model = SentenceTransformer(
+        modules=[transformer, models.Pooling(64, "mean"), models.Normalize()]
+    )
+    path = tmp_path_factory.mktemp("sentence-model")
+    model.save(str(path))
+    return str(path)
+
+
+def cosine(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return (a * b).sum(axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+
+
+@pytest.mark.parametrize(("quantized", "tolerance"), [(False, 1e-4), (True, 0.02)])
+def test_onnx_matches_torch(tiny_model, tmp_path, quantized, tolerance):
+    reference = TorchBackend(model=tiny_model, max_tokens=64).encode(TEXTS)
+    onnx = OnnxBackend(
+        quantized=quantized, directory=str(tmp_path), model=tiny_model, max_tokens=64
+    ).encode(TEXTS)
+
+    assert onnx.shape == reference.shape
+    assert cosine(onnx, reference).min() >= 1 - tolerance
+
+
+def test_backend_needs_encode_batch():
+    with pytest.raises(TypeError):
+        EmbeddingBackend()
+
+
+def test_plan_batches_groups_texts_of_similar_length():
+    lengths = [120, 8, 30, 9, 118, 31, 7, 500]
+
+    batches = plan_batches(lengths, token_budget=256, max_batch=64)
+
+    assert sorted(index for batch in batches for index in batch) == list(range(len(lengths)))
+    assert batches == [[6, 1, 3, 2, 5], [4, 0], [7]]
+
+
+def test_plan_batches_keeps_padded_size_within_budget():
+    lengths = [(i * 37) % 200 + 1 for i in range(300)]
+
+    batches = plan_batches(lengths, token_budget=1024, max_batch=16)
+
+    for batch in batches:
+        assert len(batch) <= 16
+        assert len(batch) * max(lengths[i] for i in batch) <= 1024
+
+
+def test_plan_batches_gives_a_text_over_budget_a_batch_of_its_own():
+    assert plan_batches([600, 10, 10], token_budget=512, max_batch=8) == [[1, 2], [0]]
+    assert plan_batches([], token_budget=512, max_batch=8) == []
+
+
+class WordCountBackend(EmbeddingBackend):
+    name = "word-count"
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.batches: list[list[str]] = []
+
+    def encode_batch(self, texts: list[str]) -> np.ndarray:
+        self.batches.append(texts)
+        return np.array([[len(text.split()), len(texts)] for text in texts], dtype=np.float32)
+
+
+def test_encode_returns_vectors_in_input_order(monkeypatch):
+    monkeypatch.setattr(
+        embedding_backends,
+        "count_tokens",
+        lambda texts, model: [len(text.split()) for text in texts],
+    )
+    backend = WordCountBackend(max_tokens=512, token_budget=40, max_batch=8)
+    texts = ["a " * 30, "b", "c c", "d " * 12, "e"]
+
+    vectors = backend.encode(texts)
+
+    assert vectors[:, 0].tolist() == [30, 1, 2, 12, 1]
+    # Short texts share a batch, the long ones are padded on their own
+    assert [len(batch) for batch in backend.batches] == [3, 1, 1]
@@ -0,0 +1,72 @@
+import sqlite3
+
+import numpy as np
+import pytest
+
+from app.services.embedding_cache import EmbeddingCache
+
+DIMS = 256
+# Room for ten float32 vectors of DIMS dimensions
+DISK_MB = 10 * DIMS * 4 / (1024 * 1024)
+
+
+def vectors(count: int, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).random((count, DIMS), dtype=np.float32)
+
+
+def stored_bytes(path) -> int:
+    with sqlite3.connect(path) as db:
+        return db.execute("SELECT COALESCE(SUM(LENGTH(value)), 0) FROM embeddings").fetchone()[0]
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "embeddings.sqlite3")
+
+
+def test_vectors_come_back_from_disk_after_reopening(path):
+    texts = ["alpha", "beta"]
+    cache = EmbeddingCache("model-a", memory_items=0, disk_mb=DISK_MB, path=path)
+    cache.put_many(texts, vectors(2))
+    cache.close()
+
+    reopened = EmbeddingCache("model-a", memory_items=0, disk_mb=DISK_MB, path=path)
+    found = reopened.get_many(["alpha", " beta ", "gamma"])
+    reopened.close()
+
+    np.testing.assert_array_equal(np.stack(found[:2]), vectors(2))
+    assert found[2] is None
+    assert (reopened.stats.disk_hits, reopened.stats.misses) == (2, 1)
+
+
+def test_models_sharing_a_file_share_its_size_limit(path):
+    active = EmbeddingCache("model-a", memory_items=0, disk_mb=DISK_MB, path=path)
+    target = EmbeddingCache("model-b", memory_items=0, disk_mb=DISK_MB, path=path)
+
+    for batch in range(4):
+        active.put_many([f"a{batch}-{i}" for i in range(4)], vectors(4, batch))
+        target.put_many([f"b{batch}-{i}" for i in range(4)], vectors(4, batch))
+
+    assert stored_bytes(path) <= active.disk_bytes
+    assert active.stats.disk_evictions + target.stats.disk_evictions == 32 - 9
+
+    # The older model's entries are not shadowed by the other's
+    assert target.get_many(["a3-3"]) == [None]
+    assert active.get_many(["a3-3"])[0] is not None
+
+    active.close()
+    # Still open for the other model
+    target.put_many(["b-last"], vectors(1, 9))
+    assert target.get_many(["b-last"])[0] is not None
+    target.close()
+
+
+def test_memory_tier_is_bounded(path):
+    cache = EmbeddingCache("model-a", memory_items=2, disk_mb=0, path=path)
+    cache.put_many(["one", "two", "three"], vectors(3))
+
+    found = cache.get_many(["one", "two", "three"])
+    cache.close()
+
+    assert found[0] is None
+    assert (cache.stats.memory_hits, cache.stats.misses) == (2, 1)
@@ -0,0 +1,123 @@
+import numpy as np
+import pytest
+
+from app.services import embedding_migrator
+from app.services.embedding_migrator import EmbeddingMigrator
+
+
+class FakeExecutor:
+    async def run(self, fn, *args, **kwargs):
+        return fn(*args)
+
+
+class FakeService:
+    def __init__(self, model, events, **kwargs):
+        self.model_name = model
+        self.priority = kwargs.get("priority", "interactive")
+        self.executor = FakeExecutor()
+        self.cache = object()
+        self._events = events
+
+    def get_model(self):
+        self._events.append(f"load {self.model_name}")
+
+    async def embed_texts(self, texts):
+        self._events.append(f"embed {len(texts)}")
+        return np.ones((len(texts), 4), dtype=np.float32)
+
+
+class ActiveService:
+    def __init__(self, events):
+        self.model_name = "old-model"
+        self.cache = object()
+        self._events = events
+
+    def use_model(self, other):
+        self._events.append(f"switch {other.model_name}")
+        self.model_name = other.model_name
+
+
+@pytest.fixture
+def migration(monkeypatch):
+    """
+    A migrator to `new-model` over the chunks in `missing` (one list per page of results),
+    with every database call and the embedding models faked. Returns the migrator and the
+    events recorded in order.
+    """
+    events: list[str] = []
+    state = {"active": "old-model", "missing": []}
+
+    class Models:
+        @staticmethod
+        def get_active_model():
+            return state["active"]
+
+        @staticmethod
+        def register_model(tag, dims):
+            events.append(f"register {tag}")
+            return "embedding_new"
+
+        @staticmethod
+        def get_coverage(tag):
+            return (3, 0)
+
+        @staticmethod
+        def cutover(tag):
+            events.append(f"cutover {tag}")
+            state["active"] = tag
+            return 3
+
+    class Chunks:
+        @staticmethod
+        def get_chunks_missing_embedding(model, after_id, limit):
+            return state["missing"].pop(0) if state["missing"] else []
+
+        @staticmethod
+        def write_model_embeddings(model, rows):
+            events.append(f"write {len(rows)}")
+            return len(rows)
+
+    monkeypatch.setattr(embedding_migrator, "EmbeddingModelOperations", Models)
+    monkeypatch.setattr(embedding_migrator, "PageChunkOperations", Chunks)
+    monkeypatch.setattr(
+        embedding_migrator, "EmbeddingService", lambda model, **kw: FakeService(model, events, **kw)
+    )
+    monkeypatch.setattr(embedding_migrator, "embedding_service", ActiveService(events))
+    migrator = EmbeddingMigrator(target="new-model", dims=4, batch_size=2, interval=0)
+    migrator._service = FakeService("new-model", events, priority="bulk")
+    return migrator, state, events
+
+
+async def test_pass_with_chunks_left_does_not_cut_over(migration):
+    migrator, state, events = migration
+    rows = [{"id": f"c{i}", "content": f"text {i}", "content_hash": f"h{i}"} for i in range(3)]
+    state["missing"] = [rows[:2], rows[2:]]
+
+    assert await migrator._migrate_pass() is False
+
+    assert events == ["register new-model", "embed 2", "write 2", "embed 1", "write 1"]
+    assert migrator.stats.chunks_embedded == 3
+    assert state["active"] == "old-model"
+
+
+async def test_target_is_loaded_before_the_cutover_and_switched_to_right_after(migration):
+    migrator, state, events = migration
+
+    assert await migrator._migrate_pass() is True
+
+    assert events == [
+        "register new-model",
+        "load new-model",
+        "cutover new-model",
+        "switch new-model",
+    ]
+    assert embedding_migrator.embedding_service.model_name == "new-model"
+
+
+async def test_cutover_by_another_process_is_followed(migration):
+    migrator, state, events = migration
+    state["active"] = "new-model"
+
+    assert await migrator._migrate_pass() is True
+
+    assert events == ["load new-model", "switch new-model"]
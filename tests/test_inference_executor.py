@@ -0,0 +1,80 @@
+import asyncio
+import threading
+
+from app.services.embedding_batcher import EmbeddingBatcher
+from app.services.inference_executor import InferenceExecutor
+
+
+async def test_interactive_calls_get_a_worker_before_bulk_ones():
+    executor = InferenceExecutor(workers=1, queue_depth=4)
+    release = threading.Event()
+    order: list[str] = []
+
+    try:
+        busy = asyncio.create_task(executor.run(release.wait))
+        await asyncio.sleep(0.05)
+
+        bulk = asyncio.create_task(executor.run(order.append, "bulk", priority="bulk"))
+        await asyncio.sleep(0)
+        interactive = asyncio.create_task(executor.run(order.append, "interactive"))
+        await asyncio.sleep(0.05)
+
+        assert executor.stats.queued == 2
+        release.set()
+        await asyncio.gather(busy, bulk, interactive)
+    finally:
+        release.set()
+        executor.shutdown()
+
+    assert order == ["interactive", "bulk"]
+    assert executor.stats.calls == 3
+
+
+async def test_batched_bulk_texts_wait_for_interactive_ones():
+    executor = InferenceExecutor(workers=1, queue_depth=4)
+    release = threading.Event()
+    order: list[list[str]] = []
+
+    async def embed(texts, priority):
+        return await executor.run(lambda: order.append(texts) or texts, priority=priority)
+
+    batcher = EmbeddingBatcher(embed, flush_interval=0)
+    try:
+        busy = asyncio.create_task(executor.run(release.wait))
+        await asyncio.sleep(0.05)
+
+        bulk = asyncio.create_task(batcher.embed(["import"], priority="bulk"))
+        await asyncio.sleep(0.05)
+        search = asyncio.create_task(batcher.embed(["query"]))
+        await asyncio.sleep(0.05)
+
+        release.set()
+        await asyncio.gather(busy, bulk, search)
+    finally:
+        release.set()
+        await batcher.close()
+        executor.shutdown()
+
+    assert order == [["query"], ["import"]]
+
+
+async def test_cancelled_waiting_call_never_runs():
+    executor = InferenceExecutor(workers=1, queue_depth=4)
+    release = threading.Event()
+    ran: list[str] = []
+
+    try:
+        busy = asyncio.create_task(executor.run(release.wait))
+        await asyncio.sleep(0.05)
+        waiting = asyncio.create_task(executor.run(ran.append, "waiting", priority="bulk"))
+        await asyncio.sleep(0.05)
+
+        waiting.cancel()
+        release.set()
+        await asyncio.gather(busy, waiting, return_exceptions=True)
+    finally:
+        release.set()
+        executor.shutdown()
+
+    assert ran == []
+    assert executor.stats.queued == 0
@@ -0,0 +1,165 @@
+import asyncio
+
+import pytest
+
+from app.services.ingestion_pipeline import IngestionPipeline, Stage
+
+
+async def test_items_flow_through_every_stage():
+    results = []
+
+    async def double(item):
+        return item * 2
+
+    async def collect(item):
+        results.append(item)
+
+    pipeline = IngestionPipeline([Stage("double", double, 2), Stage("collect", collect)])
+    await pipeline.run(range(10))
+
+    assert sorted(results) == [i * 2 for i in range(10)]
+    assert pipeline.stats["double"].items_out == 10
+    assert pipeline.stats["collect"].items_out == 10
+
+
+async def test_none_drops_the_item():
+    results = []
+
+    async def evens(item):
+        return item if item % 2 == 0 else None
+
+    async def collect(item):
+        results.append(item)
+
+    pipeline = IngestionPipeline([Stage("evens", evens), Stage("collect", collect)])
+    await pipeline.run(range(6))
+
+    assert sorted(results) == [0, 2, 4]
+    assert pipeline.stats["evens"].items_in == 6
+    assert pipeline.stats["evens"].items_out == 3
+
+
+async def test_full_queues_stop_the_source():
+    release = asyncio.Event()
+    produced = 0
+
+    async def source():
+        nonlocal produced
+        for item in range(100):
+            produced += 1
+            yield item
+
+    async def passthrough(item):
+        return item
+
+    async def slow(item):
+        await release.wait()
+
+    pipeline = IngestionPipeline(
+        [Stage("fast", passthrough, queue_size=1), Stage("slow", slow, queue_size=1)]
+    )
+    run = asyncio.create_task(pipeline.run(source()))
+    await asyncio.sleep(0.05)
+
+    # One item in each queue, one in each worker and one waiting to be queued
+    assert produced <= 5
+    assert not run.done()
+
+    release.set()
+    await asyncio.wait_for(run, 5)
+    assert produced == 100
+    assert pipeline.stats["slow"].items_out == 100
+    assert pipeline.stats["fast"].blocked_seconds > 0
+
+
+async def test_a_failing_item_only_drops_itself():
+    errors = []
+    results = []
+
+    async def parse(item):
+        if item == 3:
+            raise ValueError("bad item")
+        return item
+
+    async def collect(item):
+        results.append(item)
+
+    async def on_error(item, stage_name, error):
+        errors.append((item, stage_name, str(error)))
+
+    pipeline = IngestionPipeline(
+        [Stage("parse", parse, 3), Stage("collect", collect)], on_error=on_error
+    )
+    await pipeline.run(range(6))
+
+    assert sorted(results) == [0, 1, 2, 4, 5]
+    assert errors == [(3, "parse", "bad item")]
+    assert pipeline.stats["parse"].items_failed == 1
+
+
+async def test_a_failing_error_handler_does_not_stop_the_pipeline():
+    results = []
+
+    async def parse(item):
+        if item == 0:
+            raise ValueError("bad item")
+        return item
+
+    async def collect(item):
+        results.append(item)
+
+    def on_error(item, stage_name, error):
+        raise RuntimeError("handler failed")
+
+    pipeline = IngestionPipeline([Stage("parse", parse), Stage("collect", collect)], on_error)
+    await pipeline.run(range(3))
+
+    assert sorted(results) == [1, 2]
+
+
+async def test_source_error_is_raised_after_draining():
+    results = []
+
+    async def source():
+        yield 1
+        yield 2
+        raise RuntimeError("search failed")
+
+    async def collect(item):
+        results.append(item)
+
+    pipeline = IngestionPipeline([Stage("collect", collect)])
+    with pytest.raises(RuntimeError, match="search failed"):
+        await pipeline.run(source())
+
+    assert sorted(results) == [1, 2]
+
+
+@pytest.mark.parametrize("items", [range(50), []])
+async def test_every_worker_of_every_stage_is_stopped(items):
+    seen = {"a": 0, "b": 0, "c": 0}
+
+    def counting(name):
+        async def handler(item):
+            seen[name] += 1
+            await asyncio.sleep(0)
+            return item
+
+        return handler
+
+    # Differing worker counts, each stage has to send one end marker per downstream worker
+    pipeline = IngestionPipeline(
+        [
+            Stage("a", counting("a"), concurrency=3),
+            Stage("b", counting("b"), concurrency=1),
+            Stage("c", counting("c"), concurrency=4),
+        ]
+    )
+    await asyncio.wait_for(pipeline.run(items), 5)
+
+    assert seen == {"a": len(items), "b": len(items), "c": len(items)}
+
+
+def test_a_pipeline_needs_stages():
+    with pytest.raises(ValueError):
+        IngestionPipeline([])
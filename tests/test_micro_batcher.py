@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+
+from app.services.micro_batcher import MicroBatcher
+
+
+class Recorder:
+    """
+    Batch function that records the batches it gets and answers every item with its double.
+    Items listed in `failing` come back as exceptions, batches wait for `release` when set.
+    """
+
+    def __init__(self, failing: set[int] | None = None):
+        self.batches: list[list[int]] = []
+        self.failing = failing or set()
+        self.release: asyncio.Event | None = None
+        self.running = 0
+        self.peak = 0
+
+    async def __call__(self, items: list[int]) -> list[int | Exception]:
+        self.batches.append(items)
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            if self.release is not None:
+                await self.release.wait()
+            return [ValueError(item) if item in self.failing else item * 2 for item in items]
+        finally:
+            self.running -= 1
+
+
+async def test_a_full_batch_is_sent_without_waiting():
+    run = Recorder()
+    batcher = MicroBatcher(run, max_items=3, flush_interval=10)
+
+    results = await asyncio.wait_for(batcher.submit_many([1, 2, 3]), 1)
+
+    assert results == [2, 4, 6]
+    assert run.batches == [[1, 2, 3]]
+    await batcher.close()
+
+
+async def test_a_partial_batch_is_sent_after_the_flush_interval():
+    run = Recorder()
+    batcher = MicroBatcher(run, max_items=10, flush_interval=0.05)
+
+    results = await asyncio.gather(batcher.submit(1), batcher.submit(2))
+
+    assert results == [2, 4]
+    assert run.batches == [[1, 2]]
+    await batcher.close()
+
+
+async def test_batches_stay_within_the_weight_limit():
+    run = Recorder()
+    batcher = MicroBatcher(run, max_items=10, max_weight=10, flush_interval=0)
+
+    await batcher.submit_many([1, 2, 3, 4], weights=[4, 4, 4, 20])
+
+    assert run.batches == [[1, 2], [3], [4]]
+    await batcher.close()
+
+
+async def test_a_failed_item_only_fails_its_caller():
+    run = Recorder(failing={2})
+    batcher = MicroBatcher(run, max_items=3, flush_interval=10)
+
+    results = await asyncio.gather(
+        batcher.submit(1), batcher.submit(2), batcher.submit(3), return_exceptions=True
+    )
+
+    assert results[0] == 2 and results[2] == 6
+    assert isinstance(results[1], ValueError)
+    await batcher.close()
+
+
+async def test_a_failed_batch_fails_every_caller():
+    async def broken(items):
+        raise RuntimeError("worker died")
+
+    batcher = MicroBatcher(broken, max_items=2, flush_interval=10)
+
+    with pytest.raises(RuntimeError, match="worker died"):
+        await batcher.submit_many([1, 2])
+    await batcher.close()
+
+
+async def test_batches_in_flight_are_capped_and_cancelled_items_dropped():
+    run = Recorder()
+    run.release = asyncio.Event()
+    batcher = MicroBatcher(run, max_items=1, flush_interval=0, max_in_flight=2)
+
+    first = [asyncio.create_task(batcher.submit(item)) for item in (1, 2, 3)]
+    await asyncio.sleep(0.05)
+    given_up = asyncio.create_task(batcher.submit(4))
+    await asyncio.sleep(0)
+    given_up.cancel()
+
+    assert run.batches == [[1], [2]]
+    run.release.set()
+    assert await asyncio.gather(*first) == [2, 4, 6]
+
+    assert run.peak == 2
+    assert [4] not in run.batches
+    await batcher.close()
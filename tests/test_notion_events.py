@@ -0,0 +1,122 @@
+import asyncio
+
+import pytest
+
+from app.services import notion_events
+from app.services.notion_events import EventDebouncer, EventStats, classify_event
+from app.services.sync_jobs import SyncJobManager
+from app.services.sync_service import SyncStats
+
+INTEGRATION = {"id": "integration", "user_id": "user", "account_id": "account"}
+
+
+@pytest.fixture
+def errors(monkeypatch):
+    """
+    Records what the debouncer logs at error level.
+    """
+    logged: list[str] = []
+    monkeypatch.setattr(notion_events.logger, "error", logged.append)
+    return logged
+
+
+@pytest.fixture
+def applied(monkeypatch, errors):
+    """
+    Records every batch of events applied, as (changed, deleted) page id lists. Every page
+    applied succeeds, and no batch may fail.
+    """
+    batches: list[tuple[list[str], list[str]]] = []
+
+    async def sync_page_events(integration, changed, deleted):
+        batches.append((sorted(changed), sorted(deleted)))
+        stats = SyncStats(pages_total=len(changed) + len(deleted))
+        stats.pages_reindexed = len(changed)
+        stats.pages_deleted = len(deleted)
+        return stats
+
+    monkeypatch.setattr(notion_events.NotionSyncService, "sync_page_events", sync_page_events)
+    yield batches
+    assert errors == []
+
+
+def test_classify_event():
+    assert classify_event("page.changed") == "changed"
+    assert classify_event("page.content_updated") == "changed"
+    assert classify_event("page.deleted") == "deleted"
+    assert classify_event("comment.created") is None
+
+
+async def test_a_burst_on_one_page_is_applied_once(applied):
+    debouncer = EventDebouncer(window=0.05, job_manager=SyncJobManager())
+    for _ in range(3):
+        debouncer.add(INTEGRATION, "page-a", "changed")
+    debouncer.add(INTEGRATION, "page-b", "changed")
+    debouncer.add(INTEGRATION, "page-b", "deleted")
+
+    await asyncio.sleep(0.15)
+
+    assert applied == [(["page-a"], ["page-b"])]
+    assert debouncer.stats == EventStats(
+        received=5, coalesced=3, flushes=1, pages_reindexed=1, pages_deleted=1
+    )
+    assert debouncer.pending_count() == 0
+
+
+async def test_steady_events_are_applied_by_the_deadline(applied):
+    debouncer = EventDebouncer(window=0.1, max_wait=0.25, job_manager=SyncJobManager())
+
+    # An event every 50ms keeps resetting the 100ms window
+    for i in range(12):
+        debouncer.add(INTEGRATION, f"page-{i}", "changed")
+        await asyncio.sleep(0.05)
+
+    assert len(applied) >= 2
+    await debouncer.close()
+
+
+async def test_events_wait_for_a_running_sync(applied):
+    manager = SyncJobManager()
+    debouncer = EventDebouncer(window=0.02, job_manager=manager)
+    lock = manager.integration_lock(INTEGRATION["id"])
+
+    await lock.acquire()
+    debouncer.add(INTEGRATION, "page-a", "changed")
+    await asyncio.sleep(0.05)
+    debouncer.add(INTEGRATION, "page-b", "changed")
+
+    assert await debouncer.flush(INTEGRATION["id"]) is False
+    await asyncio.sleep(0.05)
+    assert applied == []
+
+    lock.release()
+    await asyncio.sleep(0.05)
+
+    # Everything that arrived while the sync ran goes in one batch
+    assert applied == [(["page-a", "page-b"], [])]
+    assert (debouncer.stats.flushes, debouncer.stats.pages_reindexed) == (1, 2)
+
+
+async def test_flush_applies_right_away(applied):
+    debouncer = EventDebouncer(window=10, job_manager=SyncJobManager())
+    debouncer.add(INTEGRATION, "page-a", "changed")
+
+    assert await debouncer.flush() is True
+    assert applied == [(["page-a"], [])]
+    assert debouncer.stats == EventStats(received=1, flushes=1, pages_reindexed=1)
+    await debouncer.close()
+
+
+async def test_a_failed_batch_counts_its_pages_as_failed(monkeypatch, errors):
+    async def sync_page_events(integration, changed, deleted):
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(notion_events.NotionSyncService, "sync_page_events", sync_page_events)
+    debouncer = EventDebouncer(window=10, job_manager=SyncJobManager())
+    debouncer.add(INTEGRATION, "page-a", "changed")
+    debouncer.add(INTEGRATION, "page-b", "deleted")
+
+    await debouncer.flush()
+
+    assert debouncer.stats.pages_failed == 2
+    assert errors == ["Failed to apply page events for integration: database unavailable"]
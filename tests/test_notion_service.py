@@ -0,0 +1,200 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+from app.services import notion_service
+from app.services.block_cache import BlockCache
+from app.services.notion_service import NotionService, PageTooLargeError, TruncationStats
+
+
+def block(block_id: str, has_children: bool = False) -> dict:
+    return {"id": block_id, "type": "paragraph", "has_children": has_children}
+
+
+@pytest.fixture
+def notion(monkeypatch):
+    """
+    Answers block children requests from `tree`, a map of container id to its children, and
+    records the containers requested. A container listed in `hanging` never answers.
+    """
+    tree: dict[str, list[dict]] = {}
+    hanging: set[str] = set()
+    requested: list[str] = []
+    cancelled: list[str] = []
+
+    async def proxy_request(url: str, **kwargs) -> dict:
+        block_id = url.split("/blocks/")[1].split("/")[0]
+        requested.append(block_id)
+        if block_id in hanging:
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                cancelled.append(block_id)
+                raise
+        return {"results": tree.get(block_id, []), "has_more": False}
+
+    monkeypatch.setattr(notion_service.pipedream_client, "proxy_request", proxy_request)
+    return tree, hanging, requested, cancelled
+
+
+async def fetch(page_id: str, max_blocks: int | None = None) -> list[dict]:
+    return await NotionService.fetch_page_blocks(
+        external_user_id="user", account_id="account", page_id=page_id, max_blocks=max_blocks
+    )
+
+
+async def stream(page_id: str, prefetched: dict | None = None) -> list[tuple[str, int]]:
+    return [
+        (block["id"], depth)
+        async for block, depth in NotionService.stream_page_blocks(
+            external_user_id="user", account_id="account", page_id=page_id, prefetched=prefetched
+        )
+    ]
+
+
+async def test_fetch_attaches_children_breadth_first(notion):
+    tree, _, requested, _ = notion
+    tree["page"] = [block("a", True), block("b")]
+    tree["a"] = [block("a1", True)]
+    tree["a1"] = [block("a1x")]
+
+    blocks = await fetch("page")
+
+    assert [b["id"] for b in blocks] == ["a", "b"]
+    assert blocks[0]["children"][0]["children"][0]["id"] == "a1x"
+    assert requested == ["page", "a", "a1"]
+
+
+async def test_failed_fetch_cancels_sibling_fetches(notion):
+    tree, hanging, _, cancelled = notion
+    tree["page"] = [block("a", True), block("b", True)]
+    tree["a"] = [block(f"a{i}") for i in range(5)]
+    hanging.add("b")
+
+    with pytest.raises(PageTooLargeError):
+        await fetch("page", max_blocks=4)
+
+    assert cancelled == ["b"]
+
+
+async def test_too_large_page_hands_over_fetched_children(notion):
+    tree, _, requested, _ = notion
+    tree["page"] = [block("a", True), block("b", True), block("c")]
+    tree["a"] = [block("a1", True), block("a2")]
+    tree["a1"] = [block("a1x")]
+    tree["b"] = [block(f"b{i}") for i in range(5)]
+
+    with pytest.raises(PageTooLargeError) as exc_info:
+        await fetch("page", max_blocks=6)
+
+    prefetched = exc_info.value.prefetched
+    assert set(prefetched) == {"page", "a"}
+
+    requested.clear()
+    walked = await stream("page", prefetched)
+
+    # Only the containers not fetched completely are requested again
+    assert sorted(requested) == ["a1", "b"]
+    assert walked == [
+        ("a", 0),
+        ("a1", 1),
+        ("a1x", 2),
+        ("a2", 1),
+        ("b", 0),
+        *((f"b{i}", 1) for i in range(5)),
+        ("c", 0),
+    ]
+    assert prefetched == {}
+
+
+async def test_stream_matches_fetch_order(notion):
+    tree, *_ = notion
+    tree["page"] = [block("a", True), block("b")]
+    tree["a"] = [block("a1", True), block("a2")]
+    tree["a1"] = [block("a1x")]
+
+    assert await stream("page") == [("a", 0), ("a1", 1), ("a1x", 2), ("a2", 1), ("b", 0)]
+
+
+async def test_cached_pages_with_expiring_file_urls_are_fetched_again(
+    notion, tmp_path, monkeypatch
+):
+    tree, _, requested, _ = notion
+    monkeypatch.setattr(
+        notion_service, "block_cache", BlockCache(str(tmp_path / "blocks.sqlite3"), 1024 * 1024)
+    )
+    signed = {"url": "https://files.notion.so/cat.png", "expiry_time": "2020-01-01T00:00:00.000Z"}
+    edited = {"last_edited_time": "2025-01-01T00:00:00.000Z"}
+    tree["text"] = [{**block("a", True), **edited}]
+    tree["a"] = [block("a1")]
+    tree["media"] = [
+        {**block("b", True), **edited},
+        {"id": "img", "type": "image", "image": {"file": signed}},
+    ]
+    tree["b"] = [block("b1")]
+
+    async def fetch_cached(page_id: str) -> list[dict]:
+        return await NotionService.fetch_page_blocks(
+            external_user_id="user",
+            account_id="account",
+            page_id=page_id,
+            last_edited_time=edited["last_edited_time"],
+        )
+
+    for page_id in ("text", "media"):
+        await fetch_cached(page_id)
+    requested.clear()
+
+    assert (await fetch_cached("text"))[0]["children"] == [block("a1")]
+    assert requested == []
+
+    blocks = await fetch_cached("media")
+    assert blocks[1]["image"]["file"] == signed
+    assert requested == ["media", "b"]
+
+
+@pytest.mark.parametrize(
+    ("responses", "truncated"),
+    [
+        # The last batch before the limit still had more to give
+        ([{"results": ["page-1"], "has_more": True, "next_cursor": "c1"}], 1),
+        # An empty batch ends the search even after one that announced more
+        (
+            [
+                {"results": ["page-1"], "has_more": True, "next_cursor": "c1"},
+                {"results": [], "has_more": True, "next_cursor": "c2"},
+            ],
+            0,
+        ),
+    ],
+)
+async def test_only_searches_cut_short_count_as_truncated(monkeypatch, responses, truncated):
+    edited = datetime.now(timezone.utc).isoformat()
+    batches = iter(
+        {
+            **response,
+            "results": [{"id": i, "last_edited_time": edited} for i in response["results"]],
+        }
+        for response in responses
+    )
+
+    async def fetch_search_batch(**kwargs) -> dict:
+        return next(batches)
+
+    monkeypatch.setattr(NotionService, "_fetch_search_batch", fetch_search_batch)
+    truncation = TruncationStats()
+
+    pages = [
+        page["id"]
+        async for _, batch in NotionService.stream_page_batches(
+            external_user_id="user",
+            account_id="account",
+            max_iterations=len(responses),
+            truncation=truncation,
+        )
+        for page in batch
+    ]
+
+    assert pages == ["page-1"]
+    assert truncation.searches_truncated == truncated
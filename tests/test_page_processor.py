@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from app import utils
+from app.services.page_processor import PageProcessor, process_page
+
+WORDS = ["setup", "install", "run", "the", "service", "notes", "cat", "image", "todo"]
+
+
+def rich_text(text: str) -> dict:
+    return {"rich_text": [{"plain_text": text}]}
+
+
+PAGES = [
+    [
+        {"id": "h1", "type": "heading_1", "heading_1": rich_text("Setup")},
+        {"id": "p1", "type": "paragraph", "paragraph": rich_text("install the service")},
+        {
+            "id": "t1",
+            "type": "toggle",
+            "has_children": True,
+            "toggle": rich_text("notes"),
+            "children": [{"id": "t1a", "type": "to_do", "to_do": rich_text("run the service")}],
+        },
+    ],
+    [
+        {"id": "p2", "type": "paragraph", "paragraph": rich_text("cat image")},
+        {
+            "id": "img",
+            "type": "image",
+            "image": {
+                "type": "external",
+                "external": {"url": "https://example.com/cat.png"},
+                "caption": [{"plain_text": "cat"}],
+            },
+        },
+    ],
+    [],
+]
+
+
+@pytest.fixture(scope="module")
+def tokenizer_path(tmp_path_factory) -> str:
+    """A small word piece tokenizer saved locally, the workers load it by path."""
+    transformers = pytest.importorskip("transformers")
+    path = tmp_path_factory.mktemp("tokenizer")
+    vocab = path / "vocab.txt"
+    vocab.write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", *WORDS]))
+    transformers.BertTokenizerFast(vocab_file=str(vocab)).save_pretrained(path)
+    return str(path)
+
+
+async def test_pool_results_match_processing_in_process(tokenizer_path, monkeypatch):
+    # Read by the spawned workers when they import the app, the pages go to them pickled
+    monkeypatch.setenv("EMBEDDING_MODEL", tokenizer_path)
+    load_tokenizer = utils.get_tokenizer
+    monkeypatch.setattr(utils, "get_tokenizer", lambda model=None: load_tokenizer(tokenizer_path))
+    processor = PageProcessor(workers=1, batch_pages=4, flush_interval=0.05)
+
+    try:
+        processed = await asyncio.wait_for(
+            asyncio.gather(
+                *(processor.process(blocks) for blocks in PAGES),
+                processor.process([None]),
+                return_exceptions=True,
+            ),
+            60,
+        )
+    finally:
+        await processor.close()
+
+    assert processed[:-1] == [process_page(blocks) for blocks in PAGES]
+    assert processed[1].media_metadata[0]["url"] == "https://example.com/cat.png"
+    # A page that fails comes back as its own error
+    assert isinstance(processed[-1], Exception)
@@ -0,0 +1,89 @@
+import httpx
+import pytest
+
+from app.services import pipedream_service
+from app.services.pipedream_service import PipedreamClientError, PipedreamService
+from app.services.rate_limiter import RateLimiter
+
+
+class CountingRateLimiter(RateLimiter):
+    def __init__(self):
+        super().__init__(rate=1000, burst=1000)
+        self.acquired = 0
+
+    async def acquire(self, key: str) -> None:
+        self.acquired += 1
+        await super().acquire(key)
+
+
+@pytest.fixture
+def proxy(monkeypatch):
+    """
+    A PipedreamService whose HTTP traffic goes to `responses`, a list of (status, headers)
+    answered in order for proxied requests. Returns the service, the limiter, the responses,
+    the proxied requests sent and the keyword arguments the SDK client was created with.
+    """
+    responses: list[tuple[int, dict[str, str]]] = []
+    sent: list[httpx.Request] = []
+    client_kwargs: dict = {}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("/oauth/token"):
+            return httpx.Response(
+                200, json={"access_token": "token", "token_type": "Bearer", "expires_in": 3600}
+            )
+        sent.append(request)
+        status, headers = responses.pop(0) if responses else (200, {})
+        return httpx.Response(status, headers=headers, json={"ok": status == 200})
+
+    client_class = pipedream_service.AsyncPipedream
+
+    def client(**kwargs):
+        client_kwargs.update(kwargs)
+        return client_class(
+            **kwargs, httpx_client=httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        )
+
+    limiter = CountingRateLimiter()
+    monkeypatch.setattr(pipedream_service, "AsyncPipedream", client)
+    monkeypatch.setattr(pipedream_service, "proxy_rate_limiter", limiter)
+    return PipedreamService(), limiter, responses, sent, client_kwargs
+
+
+def test_sdk_retries_are_disabled(proxy):
+    # Depending on the SDK version, its retries would resend proxied requests without a token
+    *_, client_kwargs = proxy
+    assert client_kwargs["max_retries"] == 0
+
+
+async def test_each_attempt_sends_one_request_per_token(proxy):
+    service, limiter, responses, sent, _ = proxy
+    responses.extend([(429, {"Retry-After": "0.01"}), (503, {"Retry-After": "0"}), (200, {})])
+
+    result = await service.proxy_request("user", "account", "https://api.notion.com/v1/search")
+
+    assert result == {"ok": True}
+    assert len(sent) == 3
+    assert limiter.acquired == len(sent)
+
+
+async def test_gives_up_after_the_last_attempt(proxy):
+    service, limiter, responses, sent, _ = proxy
+    responses.extend([(429, {"Retry-After": "0.01"})] * pipedream_service.PROXY_MAX_ATTEMPTS)
+
+    with pytest.raises(PipedreamClientError):
+        await service.proxy_request("user", "account", "https://api.notion.com/v1/search")
+
+    assert len(sent) == pipedream_service.PROXY_MAX_ATTEMPTS
+    assert limiter.acquired == len(sent)
+
+
+async def test_client_errors_are_not_retried(proxy):
+    service, limiter, responses, sent, _ = proxy
+    responses.append((404, {}))
+
+    with pytest.raises(PipedreamClientError):
+        await service.proxy_request("user", "account", "https://api.notion.com/v1/search")
+
+    assert len(sent) == 1
+    assert limiter.acquired == 1
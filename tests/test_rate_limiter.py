@@ -0,0 +1,78 @@
+import asyncio
+import time
+
+from app.services.rate_limiter import RateLimiter, TokenBucket
+
+
+async def test_burst_is_served_immediately():
+    bucket = TokenBucket(rate=1, capacity=3)
+
+    started = time.monotonic()
+    for _ in range(3):
+        await bucket.acquire()
+
+    assert time.monotonic() - started < 0.05
+
+
+async def test_an_empty_bucket_waits_for_a_refill():
+    bucket = TokenBucket(rate=20, capacity=1)
+    await bucket.acquire()
+
+    started = time.monotonic()
+    await bucket.acquire()
+
+    assert 0.04 <= time.monotonic() - started < 0.2
+
+
+async def test_rate_holds_over_many_acquires():
+    bucket = TokenBucket(rate=100, capacity=1)
+
+    started = time.monotonic()
+    for _ in range(11):
+        await bucket.acquire()
+
+    # The first token is the burst, the other ten take 1/100s each
+    assert time.monotonic() - started >= 0.09
+
+
+async def test_pause_blocks_every_waiter():
+    bucket = TokenBucket(rate=1000, capacity=5)
+    bucket.pause(0.1)
+
+    started = time.monotonic()
+    await asyncio.gather(*(bucket.acquire() for _ in range(3)))
+
+    assert time.monotonic() - started >= 0.1
+
+
+async def test_a_shorter_pause_does_not_cut_a_longer_one():
+    bucket = TokenBucket(rate=1000, capacity=1)
+    bucket.pause(0.1)
+    bucket.pause(0.01)
+
+    started = time.monotonic()
+    await bucket.acquire()
+
+    assert time.monotonic() - started >= 0.1
+
+
+async def test_accounts_have_their_own_buckets():
+    limiter = RateLimiter(rate=1, burst=1)
+    await limiter.acquire("account-a")
+
+    started = time.monotonic()
+    await limiter.acquire("account-b")
+
+    assert time.monotonic() - started < 0.05
+    assert limiter.bucket("account-a") is limiter.bucket("account-a")
+    assert limiter.bucket("account-a") is not limiter.bucket("account-b")
+
+
+async def test_pausing_one_account_leaves_the_others_alone():
+    limiter = RateLimiter(rate=1000, burst=1)
+    limiter.pause("account-a", 1.0)
+
+    started = time.monotonic()
+    await limiter.acquire("account-b")
+
+    assert time.monotonic() - started < 0.05
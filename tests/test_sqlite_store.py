@@ -0,0 +1,65 @@
+import sqlite3
+import time
+
+import pytest
+
+from app.services.sqlite_store import SQLiteStore, StoreRow
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "cache.sqlite3")
+
+
+def test_tagged_rows_are_only_found_with_their_tag(path):
+    store = SQLiteStore.open(path, "items", 1024)
+    store.store([StoreRow("a", b"one", tag="v1"), StoreRow("b", b"two")])
+
+    assert store.load(["a", "b"], ["v1", None]) == {"a": b"one", "b": b"two"}
+    assert store.load(["a"], ["v2"]) == {}
+    assert store.load(["a", "b"]) == {"a": b"one", "b": b"two"}
+    store.release()
+
+
+def test_expired_rows_read_as_missing(path):
+    store = SQLiteStore.open(path, "items", 1024)
+    store.store(
+        [
+            StoreRow("old", b"one", expires_at=time.time() - 1),
+            StoreRow("new", b"two", expires_at=time.time() + 60),
+        ]
+    )
+
+    assert store.load(["old", "new"]) == {"new": b"two"}
+    store.release()
+
+
+def test_stores_of_one_table_are_shared_until_the_last_release(path):
+    first = SQLiteStore.open(path, "items", 1024)
+    second = SQLiteStore.open(path, "items", 2048)
+    other_table = SQLiteStore.open(path, "other", 1024)
+
+    assert first is second and second.max_bytes == 1024
+    assert other_table is not first
+
+    first.store([StoreRow("a", b"x" * 100)])
+    first.release()
+    assert second.load(["a"]) == {"a": b"x" * 100}
+    second.release()
+    other_table.release()
+
+    assert SQLiteStore.open(path, "items", 2048) is not first
+
+
+def test_a_table_with_an_older_layout_is_replaced(path):
+    with sqlite3.connect(path) as db:
+        db.execute("CREATE TABLE items (key TEXT PRIMARY KEY, vector BLOB, last_used REAL)")
+        db.execute("INSERT INTO items VALUES ('a', x'00', 0)")
+    db.close()
+
+    store = SQLiteStore.open(path, "items", 1024)
+    store.store([StoreRow("b", b"two")])
+
+    assert store.load(["a", "b"]) == {"b": b"two"}
+    assert store.size == 3
+    store.release()
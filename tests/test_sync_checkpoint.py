@@ -0,0 +1,114 @@
+import pytest
+
+from app.database.operations import SyncCheckpointOperations
+from app.services import sync_jobs
+from app.services.sync_jobs import SyncJobManager
+from app.services.sync_service import PageTask, SyncCheckpoint
+
+
+@pytest.fixture
+def writes(monkeypatch):
+    """
+    Records checkpoint writes instead of sending them to the database.
+    """
+    calls: dict[str, list] = {"cursor": [], "status": [], "pending": [], "failed": []}
+
+    monkeypatch.setattr(
+        SyncCheckpointOperations,
+        "update_cursor",
+        lambda integration_id, cursor: calls["cursor"].append(cursor) or True,
+    )
+    monkeypatch.setattr(
+        SyncCheckpointOperations,
+        "set_page_status",
+        lambda integration_id, page_id, status, error=None: calls["status"].append(
+            (page_id, status, error)
+        )
+        or True,
+    )
+    monkeypatch.setattr(
+        SyncCheckpointOperations,
+        "mark_pages_pending",
+        lambda integration_id, page_ids: calls["pending"].append(page_ids) or True,
+    )
+    monkeypatch.setattr(
+        SyncCheckpointOperations,
+        "fail_checkpoint",
+        lambda integration_id: calls["failed"].append(integration_id) or True,
+    )
+    return calls
+
+
+def page(page_id: str, batch_index: int) -> PageTask:
+    return PageTask(page={"id": page_id}, is_known=False, batch_index=batch_index)
+
+
+async def test_cursor_moves_past_a_batch_once_all_its_pages_finished(writes):
+    checkpoint = SyncCheckpoint("integration")
+    checkpoint.add_batch(None, 2)
+    checkpoint.add_batch("cursor-1", 1)
+    checkpoint.add_batch("cursor-2", 1)
+
+    await checkpoint.page_finished(page("a", 0), "done")
+    assert writes["cursor"] == []
+
+    # A later batch finishing first does not move the cursor past an unfinished one
+    await checkpoint.page_finished(page("c", 1), "done")
+    assert writes["cursor"] == []
+
+    await checkpoint.page_finished(page("b", 0), "failed", "boom")
+    assert writes["cursor"] == ["cursor-2"]
+    assert writes["status"] == [("a", "done", None), ("c", "done", None), ("b", "failed", "boom")]
+
+
+async def test_cursor_is_only_written_when_it_changes(writes):
+    checkpoint = SyncCheckpoint("integration", search_cursor="cursor-1")
+    checkpoint.add_batch("cursor-1", 2)
+    checkpoint.add_batch("cursor-2", 1)
+
+    await checkpoint.page_finished(page("a", 0), "done")
+    await checkpoint.page_finished(page("b", 0), "done")
+    await checkpoint.page_finished(page("c", 1), "done")
+
+    # Nothing is left once the last batch finishes, the completed sync clears the cursor itself
+    assert writes["cursor"] == ["cursor-2"]
+
+
+async def test_pending_pages_are_recorded(writes):
+    checkpoint = SyncCheckpoint("integration")
+    await checkpoint.mark_pending(["a", "b"])
+
+    assert writes["pending"] == [["a", "b"]]
+
+
+async def test_a_failed_job_marks_its_checkpoint_failed(writes, monkeypatch):
+    async def failing_sync(**kwargs):
+        raise RuntimeError("search failed")
+
+    monkeypatch.setattr(sync_jobs.NotionSyncService, "sync_pages", failing_sync)
+    manager = SyncJobManager()
+    # Not queued, so no worker picks the job up next to this run
+    job = manager._create({"id": "integration", "user_id": "user"}, 6, False)
+
+    await manager._run(job)
+
+    assert job.status == "failed"
+    assert writes["failed"] == ["integration"]
+
+
+async def test_a_checkpoint_that_cannot_be_failed_does_not_stop_the_worker(writes, monkeypatch):
+    async def failing_sync(**kwargs):
+        raise RuntimeError("search failed")
+
+    def unreachable(integration_id):
+        raise ConnectionError("database unavailable")
+
+    monkeypatch.setattr(sync_jobs.NotionSyncService, "sync_pages", failing_sync)
+    monkeypatch.setattr(SyncCheckpointOperations, "fail_checkpoint", unreachable)
+    manager = SyncJobManager()
+    job = manager._create({"id": "integration", "user_id": "user"}, 6, False)
+
+    await manager._run(job)
+
+    assert job.status == "failed"
+    assert job.error == "search failed"
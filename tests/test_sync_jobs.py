@@ -0,0 +1,21 @@
+from app.services.sync_jobs import SyncJobManager
+
+
+def integration(integration_id: str, user_id: str) -> dict:
+    return {"id": integration_id, "user_id": user_id, "last_synced_at": "2025-01-01T00:00:00Z"}
+
+
+async def test_a_queued_resync_upgraded_to_a_full_one_moves_to_the_bulk_lane():
+    manager = SyncJobManager(workers=1)
+    job, _ = manager.submit(integration("a", "user-a"))
+    assert job.priority == "interactive"
+
+    upgraded, coalesced = manager.submit(integration("a", "user-a"), full_resync=True)
+    other, _ = manager.submit(integration("b", "user-b"))
+    # Nothing runs, the queue order is all that is looked at
+    await manager.shutdown()
+
+    assert (upgraded, coalesced) == (job, True)
+    assert (job.full_resync, job.priority) == (True, "bulk")
+    assert manager.queued() == {"interactive": {"user-b": 1}, "bulk": {"user-a": 1}}
+    assert [await manager._queue.get() for _ in range(2)] == [other, job]
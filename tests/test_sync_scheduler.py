@@ -0,0 +1,104 @@
+import asyncio
+
+from app.services.sync_scheduler import FairLimiter, FairQueue
+
+
+async def test_queue_takes_turns_between_users():
+    queue: FairQueue[str] = FairQueue()
+    for item in ("a1", "a2", "a3"):
+        queue.put_nowait(item, "a")
+    queue.put_nowait("b1", "b")
+
+    assert [await queue.get() for _ in range(4)] == ["a1", "b1", "a2", "a3"]
+
+
+async def test_queue_serves_interactive_items_first():
+    queue: FairQueue[str] = FairQueue()
+    queue.put_nowait("bulk", "a", "bulk")
+    queue.put_nowait("interactive", "b", "interactive")
+
+    assert await queue.get() == "interactive"
+    assert await queue.get() == "bulk"
+    assert len(queue) == 0
+
+
+async def test_queue_get_waits_for_an_item():
+    queue: FairQueue[str] = FairQueue()
+    getter = asyncio.create_task(queue.get())
+    await asyncio.sleep(0)
+    assert not getter.done()
+
+    queue.put_nowait("item", "a")
+    assert await asyncio.wait_for(getter, 1) == "item"
+
+
+async def test_limiter_caps_concurrency():
+    limiter = FairLimiter("test", 2)
+    running = 0
+    peak = 0
+
+    async def work(user_id: str) -> None:
+        nonlocal running, peak
+        async with limiter.slot(user_id):
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+    await asyncio.gather(*(work(f"user-{i % 3}") for i in range(10)))
+
+    assert peak == 2
+    assert limiter.in_use == 0
+
+
+async def test_limiter_hands_freed_slots_out_fairly():
+    limiter = FairLimiter("test", 1)
+    order: list[str] = []
+    await limiter.acquire("holder")
+
+    async def wait(name: str, user_id: str, priority: str) -> None:
+        async with limiter.slot(user_id, priority):
+            order.append(name)
+
+    waiters = [
+        asyncio.create_task(wait("a-bulk", "a", "bulk")),
+        asyncio.create_task(wait("a1", "a", "interactive")),
+        asyncio.create_task(wait("a2", "a", "interactive")),
+        asyncio.create_task(wait("b1", "b", "interactive")),
+    ]
+    await asyncio.sleep(0)
+    assert limiter.waiting == 4
+
+    limiter.release()
+    await asyncio.gather(*waiters)
+
+    assert order == ["a1", "b1", "a2", "a-bulk"]
+    assert limiter.in_use == 0
+
+
+async def test_a_cancelled_waiter_does_not_keep_a_slot():
+    limiter = FairLimiter("test", 1)
+    await limiter.acquire("holder")
+
+    waiter = asyncio.create_task(limiter.acquire("a"))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    await asyncio.gather(waiter, return_exceptions=True)
+
+    limiter.release()
+    assert limiter.in_use == 0
+
+
+async def test_a_slot_handed_to_a_cancelled_waiter_is_passed_on():
+    limiter = FairLimiter("test", 1)
+    await limiter.acquire("holder")
+
+    waiter = asyncio.create_task(limiter.acquire("a"))
+    await asyncio.sleep(0)
+
+    # The slot goes to the waiter, which is cancelled before it gets to run
+    limiter.release()
+    waiter.cancel()
+    await asyncio.gather(waiter, return_exceptions=True)
+
+    assert limiter.in_use == 0
@@ -0,0 +1,283 @@
+import numpy as np
+import pytest
+
+from app.database.operations import (
+    IntegrationOperations,
+    NotionPageOperations,
+    PageChunkOperations,
+    SyncCheckpointOperations,
+)
+from app.services import page_processor, sync_service
+from app.services.embedding_batcher import EmbeddingBatcher
+from app.services.notion_service import NotionService
+from app.services.page_processor import PageProcessor
+from app.services.sync_service import NotionSyncService
+
+INTEGRATION = {"id": "integration", "user_id": "user", "account_id": "account"}
+
+
+def section(title: str, text: str) -> list[dict]:
+    return [
+        {
+            "id": f"h-{title}",
+            "type": "heading_1",
+            "heading_1": {"rich_text": [{"plain_text": title}]},
+        },
+        {
+            "id": f"p-{title}",
+            "type": "paragraph",
+            "paragraph": {"rich_text": [{"plain_text": text}]},
+        },
+    ]
+
+
+class Workspace:
+    """
+    The Notion pages a sync sees and the rows it leaves in the database, kept in memory.
+    """
+
+    def __init__(self):
+        self.pages: dict[str, dict] = {}
+        self.blocks: dict[str, list[dict]] = {}
+        self.edit_times: dict[str, str | None] = {}
+        self.chunks: dict[str, dict[int, dict]] = {}
+        self.fetched: list[str] = []
+        self.embedded: list[str] = []
+        self.embed_priorities: set[str] = set()
+        self.written: list[list[int]] = []
+        self.synced_at: list[str] = []
+        self.statuses: list[tuple[str, str]] = []
+        self.fail_store = False
+
+    def edit(self, page_id: str, edited: str, *sections: tuple[str, str]) -> None:
+        self.pages[page_id] = {
+            "id": page_id,
+            "url": f"https://notion.so/{page_id}",
+            "last_edited_time": edited,
+            "properties": {},
+        }
+        self.blocks[page_id] = [block for title, text in sections for block in section(title, text)]
+
+    def stored_chunks(self, page_id: str) -> list[str]:
+        rows = self.chunks.get(f"db-{page_id}", {})
+        return [rows[index]["content"] for index in sorted(rows)]
+
+
+@pytest.fixture
+def workspace(monkeypatch):
+    space = Workspace()
+
+    async def stream_page_batches(**kwargs):
+        yield None, list(space.pages.values())
+
+    async def fetch_page_blocks(page_id, **kwargs):
+        space.fetched.append(page_id)
+        return space.blocks[page_id]
+
+    def upsert_notion_page(integration_id, notion_page_id, **kwargs):
+        # A page row written again loses its edit time until it is marked indexed
+        space.edit_times[notion_page_id] = None
+        return {"id": f"db-{notion_page_id}"}
+
+    def mark_page_indexed(page_id, last_edited_time):
+        space.edit_times[page_id.removeprefix("db-")] = last_edited_time
+        return True
+
+    def get_chunk_fingerprints(page_id, embedding_model):
+        return [dict(row) for _, row in sorted(space.chunks.get(page_id, {}).items())]
+
+    def replace_page_chunks(page_id, chunk_count, chunks, embedding_model=None):
+        if space.fail_store:
+            raise RuntimeError("database unavailable")
+        rows = space.chunks.setdefault(page_id, {})
+        rows.update({chunk["chunk_index"]: chunk for chunk in chunks})
+        for index in [index for index in rows if chunk_count is not None and index >= chunk_count]:
+            del rows[index]
+        space.written.append([chunk["chunk_index"] for chunk in chunks])
+        return len(chunks)
+
+    async def fetch_page(external_user_id, account_id, page_id):
+        return space.pages[page_id]
+
+    def delete_notion_page(integration_id, notion_page_id):
+        space.chunks.pop(f"db-{notion_page_id}", None)
+        return space.edit_times.pop(notion_page_id, False) is not False
+
+    def embed(texts, priority):
+        space.embedded.extend(texts)
+        space.embed_priorities.add(priority)
+        return np.array([[len(text), 1.0] for text in texts], dtype=np.float32)
+
+    monkeypatch.setattr(NotionService, "stream_page_batches", stream_page_batches)
+    monkeypatch.setattr(NotionService, "fetch_page_blocks", fetch_page_blocks)
+    monkeypatch.setattr(NotionService, "fetch_page", fetch_page)
+    monkeypatch.setattr(NotionPageOperations, "upsert_notion_page", upsert_notion_page)
+    monkeypatch.setattr(NotionPageOperations, "delete_notion_page", delete_notion_page)
+    monkeypatch.setattr(NotionPageOperations, "mark_page_indexed", mark_page_indexed)
+    monkeypatch.setattr(
+        NotionPageOperations, "get_page_edit_times", lambda *args, **kwargs: dict(space.edit_times)
+    )
+    monkeypatch.setattr(PageChunkOperations, "get_chunk_fingerprints", get_chunk_fingerprints)
+    monkeypatch.setattr(PageChunkOperations, "replace_page_chunks", replace_page_chunks)
+    monkeypatch.setattr(
+        IntegrationOperations,
+        "update_last_synced_at",
+        lambda integration_id, synced_at: space.synced_at.append(synced_at) or True,
+    )
+    monkeypatch.setattr(SyncCheckpointOperations, "get_checkpoint", lambda integration_id: None)
+    monkeypatch.setattr(SyncCheckpointOperations, "start_checkpoint", lambda *args: True)
+    monkeypatch.setattr(SyncCheckpointOperations, "mark_pages_pending", lambda *args: True)
+    monkeypatch.setattr(SyncCheckpointOperations, "update_cursor", lambda *args: True)
+    monkeypatch.setattr(SyncCheckpointOperations, "complete_checkpoint", lambda *args: True)
+    monkeypatch.setattr(
+        SyncCheckpointOperations,
+        "set_page_status",
+        lambda integration_id, page_id, status, error=None: space.statuses.append((page_id, status))
+        or True,
+    )
+
+    # Pages are processed in a thread and embedded without a model, the tokenizer is not needed
+    monkeypatch.setattr(page_processor, "count_truncated", lambda chunks: 0)
+    monkeypatch.setattr(sync_service, "page_processor", PageProcessor(workers=0, flush_interval=0))
+    monkeypatch.setattr(
+        sync_service, "embedding_batcher", EmbeddingBatcher(embed, flush_interval=0)
+    )
+    monkeypatch.setattr(sync_service.embedding_service, "model_name", "test-model")
+    return space
+
+
+async def sync(full_resync: bool = False, priority: str = "interactive"):
+    integration = {**INTEGRATION, "last_synced_at": None}
+    return await NotionSyncService.sync_pages(
+        integration, full_resync=full_resync, priority=priority
+    )
+
+
+async def test_pages_unchanged_since_they_were_indexed_are_skipped(workspace):
+    workspace.edit("page-a", "2025-01-01T00:00:00.000Z", ("Intro", "hello"))
+    workspace.edit("page-b", "2025-01-02T00:00:00.000Z", ("Notes", "world"))
+    await sync()
+    workspace.fetched.clear()
+
+    workspace.edit("page-b", "2025-01-03T00:00:00.000Z", ("Notes", "world again"))
+    stats = await sync()
+
+    assert workspace.fetched == ["page-b"]
+    assert (stats.pages_skipped, stats.pages_reindexed, stats.pages_new) == (1, 1, 0)
+    assert workspace.edit_times == {
+        "page-a": "2025-01-01T00:00:00.000Z",
+        "page-b": "2025-01-03T00:00:00.000Z",
+    }
+
+
+async def test_a_full_resync_does_not_skip_unchanged_pages(workspace):
+    workspace.edit("page-a", "2025-01-01T00:00:00.000Z", ("Intro", "hello"))
+    await sync()
+    workspace.fetched.clear()
+
+    stats = await sync(full_resync=True)
+
+    assert workspace.fetched == ["page-a"]
+    assert stats.pages_skipped == 0
+
+
+@pytest.mark.parametrize("priority", ["interactive", "bulk"])
+async def test_chunks_are_embedded_in_the_lane_of_the_sync(workspace, priority):
+    workspace.edit("page-a", "2025-01-01T00:00:00.000Z", ("Intro", "hello"))
+
+    await sync(priority=priority)
+
+    assert workspace.embed_priorities == {priority}
+
+
+async def test_an_edited_page_only_embeds_the_chunks_that_changed(workspace):
+    workspace.edit(
+        "page-a",
+        "2025-01-01T00:00:00.000Z",
+        ("Intro", "hello"),
+        ("Setup", "install it"),
+        ("Usage", "run it"),
+    )
+    await sync()
+    workspace.embedded.clear()
+    workspace.written.clear()
+
+    workspace.edit(
+        "page-a",
+        "2025-01-02T00:00:00.000Z",
+        ("Intro", "hello"),
+        ("Setup", "install it with pip"),
+        ("Usage", "run it"),
+    )
+    stats = await sync()
+
+    assert workspace.embedded == ["Setup\ninstall it with pip"]
+    assert workspace.written == [[1]]
+    assert (stats.chunks_embedded, stats.chunks_reused) == (1, 2)
+    assert workspace.stored_chunks("page-a") == [
+        "Intro\nhello",
+        "Setup\ninstall it with pip",
+        "Usage\nrun it",
+    ]
+
+
+async def test_moved_chunks_reuse_their_vectors(workspace):
+    workspace.edit("page-a", "2025-01-01T00:00:00.000Z", ("Intro", "hello"), ("Usage", "run it"))
+    await sync()
+    workspace.embedded.clear()
+    vectors = {row["content"]: row["embedding"] for row in workspace.chunks["db-page-a"].values()}
+
+    # A new first section shifts every chunk down by one
+    workspace.edit(
+        "page-a",
+        "2025-01-02T00:00:00.000Z",
+        ("News", "fresh"),
+        ("Intro", "hello"),
+        ("Usage", "run it"),
+    )
+    stats = await sync()
+
+    assert workspace.embedded == ["News\nfresh"]
+    assert (stats.chunks_embedded, stats.chunks_reused) == (1, 2)
+    stored = workspace.chunks["db-page-a"]
+    assert stored[1]["embedding"] is vectors["Intro\nhello"]
+    assert stored[2]["embedding"] is vectors["Usage\nrun it"]
+
+
+async def test_a_page_whose_chunks_failed_to_store_is_retried(workspace):
+    workspace.edit("page-a", "2025-01-01T00:00:00.000Z", ("Intro", "hello"))
+    workspace.fail_store = True
+
+    stats = await sync()
+
+    assert stats.pages_failed == 1
+    assert workspace.edit_times == {"page-a": None}
+    assert workspace.statuses == [("page-a", "failed")]
+    # The watermark stays put so the next incremental sync searches for the page again
+    assert workspace.synced_at == []
+
+    workspace.fail_store = False
+    workspace.fetched.clear()
+    stats = await sync()
+
+    assert workspace.fetched == ["page-a"]
+    assert (stats.pages_failed, stats.pages_reindexed) == (0, 1)
+    assert workspace.edit_times == {"page-a": "2025-01-01T00:00:00.000Z"}
+    assert workspace.stored_chunks("page-a") == ["Intro\nhello"]
+    assert len(workspace.synced_at) == 1
+
+
+async def test_page_events_only_count_deletes_of_indexed_pages(workspace):
+    workspace.edit("page-a", "2025-01-01T00:00:00.000Z", ("Intro", "hello"))
+    await sync()
+    workspace.edit("page-b", "2025-01-02T00:00:00.000Z", ("Notes", "world"))
+
+    stats = await NotionSyncService.sync_page_events(
+        INTEGRATION, changed_page_ids=["page-b"], deleted_page_ids=["page-a", "page-never"]
+    )
+
+    assert (stats.pages_new, stats.pages_deleted, stats.pages_skipped) == (1, 1, 1)
+    assert stats.pages_failed == 0
+    assert stats.pages_done == stats.pages_total == 3
+    assert workspace.stored_chunks("page-a") == []
+    assert workspace.stored_chunks("page-b") == ["Notes\nworld"]